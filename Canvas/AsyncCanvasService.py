@@ -0,0 +1,462 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, Optional, TypeVar
+
+import httpx
+
+from Canvas.CanvasService import RetryPolicy
+from Canvas.MultipartEncoder import AsyncMultipartBody
+from Canvas.RequestMetrics import RequestMetrics, RequestSample, endpoint_template
+from Canvas.RateLimiter import RateLimitScheduler, is_rate_limited, parse_retry_after
+from Canvas.schemas import *
+from Logging import Print
+
+T = TypeVar("T")
+
+
+class AsyncCanvasAPI:
+    """
+    Asyncio version of CanvasAPI, meant to fan out many Canvas calls concurrently.
+
+    It exposes the same methods as CanvasAPI (as coroutines), validates the responses with the same
+    schemas, and retries failed requests with the same RetryPolicy. At most ``max_concurrency`` requests
+    are in flight at any time.
+
+    Example:
+        >>> async def post_grades(grades: Dict[int, float]):
+        ...     async with AsyncCanvasAPI(course_id=15319) as canvas:
+        ...         await asyncio.gather(
+        ...             *(canvas.update_student_grade(1192803, user_id, grade) for user_id, grade in grades.items())
+        ...         )
+        >>> asyncio.run(post_grades({143898: 95}))
+    """
+
+    def __init__(
+        self,
+        course_id: int,
+        api_token: Optional[str] = None,
+        base_url: str = "https://csulb.instructure.com",
+        max_concurrency: int = 10,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+        timeout: float = 60.0,
+        metrics: Optional[RequestMetrics] = None,
+    ):
+        """
+        Initialize the AsyncCanvasAPI instance.
+
+        Args:
+            course_id (int): The ID of the course.
+            api_token (str, optional): Canvas API token. If not provided, it will
+                                       attempt to read from the 'API_TOKEN' environment variable.
+            base_url (str): Base URL for the Canvas instance.
+            max_concurrency (int): Maximum number of requests in flight at the same time.
+            retry_policy (RetryPolicy, optional): How failed requests are retried.
+            rate_limiter (RateLimitScheduler, optional): Tracks the Canvas quota bucket, new requests are delayed
+                                                         while it is low. It can be shared with a CanvasAPI.
+            timeout (float): Timeout in seconds for every request.
+            metrics (RequestMetrics, optional): Where the latency, retries and sizes of the requests are counted,
+                                                it can be shared with a CanvasAPI.
+        """
+        self.course_id = course_id
+        self.api_token = api_token or os.getenv("API_TOKEN")
+        if not self.api_token:
+            raise ValueError(
+                "API token must be provided either as an argument or via the 'API_TOKEN' environment variable."
+            )
+
+        self.base_url = base_url.rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {self.api_token}",
+            "Content-Type": "application/json",
+        }
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimitScheduler(max_concurrency=max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=timeout,
+        )
+        self.metrics = metrics or RequestMetrics()
+
+    async def aclose(self):
+        """Close all the pooled connections."""
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def _request_with_retries(
+        self, method: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request, retrying when it fails. The concurrency slot is released while waiting to retry.
+
+        Args:
+            method (str): The HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
+            url (str): The absolute URL.
+            headers (Dict, optional): Headers to send, defaults to the Canvas authorization headers.
+            **kwargs: Additional arguments to pass to the request.
+
+        Returns:
+            httpx.Response: The successful response, or the redirect itself when ``follow_redirects=False`` is passed.
+
+        Raises:
+            httpx.HTTPError: If the request still fails after all the attempts.
+        """
+        attempts = self.retry_policy.attempts
+        for attempt in range(attempts):
+            retry_after: Optional[float] = None
+            try:
+                async with self._semaphore:
+                    pacing_delay = self.rate_limiter.pacing_delay()
+                    if pacing_delay > 0:
+                        await asyncio.sleep(pacing_delay)
+                    start = time.perf_counter()
+                    response = None
+                    try:
+                        response = await self.client.request(
+                            method, url, headers=self.headers if headers is None else headers, **kwargs
+                        )
+                    finally:
+                        self.metrics.record(
+                            RequestSample(
+                                method=method,
+                                url=url.split("?")[0],
+                                endpoint=endpoint_template(method, url, self.base_url),
+                                status=response.status_code if response is not None else None,
+                                seconds=time.perf_counter() - start,
+                                # Streamed multipart bodies cannot be read back, their size is in the headers
+                                bytes_sent=(
+                                    int(response.request.headers.get("Content-Length", 0))
+                                    if response is not None
+                                    else 0
+                                ),
+                                bytes_received=len(response.content) if response is not None else 0,
+                            )
+                        )
+                self.rate_limiter.observe(response.headers)
+                if not (response.is_redirect and kwargs.get("follow_redirects") is False):
+                    response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as http_err:
+                response = http_err.response
+                Print(f"HTTP error occurred: {http_err}", log_type="ERROR")
+                Print(f"Response content: {response.text}", log_type="ERROR")
+                if not self.retry_policy.should_retry(response.status_code, response.text):
+                    raise
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if is_rate_limited(response.status_code, response.text):
+                    self.rate_limiter.throttle(retry_after)
+            except httpx.HTTPError as err:
+                Print(f"Other error occurred: {err}", log_type="ERROR")
+
+            if attempt + 1 < attempts:
+                self.metrics.record_retry(endpoint_template(method, url, self.base_url))
+                delay = self.retry_policy.delay(attempt, retry_after)
+                Print(f"Retrying in {delay:.1f} seconds (attempt {attempt + 1}/{attempts})...", log_type="ERROR")
+                await asyncio.sleep(delay)
+
+        raise httpx.HTTPError(f"Failed to make request after {attempts} attempts")
+
+    async def _make_request(
+        self, method: Literal["GET", "PUT", "POST", "DELETE"], endpoint: str, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Make a request to an endpoint of the course and return the parsed JSON.
+
+        Args:
+            method (str): The HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
+            endpoint (str): The endpoint part of the URL after /courses/{course_id}.
+            **kwargs: Additional arguments to pass to the request.
+
+        Returns:
+            Dict: The parsed JSON response.
+        """
+        url = f"{self.base_url}/api/v1/courses/{self.course_id}/{endpoint}"
+        response = await self._request_with_retries(method, url, **kwargs)
+        return response.json()
+
+    async def iter_paginated(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        per_page: int = 100,
+        schema: Optional[Callable[..., T]] = None,
+    ) -> AsyncIterator[T]:
+        """
+        Lazily iterate over every item of a paginated Canvas list endpoint, see CanvasAPI.iter_paginated.
+
+        Args:
+            endpoint (str): The endpoint part of the URL after /courses/{course_id}.
+            params (Dict, optional): Query parameters for the first page.
+            per_page (int): Number of items requested per page.
+            schema (Callable, optional): Schema used to validate every item, raw dictionaries are yielded if None.
+
+        Yields:
+            T: Every item of every page, validated with the schema.
+        """
+        url: Optional[str] = f"{self.base_url}/api/v1/courses/{self.course_id}/{endpoint}"
+        page_params: Optional[Dict[str, Any]] = {**(params or {}), "per_page": per_page}
+        while url:
+            response = await self._request_with_retries("GET", url, params=page_params)
+            for item in response.json():
+                yield schema(**item) if schema else item
+            next_link = response.links.get("next")
+            url = next_link["url"] if next_link else None
+            page_params = None  # The next page URL already has the query parameters
+
+    async def get_users_in_course(self, per_page: int = 100) -> List[UsersSchema]:
+        """
+        Retrieve active users enrolled in the course.
+
+        Args:
+            per_page (int): Number of users requested per page.
+
+        Returns:
+            List[UsersSchema]: A list of user dictionaries.
+        """
+        params = {"sort": "email", "enrollment_state": "active"}
+        return [user async for user in self.iter_paginated("users", params, per_page=per_page, schema=UsersSchema)]
+
+    async def get_submissions(self, assignment_id: int, per_page: int = 100) -> List[SubmissionSchema]:
+        """
+        Retrieve all submissions for a specific assignment.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            per_page (int): Number of submissions requested per page.
+
+        Returns:
+            List[SubmissionSchema]: A list of submissions, including their attachments.
+        """
+        params = {"include[]": "attachments"}
+        endpoint = f"assignments/{assignment_id}/submissions"
+        return [
+            submission
+            async for submission in self.iter_paginated(endpoint, params, per_page=per_page, schema=SubmissionSchema)
+        ]
+
+    async def update_student_grade(self, assignment_id: int, user_id: int, new_grade: float) -> str:
+        """
+        Update a student's grade for a specific assignment.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            user_id (int): The ID of the user.
+            new_grade (float): The new grade to assign.
+
+        Returns:
+            str: The updated grade.
+        """
+        endpoint = f"assignments/{assignment_id}/submissions/{user_id}"
+        data = {"submission": {"posted_grade": new_grade}}
+        updated_submission = await self._make_request("PUT", endpoint, json=data)
+        return updated_submission.get("grade", "No grade available")
+
+    async def update_student_grades(self, assignment_id: int, grades: Dict[int, float]) -> Dict[int, str]:
+        """
+        Update the grades of many students concurrently.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            grades (Dict[int, float]): The new grade of every user ID.
+
+        Returns:
+            Dict[int, str]: The updated grade of every user ID.
+        """
+        user_ids = list(grades)
+        updated = await asyncio.gather(
+            *(self.update_student_grade(assignment_id, user_id, grades[user_id]) for user_id in user_ids)
+        )
+        return dict(zip(user_ids, updated))
+
+    async def get_page_by_id(self, url: str) -> PageSchema:
+        endpoint = f"pages/{url}"
+        page = await self._make_request("GET", endpoint)
+        return PageSchema(**page)
+
+    async def create_page(
+        self,
+        title: str,
+        body: Optional[str] = None,
+        editing_roles: Optional[Literal["teachers", "students", "members", "public"]] = None,
+        notify_of_update: Optional[bool] = None,
+        published: Optional[bool] = None,
+        front_page: Optional[bool] = None,
+        publish_at: Optional[datetime] = None,
+    ) -> PageSchema:
+        """
+        Create a new wiki page with the specified parameters, see CanvasAPI.create_page.
+        """
+        data: Dict[str, Dict[str, Any]] = {"wiki_page": {"title": title}}
+        if body:
+            data["wiki_page"]["body"] = body
+        if editing_roles:
+            data["wiki_page"]["editing_roles"] = editing_roles
+        if notify_of_update is not None:
+            data["wiki_page"]["notify_of_update"] = str(notify_of_update)
+        if published is not None:
+            data["wiki_page"]["published"] = str(published)
+        if front_page is not None:
+            data["wiki_page"]["front_page"] = str(front_page)
+        if publish_at:
+            data["wiki_page"]["publish_at"] = publish_at.isoformat()
+
+        page = await self._make_request("POST", "pages", json=data)
+        return PageSchema(**page)
+
+    async def update_page(self, id: int, body: str, title: Optional[str] = None) -> PageSchema:
+        """
+        Update an existing wiki page, see CanvasAPI.update_page.
+        """
+        data: Dict[str, Dict[str, Any]] = {"wiki_page": {"body": body}}
+        if title:
+            data["wiki_page"]["title"] = title
+        page = await self._make_request("PUT", f"pages/{id}", json=data)
+        return PageSchema(**page)
+
+    async def create_module_item(
+        self,
+        title: str,
+        module_id: int,
+        page_url: str,
+        type: Literal["File", "Page", "Discussion"] = "Page",
+    ) -> ModuleItemSchema:
+        """
+        Create a module item in a specific module, see CanvasAPI.create_module_item.
+        """
+        data = {"module_item": {"title": title, "type": type, "page_url": page_url}}
+        module_item = await self._make_request("POST", f"modules/{module_id}/items", json=data)
+        return ModuleItemSchema(**module_item)
+
+    async def upload_file(self, file_path: str) -> str:
+        """
+        Upload a file to the course's files, see CanvasAPI.upload_file.
+
+        Args:
+            file_path (str): The local path to the file.
+
+        Returns:
+            str: The URL of the uploaded file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is empty.
+            httpx.HTTPError: If the upload fails.
+        """
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"The file '{file_path}' does not exist.")
+        file_path = os.path.abspath(file_path)
+        file_size = os.path.getsize(file_path)
+        if file_size == 0:
+            raise ValueError("Cannot upload an empty file.")
+
+        # Step 1: Initiate the file upload
+        file_name = os.path.basename(file_path)
+        data = {"name": file_name, "size": str(file_size), "parent_folder_path": "", "on_duplicate": "rename"}
+        upload_info = await self._make_request("POST", "files", json=data)
+
+        # Step 2: Upload the file to the pre-signed URL, without the Canvas headers. The body is streamed from disk
+        body = AsyncMultipartBody(upload_info["upload_params"], upload_info.get("file_param", "file"), file_path)
+        upload_response = await self._request_with_retries(
+            "POST", upload_info["upload_url"], headers=body.headers, content=body, follow_redirects=False
+        )
+
+        # Step 3: The upload host answers with the created file, or redirects to Canvas, which only creates the
+        # file once the redirect is followed with the Canvas headers
+        if upload_response.is_redirect:
+            upload_response = await self._request_with_retries("GET", upload_response.headers["Location"])
+        Print(f"File '{file_name}' uploaded successfully!")
+        return upload_response.json()["url"]
+
+    async def _create_quiz(
+        self,
+        title: str,
+        description: str,
+        quiz_type: str,
+        time_limit: int,
+        shuffle_answers: bool = False,
+        allowed_attempts: int = 1,
+    ) -> Dict:
+        """
+        Create a quiz in the course, see CanvasAPI._create_quiz.
+        """
+        data = {
+            "quiz": {
+                "title": title,
+                "description": description,
+                "quiz_type": quiz_type,
+                "time_limit": time_limit,
+                "shuffle_answers": shuffle_answers,
+                "allowed_attempts": allowed_attempts,
+            }
+        }
+        return await self._make_request("POST", "quizzes", json=data)
+
+    async def _add_question_to_quiz(self, quiz_id: int, question_data: Dict) -> Dict:
+        return await self._make_request("POST", f"quizzes/{quiz_id}/questions", json=question_data)
+
+    async def delete_quiz(self, quiz_id: int) -> Dict:
+        """
+        Delete a quiz from the course, see CanvasAPI.delete_quiz.
+        """
+        return await self._make_request("DELETE", f"quizzes/{quiz_id}")
+
+    async def _create_quiz_with_questions(self, validated_quiz: QuizSchema) -> Dict:
+        """
+        Create a quiz and add all of its questions concurrently.
+
+        If any question cannot be added, the quiz is deleted so no half-built quiz is left in the course.
+
+        Args:
+            validated_quiz (QuizSchema): The quiz information and questions.
+
+        Returns:
+            Dict: The created quiz data.
+        """
+        quiz = await self._create_quiz(
+            title=validated_quiz.title,
+            description=validated_quiz.description,
+            quiz_type=validated_quiz.quiz_type,
+            time_limit=validated_quiz.time_limit,
+            shuffle_answers=validated_quiz.shuffle_answers,
+            allowed_attempts=validated_quiz.allowed_attempts,
+        )
+        # Every question is awaited, so that none is still being added once the quiz is deleted
+        results = await asyncio.gather(
+            *(
+                self._add_question_to_quiz(quiz["id"], {"question": {**question.model_dump(), "position": position}})
+                for position, question in enumerate(validated_quiz.questions, start=1)
+            ),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            Print(
+                f"Deleting quiz '{validated_quiz.title}', a question could not be added: {errors[0]}", log_type="ERROR"
+            )
+            await self.delete_quiz(quiz["id"])
+            raise errors[0]
+        Print(f"Quiz '{validated_quiz.title}' created successfully with all questions added.", log_type="INFO")
+        return quiz
+
+    async def create_quiz_from_file(self, file_path: str) -> Dict:
+        """
+        Create a quiz by reading quiz data from a JSON file, see CanvasAPI.create_quiz_from_file.
+        """
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"The file '{file_path}' does not exist.")
+        try:
+            with open(file_path, "r") as f:
+                quiz_data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Failed to parse JSON file: {e}")
+
+        validated_quiz = QuizSchema(**quiz_data)
+        return await self._create_quiz_with_questions(validated_quiz)
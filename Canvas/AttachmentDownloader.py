@@ -0,0 +1,205 @@
+import contextvars
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, TypedDict
+
+import requests
+
+from Logging import Print
+
+
+class DownloadStats(TypedDict):
+    files: int  # Files written to disk
+    bytes: int  # Bytes received from the network
+    seconds: float  # Wall time spent downloading
+    throughput_mb_s: float  # Aggregate throughput in MB/s
+
+
+class DownloadResult(TypedDict):
+    path: str  # Where the file was saved
+    size: int  # Size of the file on disk
+    sha256: str  # Hex digest of the file content
+    resumed_from: int  # Bytes of a previous partial download that were kept, 0 if downloaded from scratch
+
+
+@dataclass
+class DownloadJob:
+    url: str
+    path: str
+    size: Optional[int] = None  # Expected size in bytes, checked once the download completes
+
+
+class AttachmentDownloader:
+    """
+    Downloads submission attachments in parallel, streaming each one to disk.
+
+    Every file is read from the network in chunks of ``chunk_size`` bytes and written to a temporary file next to
+    its destination, which is renamed into place once complete. Memory usage therefore stays flat regardless of
+    the attachment sizes, and an interrupted download never leaves a truncated file behind.
+
+    With ``resume=True`` the temporary file is named ``<path>.part`` and kept when a download fails, the next
+    attempt asks the server for the missing bytes only with a ``Range`` header.
+
+    Example:
+        >>> downloader = AttachmentDownloader(canvas._send_with_retries, max_workers=4)
+        >>> results = downloader.download_many([DownloadJob(attachment["url"], "/tmp/paper.pdf")])
+    """
+
+    def __init__(
+        self,
+        request: Callable[..., requests.Response],
+        headers: Optional[Dict[str, str]] = None,
+        max_workers: int = 4,
+        chunk_size: int = 1024 * 1024,
+    ):
+        """
+        Args:
+            request (Callable): Function sending a request, with the signature of ``requests.Session.request``. It
+                                may raise requests.HTTPError for an error status.
+            headers (Dict, optional): Headers sent with every download.
+            max_workers (int): Number of files downloaded at the same time.
+            chunk_size (int): Bytes read from the network and written to disk at a time.
+        """
+        self.request = request
+        self.headers = headers or {}
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self.last_stats: Optional[DownloadStats] = None
+
+    def download(self, url: str, path: str, size: Optional[int] = None, resume: bool = False) -> DownloadResult:
+        """
+        Stream a single file to ``path``.
+
+        Args:
+            url (str): The URL of the file.
+            path (str): Where to save the file, its folder must exist.
+            size (int, optional): Expected size of the file in bytes.
+            resume (bool): Continue a previous partial download of this file, and keep the partial file on failure.
+
+        Returns:
+            DownloadResult: Where the file was saved, its size and its SHA-256.
+
+        Raises:
+            requests.HTTPError: If the download fails.
+            ValueError: If the downloaded file does not have the expected size.
+        """
+        if resume:
+            tmp_path = f"{path}.part"
+        else:
+            folder = os.path.dirname(os.path.abspath(path))
+            fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".part")
+            os.close(fd)
+
+        offset = os.path.getsize(tmp_path) if resume and os.path.exists(tmp_path) else 0
+        if size is not None and offset > size:
+            offset = 0
+        headers = dict(self.headers)
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        digest = hashlib.sha256()
+        try:
+            try:
+                response = self.request("GET", url, headers=headers, stream=True)
+            except requests.HTTPError as e:
+                if not (offset and e.response is not None and e.response.status_code == 416):
+                    raise
+                response = e.response
+            with response:
+                if offset and response.status_code == 416:
+                    # The partial file does not match the file on the server anymore, start over
+                    os.remove(tmp_path)
+                    return self.download(url, path, size=size, resume=resume)
+                response.raise_for_status()
+                if offset and response.status_code == 206:
+                    with open(tmp_path, "rb") as f:
+                        for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                            digest.update(chunk)
+                    mode = "ab"
+                else:
+                    offset = 0  # The server ignored the Range header and sent the whole file
+                    mode = "wb"
+                with open(tmp_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+
+            written = os.path.getsize(tmp_path)
+            if size is not None and written != size:
+                os.remove(tmp_path)
+                raise ValueError(f"Downloaded {written} bytes from {url}, expected {size}")
+            os.replace(tmp_path, path)
+        except BaseException:
+            if not resume and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return DownloadResult(path=path, size=written, sha256=digest.hexdigest(), resumed_from=offset)
+
+    def download_many(
+        self,
+        jobs: List[DownloadJob],
+        resume: bool = False,
+        on_complete: Optional[Callable[[int, DownloadResult], None]] = None,
+    ) -> List[DownloadResult]:
+        """
+        Download many files in parallel through a pool of ``max_workers`` threads.
+
+        Args:
+            jobs (List[DownloadJob]): The files to download.
+            resume (bool): Continue partial downloads left by a previous run, see download.
+            on_complete (Callable, optional): Called with the index of the job and its result after every
+                                              successful download, even if other downloads fail.
+
+        Returns:
+            List[DownloadResult]: The downloaded files, in the same order as the jobs.
+
+        Raises:
+            requests.HTTPError: If any download fails, once all the other downloads finished.
+        """
+        if not jobs:
+            return []
+        start = time.monotonic()
+        total_bytes = 0
+        results: List[DownloadResult] = []
+        errors: List[BaseException] = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            # The lane and the deadline of the caller apply to the downloads
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.download, job.url, job.path, job.size, resume)
+                for job in jobs
+            ]
+            for index, (job, future) in enumerate(zip(jobs, futures)):
+                try:
+                    result = future.result()
+                    results.append(result)
+                    total_bytes += result["size"] - result["resumed_from"]
+                    if on_complete:
+                        on_complete(index, result)
+                    Print(f"Downloaded {os.path.basename(job.path)} to {job.path}", log_type="INFO")
+                except Exception as e:
+                    Print(f"Failed to download {job.url}: {e}", log_type="ERROR")
+                    errors.append(e)
+
+        seconds = time.monotonic() - start
+        stats = DownloadStats(
+            files=len(results),
+            bytes=total_bytes,
+            seconds=round(seconds, 3),
+            throughput_mb_s=round(total_bytes / 1e6 / seconds, 3) if seconds > 0 else 0.0,
+        )
+        with self._lock:
+            self.last_stats = stats
+        Print(
+            f"Downloaded {stats['files']} files ({stats['bytes'] / 1e6:.2f} MB) in {stats['seconds']:.2f}s, "
+            f"{stats['throughput_mb_s']:.2f} MB/s",
+            log_type="INFO",
+        )
+        if errors:
+            raise errors[0]
+        return results
@@ -0,0 +1,249 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import requests
+
+from Canvas.schemas import SubmissionSchema, UsersSchema
+from Logging import Print
+
+if TYPE_CHECKING:
+    from Canvas.CanvasService import CanvasAPI
+
+# The roster and the submissions of an assignment are two connections of the same query, each one paginated with
+# its own cursor. A connection is left out with @include once all its pages were read.
+ROSTER_AND_SUBMISSIONS_QUERY = """
+query RosterAndSubmissions(
+  $courseId: ID!
+  $assignmentId: ID!
+  $first: Int!
+  $usersAfter: String
+  $submissionsAfter: String
+  $withUsers: Boolean!
+  $withSubmissions: Boolean!
+) {
+  course(id: $courseId) @include(if: $withUsers) {
+    enrollmentsConnection(first: $first, after: $usersAfter, filter: {states: [active]}) {
+      nodes {
+        user { _id name sortableName shortName email createdAt }
+      }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+  assignment(id: $assignmentId) @include(if: $withSubmissions) {
+    submissionsConnection(first: $first, after: $submissionsAfter) {
+      nodes {
+        _id
+        attempt
+        body
+        grade
+        score
+        state
+        submissionType
+        submittedAt
+        gradedAt
+        late
+        missing
+        excused
+        redoRequest
+        user { _id }
+        attachments { _id displayName url size contentType updatedAt }
+      }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    """GraphQL returns some numbers as strings, and the size of a file formatted for display (e.g. "48.8 KB")."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def user_from_node(node: Dict[str, Any]) -> UsersSchema:
+    """Map a GraphQL User into the UsersSchema returned by the REST users listing."""
+    return UsersSchema(
+        id=int(node["_id"]),
+        name=node["name"],
+        created_at=node.get("createdAt") or "",
+        sortable_name=node.get("sortableName") or node["name"],
+        short_name=node.get("shortName") or node["name"],
+        email=node.get("email") or "",
+    )
+
+
+def submission_from_node(node: Dict[str, Any], assignment_id: int) -> SubmissionSchema:
+    """
+    Map a GraphQL Submission into the SubmissionSchema returned by the REST submissions listing.
+
+    GraphQL has no stored filename of an attachment and only a display formatted size, so they are None until
+    CanvasGraphQL fills the attachment in from REST.
+    """
+    attachments = [
+        {
+            "id": int(attachment["_id"]),
+            "filename": None,
+            "display_name": attachment["displayName"],
+            "url": attachment["url"],
+            "size": _int_or_none(attachment.get("size")),
+            "content-type": attachment.get("contentType"),
+            "updated_at": attachment.get("updatedAt"),
+        }
+        for attachment in node.get("attachments") or []
+    ]
+    return SubmissionSchema(
+        assignment_id=assignment_id,
+        user_id=int(node["user"]["_id"]),
+        attempt=node.get("attempt"),
+        body=node.get("body"),
+        grade=node.get("grade"),
+        score=node.get("score"),
+        workflow_state=node["state"],
+        submission_type=node.get("submissionType"),
+        submitted_at=node.get("submittedAt"),
+        graded_at=node.get("gradedAt"),
+        late=bool(node.get("late")),
+        missing=bool(node.get("missing")),
+        excused=node.get("excused"),
+        redo_request=bool(node.get("redoRequest")),
+        attachments=attachments or None,
+    )
+
+
+class CanvasGraphQL:
+    """
+    Reads the course through the Canvas GraphQL API instead of the REST API.
+
+    GraphQL returns the enrollments with the users' emails and the submissions of an assignment with their
+    attachments in the same paginated query, where REST needs the users listing, the submissions listing and
+    their pagination one after the other. The results are mapped into the same UsersSchema and SubmissionSchema
+    as the REST methods, so CanvasAPI can use either one as its backend. The filename and the size in bytes of the
+    attachments are not in the GraphQL API, they are read from the REST submissions listing when there are any.
+
+    Example:
+        >>> canvas = CanvasAPI(course_id, backend="graphql")
+        >>> users, submissions = canvas.graphql.roster_and_submissions(1192803)
+    """
+
+    def __init__(self, canvas: "CanvasAPI", page_size: int = 100):
+        """
+        Args:
+            canvas (CanvasAPI): Sends the queries, with its session, retries and rate limiting.
+            page_size (int): Items requested per page of every connection.
+        """
+        self.canvas = canvas
+        self.page_size = page_size
+
+    def query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a GraphQL query.
+
+        Args:
+            query (str): The GraphQL document.
+            variables (Dict): Its variables.
+
+        Returns:
+            Dict: The ``data`` of the response.
+
+        Raises:
+            requests.HTTPError: If the request fails or the query returns errors.
+        """
+        url = f"{self.canvas.base_url}/api/graphql"
+        result = self.canvas._request_with_retries("POST", url, json={"query": query, "variables": variables}).json()
+        if result.get("errors"):
+            messages = "; ".join(error.get("message", str(error)) for error in result["errors"])
+            raise requests.HTTPError(f"GraphQL query failed: {messages}")
+        return result["data"]
+
+    def roster_and_submissions(
+        self, assignment_id: Optional[int] = None, with_users: bool = True
+    ) -> Tuple[List[UsersSchema], List[SubmissionSchema]]:
+        """
+        Fetch the active users of the course and the submissions of an assignment, following both paginations.
+
+        Args:
+            assignment_id (int, optional): The assignment whose submissions are fetched, none if None.
+            with_users (bool): Whether to fetch the users.
+
+        Returns:
+            Tuple[List[UsersSchema], List[SubmissionSchema]]: The users and the submissions.
+        """
+        users: Dict[int, UsersSchema] = {}  # A user with several enrollments is listed once
+        submissions: List[SubmissionSchema] = []
+        variables: Dict[str, Any] = {
+            "courseId": str(self.canvas.course_id),
+            "assignmentId": str(assignment_id or 0),
+            "first": self.page_size,
+            "usersAfter": None,
+            "submissionsAfter": None,
+            "withUsers": with_users,
+            "withSubmissions": assignment_id is not None,
+        }
+        queries = 0
+        while variables["withUsers"] or variables["withSubmissions"]:
+            data = self.query(ROSTER_AND_SUBMISSIONS_QUERY, variables)
+            queries += 1
+            if variables["withUsers"]:
+                connection = data["course"]["enrollmentsConnection"]
+                for node in connection["nodes"]:
+                    if node.get("user"):
+                        user = user_from_node(node["user"])
+                        users.setdefault(user["id"], user)
+                variables["usersAfter"] = connection["pageInfo"]["endCursor"]
+                variables["withUsers"] = connection["pageInfo"]["hasNextPage"]
+            if variables["withSubmissions"]:
+                connection = data["assignment"]["submissionsConnection"]
+                submissions.extend(
+                    submission_from_node(node, assignment_id) for node in connection["nodes"]  # type: ignore
+                )
+                variables["submissionsAfter"] = connection["pageInfo"]["endCursor"]
+                variables["withSubmissions"] = connection["pageInfo"]["hasNextPage"]
+        if assignment_id is not None:
+            self._complete_attachments(assignment_id, submissions)
+        Print(
+            f"Fetched {len(users)} users and {len(submissions)} submissions with {queries} GraphQL queries",
+            log_type="DEBUG",
+        )
+        return list(users.values()), submissions
+
+    def _complete_attachments(self, assignment_id: int, submissions: List[SubmissionSchema]):
+        """
+        Replace the attachments without a filename or a size in bytes by the ones of the REST submissions listing.
+
+        The downloads are checked against the size and kept in the DownloadManifest under the filename, both must
+        be the ones the REST backend gets.
+
+        Args:
+            assignment_id (int): The assignment of the submissions.
+            submissions (List[SubmissionSchema]): The submissions mapped from GraphQL, updated in place.
+        """
+        incomplete = [
+            submission
+            for submission in submissions
+            if any(a["filename"] is None or a["size"] is None for a in submission.attachments or [])
+        ]
+        if not incomplete:
+            return
+        rest_attachments = {
+            attachment["id"]: attachment
+            for submission in self.canvas.iter_paginated(
+                f"assignments/{assignment_id}/submissions", {"include[]": "attachments"}
+            )
+            for attachment in submission.get("attachments") or []
+        }
+        for submission in incomplete:
+            submission.attachments = [
+                rest_attachments.get(attachment["id"], attachment) for attachment in submission.attachments or []
+            ]
+        Print(f"Read the attachments of {len(incomplete)} submissions from REST", log_type="DEBUG")
+
+    def users(self) -> List[UsersSchema]:
+        """The active users of the course."""
+        return self.roster_and_submissions()[0]
+
+    def submissions(self, assignment_id: int) -> List[SubmissionSchema]:
+        """The submissions of an assignment, with their attachments."""
+        return self.roster_and_submissions(assignment_id, with_users=False)[1]
@@ -1,25 +1,127 @@
 import base64
+import contextlib
+import contextvars
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 import os
+import random
 import shutil
 import time
-from typing import Any, Dict, List, Literal, Optional, TypedDict
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple, TypedDict, TypeVar
 import zipfile
 import requests
+from requests.adapters import HTTPAdapter
 import unittest
 import json
 
+from Canvas.AttachmentDownloader import AttachmentDownloader, DownloadJob, DownloadResult
+from Canvas.CanvasGraphQL import CanvasGraphQL
+from Canvas.CourseMetadataCache import CourseMetadataCache, MetadataId
+from Canvas.DownloadManifest import DownloadManifest, sha256_file
+from Canvas.ResponseCache import ResponseCache
+from Canvas.SubmissionStore import SubmissionStore
+from Canvas.RosterCache import RosterCache
+from Canvas.SingleFlight import SingleFlight
+from Canvas.UploadExecutor import HostLimiter
+from Canvas.UploadIndex import UploadIndex
+from Canvas.MultipartEncoder import MultipartEncoder, ProgressCallback
+from Canvas.PayloadDecoder import DECODE_MODES, DecodeMode, decode_list
+from Canvas.PriorityScheduler import Lane, PriorityScheduler, current_lane
+from Canvas.QTIPackage import SUPPORTED_QUESTION_TYPES, build_qti_package
+from Canvas.RequestHedger import RequestHedger
+from Canvas.RequestMetrics import RequestMetrics, RequestSample, endpoint_template
+from Canvas.RateLimiter import RateLimitMetrics, RateLimitScheduler, is_rate_limited, parse_retry_after
 from Canvas.schemas import *
 import pprint
+from Deadline import DEFAULT_REQUEST_TIMEOUT, remaining, request_timeout, sleep_within_deadline
 from Logging import Print, set_log_level, LogLevel
 from dotenv import load_dotenv
 
 
+T = TypeVar("T")
+
+# Incremental syncs start this many seconds before the previous sync, for the clock skew between us and Canvas
+SYNC_OVERLAP = 60.0
+
+
+def _copy_response(response: requests.Response) -> requests.Response:
+    """A copy of a response read in full, whose headers can be modified without affecting the original."""
+    duplicate = copy.copy(response)
+    duplicate.headers = response.headers.copy()
+    return duplicate
+
+
+class ConnectionStats(TypedDict):
+    requests: int  # Requests sent through the pooled connections
+    connections_opened: int  # New TCP/TLS connections that had to be established
+    connections_reused: int  # Requests that were served by an already open connection
+    pools: int  # Number of hosts with a live connection pool
+    coalesced: int  # GET requests that shared the response of an identical request in flight instead of being sent
+
+
+@dataclass
+class RetryPolicy:
+    """
+    How failed Canvas requests are retried, shared by CanvasAPI and AsyncCanvasAPI.
+
+    The delay before retry ``n`` (starting at 0) is exponential, ``backoff * multiplier ** n`` capped at
+    ``max_backoff``, with "full jitter" (a random delay between 0 and that value) so that concurrent requests
+    do not retry in lockstep. A ``Retry-After`` sent by the server always wins over the computed delay.
+    Only connection errors, rate limiting and the statuses in ``retry_statuses`` are retried.
+    """
+
+    attempts: int = 4
+    backoff: float = 0.5
+    multiplier: float = 2.0
+    max_backoff: float = 30.0
+    jitter: bool = True
+    retry_statuses: Tuple[int, ...] = (408, 409, 429, 500, 502, 503, 504)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait after the failed attempt number ``attempt`` (starting at 0).
+
+        Args:
+            attempt (int): The attempt that failed.
+            retry_after (float, optional): Seconds requested by the server through the Retry-After header.
+        """
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.backoff * self.multiplier**attempt, self.max_backoff)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def should_retry(self, status_code: int, text: str = "") -> bool:
+        """Whether a response with this status is worth retrying."""
+        return status_code in self.retry_statuses or is_rate_limited(status_code, text)
+
+
 class CanvasAPI:
     def __init__(
         self,
         course_id: int,
         api_token: Optional[str] = None,
         base_url: str = "https://csulb.instructure.com",
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        pool_block: bool = False,
+        stats_hook: Optional[Callable[[ConnectionStats], None]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+        download_workers: int = 4,
+        roster_ttl: float = 600.0,
+        response_cache: Optional[ResponseCache] = None,
+        upload_index: Optional[UploadIndex] = None,
+        metrics: Optional[RequestMetrics] = None,
+        submission_store: Optional[SubmissionStore] = None,
+        metadata_cache: Optional[CourseMetadataCache] = None,
+        coalesce: bool = True,
+        scheduler: Optional[PriorityScheduler] = None,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        hedger: Optional[RequestHedger] = None,
+        backend: Literal["rest", "graphql"] = "rest",
+        decode: DecodeMode = "batch",
     ):
         """
         Initialize the CanvasAPI instance.
@@ -29,7 +131,43 @@ class CanvasAPI:
             api_token (str, optional): Canvas API token. If not provided, it will
                                        attempt to read from the 'API_TOKEN' environment variable.
             base_url (str): Base URL for the Canvas instance.
+            pool_connections (int): Number of hosts to keep a connection pool for (Canvas, the file
+                                    upload host and the file download host).
+            pool_maxsize (int): Maximum number of keep-alive connections kept open per host.
+            pool_block (bool): If True, block when every connection of a host is busy instead of
+                               opening a throw-away connection.
+            stats_hook (Callable, optional): Called with the current ConnectionStats after every request.
+            retry_policy (RetryPolicy, optional): How failed requests are retried. Defaults to exponential
+                                                  backoff with jitter.
+            rate_limiter (RateLimitScheduler, optional): Paces the requests based on the Canvas throttling headers.
+            download_workers (int): Number of submission attachments downloaded at the same time.
+            roster_ttl (float): Seconds the course roster is cached before being fetched again.
+            response_cache (ResponseCache, optional): Persistent cache of GET responses, revalidated with
+                                                      conditional requests.
+            upload_index (UploadIndex, optional): Index of the uploaded files by content, upload_file reuses an
+                                                  existing file instead of uploading the same content again.
+            metrics (RequestMetrics, optional): Where the latency, retries and sizes of the requests are counted,
+                                                a new one is created if None.
+            submission_store (SubmissionStore, optional): Local copy of the submissions kept up to date by
+                                                          sync_submissions, an in-memory one is created if None.
+            metadata_cache (CourseMetadataCache, optional): Ids of the modules, assignments and pages by title, an
+                                                            in-memory one is created if None.
+            coalesce (bool): Send identical GET requests made at the same time once and share the response.
+            scheduler (PriorityScheduler, optional): Orders the requests of the interactive, normal and bulk lanes,
+                                                     one with ``pool_maxsize`` slots is created if None.
+            timeout (float): Seconds a request may take, less when the deadline of the operation is closer.
+            hedger (RequestHedger, optional): Sends the GET requests slower than usual a second time, keeping the
+                                              first response. The requests are only sent once if None.
+            backend (str): "rest" or "graphql". With "graphql", the roster and the submissions are read through
+                           the GraphQL API, which returns both in the same paginated query.
+            decode (DecodeMode): How list responses are decoded by default: "batch" validates every page at once
+                                 from its bytes, "validate" every item on its own. Each list method can
+                                 override it.
         """
+        if backend not in ("rest", "graphql"):
+            raise ValueError(f"Unknown backend {backend!r}, expected 'rest' or 'graphql'")
+        if decode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode {decode!r}, expected one of {DECODE_MODES}")
         self.course_id = course_id
         self.api_token = api_token or os.getenv("API_TOKEN")
         if not self.api_token:
@@ -43,6 +181,272 @@ class CanvasAPI:
             "Content-Type": "application/json",
         }
 
+        # A single session keeps TCP/TLS connections alive between calls, every host gets its own pool
+        self.session = requests.Session()
+        self.session.headers["Connection"] = "keep-alive"
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self.stats_hook = stats_hook
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimitScheduler(max_concurrency=pool_maxsize)
+        # Downloads are retried, rate limited and wait for a request slot like every other request
+        self.downloader = AttachmentDownloader(self._send_with_retries, max_workers=download_workers)
+        self.roster = RosterCache(self.get_users_in_course, ttl=roster_ttl)
+        self.response_cache = response_cache
+        if upload_index is not None and upload_index.course_id != course_id:
+            raise ValueError(f"The upload index of course {upload_index.course_id} cannot be used for {course_id}")
+        self.upload_index = upload_index
+        self._upload_index_reconciled = False
+        self.metrics = metrics or RequestMetrics()
+        self.coalesce = coalesce
+        self.single_flight = SingleFlight()
+        self.scheduler = scheduler or PriorityScheduler(max_in_flight=pool_maxsize)
+        self.timeout = timeout
+        self.hedger = hedger
+        self.submission_store = submission_store or SubmissionStore()
+        self.metadata = metadata_cache or CourseMetadataCache(course_id)
+        self.backend = backend
+        self.decode = decode
+        self.graphql = CanvasGraphQL(self)
+
+    def close(self):
+        """Close all the pooled connections, once the calls submitted to the scheduler are done."""
+        self.scheduler.shutdown()
+        if self.hedger is not None:
+            self.hedger.shutdown()
+        self.session.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, fn: Callable[..., T], *args, lane: Lane = "normal", **kwargs) -> "Future[T]":
+        """
+        Run a call in the background with its requests sent in a lane of the scheduler.
+
+        Interactive requests are served before the normal and bulk ones waiting, bulk requests still get a share
+        of the slots so that they finish.
+
+        Args:
+            fn (Callable): The call, usually a CanvasAPI or Grader method.
+            *args: Its positional arguments.
+            lane (Lane): "interactive", "normal" or "bulk".
+            **kwargs: Its keyword arguments.
+
+        Returns:
+            Future: The result of the call.
+
+        Example:
+            >>> grades = canvas.submit(canvas.bulk_update_grades, assignment_id, grades, lane="bulk")
+            >>> pages = canvas.submit(canvas.get_module_pages, module_id, lane="interactive").result()
+        """
+        return self.scheduler.submit(fn, *args, lane=lane, **kwargs)
+
+    def connection_stats(self) -> ConnectionStats:
+        """
+        Report how many requests were sent and how many of them reused an open connection.
+
+        Returns:
+            ConnectionStats: Counters aggregated over the connection pool of every host.
+        """
+        pools = self._adapter.poolmanager.pools
+        num_requests = 0
+        num_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            num_requests += pool.num_requests
+            num_connections += pool.num_connections
+        return ConnectionStats(
+            requests=num_requests,
+            connections_opened=num_connections,
+            connections_reused=max(num_requests - num_connections, 0),
+            pools=len(pools),
+            coalesced=self.single_flight.stats()["coalesced"],
+        )
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a single HTTP request through the pooled session.
+
+        The request times out after ``timeout`` seconds, or when the deadline of the operation is reached.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The absolute URL.
+            **kwargs: Additional arguments to pass to the session.
+
+        Returns:
+            requests.Response: The raw response, the status code is not checked.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the operation is already reached.
+        """
+        if "timeout" not in kwargs:
+            kwargs["timeout"] = request_timeout(self.timeout, action=f"{method} {url.split('?')[0]}")
+        start = time.perf_counter()
+        response: Optional[requests.Response] = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+        finally:
+            self.metrics.record(self._request_sample(method, url, response, time.perf_counter() - start))
+        if self.stats_hook:
+            self.stats_hook(self.connection_stats())
+        return response
+
+    def _request_sample(
+        self, method: str, url: str, response: Optional[requests.Response], seconds: float
+    ) -> RequestSample:
+        """Describe a request for the metrics, without reading a streamed body."""
+        bytes_sent = 0
+        bytes_received = 0
+        if response is not None:
+            body = response.request.body
+            if isinstance(body, str):
+                bytes_sent = len(body.encode())
+            elif body is not None and hasattr(body, "__len__"):
+                bytes_sent = len(body)
+            if response._content_consumed:  # type: ignore[attr-defined]
+                bytes_received = len(response.content or b"")
+            else:
+                bytes_received = int(response.headers.get("Content-Length") or 0)
+        return RequestSample(
+            method=method,
+            url=url.split("?")[0],
+            endpoint=endpoint_template(method, url, self.base_url),
+            status=response.status_code if response is not None else None,
+            seconds=seconds,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+        )
+
+    def rate_limit_metrics(self) -> RateLimitMetrics:
+        """
+        Report the Canvas quota bucket level and the requests waiting for the rate limiter.
+
+        Returns:
+            RateLimitMetrics: Snapshot of the rate limit scheduler.
+        """
+        return self.rate_limiter.metrics()
+
+    @staticmethod
+    def _flight_key(method: str, url: str, kwargs: Dict[str, Any]) -> Tuple[str, str, str, str]:
+        """
+        Identical requests have the same URL and arguments, and are sent in the same lane: a request of a fast lane
+        never waits for one queued in a slower lane.
+        """
+        return method, url, json.dumps(kwargs, sort_keys=True, default=str), current_lane()
+
+    def _request_with_retries(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request to Canvas through the rate limit scheduler, retrying when it fails.
+
+        A GET made while an identical one is in flight waits for it and shares its response instead of being sent.
+
+        Args:
+            method (str): The HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
+            url (str): The absolute URL.
+            **kwargs: Additional arguments to pass to the request.
+
+        Returns:
+            requests.Response: The successful response.
+
+        Raises:
+            requests.HTTPError: If the request still fails after all the attempts.
+        """
+        if method == "GET" and self.coalesce and not kwargs.get("stream"):
+            key = self._flight_key(method, url, kwargs)
+            return self.single_flight.do(
+                key, lambda: self._send_with_retries(method, url, **kwargs), timeout=remaining(), copy=_copy_response
+            )
+        return self._send_with_retries(method, url, **kwargs)
+
+    def _send_with_retries(self, method: str, url: str, revalidate: bool = True, **kwargs) -> requests.Response:
+        """
+        Send a request to Canvas through the rate limit scheduler, retrying when it fails.
+
+        Args:
+            method (str): The HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
+            url (str): The absolute URL.
+            revalidate (bool): Send the validators of a cached GET response, so that Canvas can answer 304.
+            **kwargs: Additional arguments to pass to the request, ``headers`` are added to the Canvas headers.
+
+        Returns:
+            requests.Response: The successful response.
+
+        Raises:
+            requests.HTTPError: If the request still fails after all the attempts.
+            DeadlineExceeded: If the deadline of the operation is reached first.
+        """
+        extra_headers = kwargs.pop("headers", None) or {}
+        headers = {**self.headers, **extra_headers}
+        cache_key: Optional[str] = None
+        if method == "GET" and self.response_cache is not None and not kwargs.get("stream"):
+            cache_key = self.response_cache.key(url, kwargs.get("params"), token=self.api_token)
+            if revalidate:
+                headers = {**headers, **self.response_cache.conditional_headers(cache_key)}
+
+        attempts = self.retry_policy.attempts
+        hedger = self.hedger if method == "GET" and not kwargs.get("stream") else None
+        for attempt in range(attempts):
+            retry_after: Optional[float] = None
+            if hedger is not None:
+                # A slow response is raced by a duplicate request, sent through the scheduler and rate limiter too
+                delay = hedger.delay(self.metrics, endpoint_template(method, url, self.base_url))
+                response = hedger.run(lambda: self._attempt(method, url, headers, **kwargs), delay)
+            else:
+                response = self._attempt(method, url, headers, **kwargs)
+
+            if response is not None:
+                try:
+                    response.raise_for_status()
+                    if cache_key is not None:
+                        response = self.response_cache.resolve(cache_key, response)  # type: ignore
+                        if response.status_code == 304:
+                            # The cached body was evicted or invalidated while the request was in flight
+                            Print(f"Cached response of {url} is gone, requesting it again", log_type="DEBUG")
+                            return self._send_with_retries(
+                                method, url, revalidate=False, headers=extra_headers, **kwargs
+                            )
+                    return response
+                except requests.HTTPError as http_err:
+                    Print(
+                        f"HTTP error occurred: {http_err} - {response.status_code} {response.reason}", log_type="ERROR"
+                    )
+                    Print(f"Response content: {response.content.decode('utf-8')}", log_type="ERROR")
+                    if not self.retry_policy.should_retry(response.status_code, response.text):
+                        raise
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if is_rate_limited(response.status_code, response.text):
+                        self.rate_limiter.throttle(retry_after)
+
+            if attempt + 1 < attempts:
+                self.metrics.record_retry(endpoint_template(method, url, self.base_url))
+                delay = self.retry_policy.delay(attempt, retry_after)
+                Print(f"Retrying in {delay:.1f} seconds (attempt {attempt + 1}/{attempts})...", log_type="ERROR")
+                sleep_within_deadline(delay, action=f"retrying {method} {url.split('?')[0]}")
+
+        raise requests.HTTPError(f"Failed to make request after {attempts} attempts")
+
+    def _attempt(self, method: str, url: str, headers: Dict[str, str], **kwargs) -> Optional[requests.Response]:
+        """Send a request once through the scheduler and the rate limiter, None if it failed without a response."""
+        response: Optional[requests.Response] = None
+        with self.scheduler.slot():  # Waits for the turn of the lane of the caller
+            self.rate_limiter.acquire()
+            try:
+                response = self._request(method, url, headers=headers, **kwargs)
+            except requests.RequestException as err:
+                Print(f"Other error occurred: {err}", log_type="ERROR")
+            finally:
+                self.rate_limiter.release(response.headers if response is not None else None)
+        return response
+
     def _make_request(self, method: Literal["GET", "PUT", "POST", "DELETE"], endpoint: str, **kwargs) -> dict:
         """
         Helper method to make HTTP requests and handle errors consistently.
@@ -56,28 +460,130 @@ class CanvasAPI:
             Optional[Any]: The parsed JSON response if successful, otherwise None.
         """
         url = f"{self.base_url}/api/v1/courses/{self.course_id}/{endpoint}"
-        attempts = 3
-        for attempt in range(attempts):
-            try:
-                response = requests.request(method, url, headers=self.headers, **kwargs)
-                response.raise_for_status()
-                return response.json()
-            except requests.HTTPError as http_err:
-                Print(f"HTTP error occurred: {http_err} - {response.status_code} {response.reason}", log_type="ERROR")
-                Print(f"Response content: {response.content.decode('utf-8')}", log_type="ERROR")
-                Print(f"Retrying in 1 second (attempt {attempt + 1}/{attempts})...", log_type="ERROR")
-                time.sleep(1)  # Wait for 1 second before retrying
-            except Exception as err:
-                Print(f"Other error occurred: {err}", log_type="ERROR")
+        if method == "GET" and self.coalesce:
+            # Identical GETs in flight share the parsing of the response too, every caller gets its own copy
+            key = ("json", *self._flight_key(method, url, kwargs))
+            return self.single_flight.do(
+                key,
+                lambda: self._send_with_retries(method, url, **kwargs).json(),
+                timeout=remaining(),
+                copy=copy.deepcopy,
+            )
+        return self._request_with_retries(method, url, **kwargs).json()
 
-        raise requests.HTTPError(f"Failed to make request after {attempts} attempts")
+    def _invalidate_cache(self, *endpoints: str):
+        """
+        Drop the cached responses of resources that were just modified.
+
+        Args:
+            *endpoints (str): Endpoint prefixes after /courses/{course_id}, "pages" drops every page and listing.
+        """
+        if self.response_cache is None:
+            return
+        for endpoint in endpoints:
+            self.response_cache.invalidate(f"{self.base_url}/api/v1/courses/{self.course_id}/{endpoint}")
+
+    def _resolve_title(
+        self, kind: str, title: str, list_ids: Callable[[], Dict[str, MetadataId]], refresh: bool = False
+    ) -> Optional[MetadataId]:
+        """
+        Resolve a title with the metadata cache, listing the titles of its kind again on a miss.
+
+        Args:
+            kind (str): The kind of resource, e.g. "assignments".
+            title (str): The title to resolve.
+            list_ids (Callable): Lists every id of the kind by title, the first of duplicate titles wins.
+            refresh (bool): List the titles again even if the title is cached.
+
+        Returns:
+            Optional[MetadataId]: The id, None if no resource has this title.
+        """
+        if not refresh:
+            cached = self.metadata.lookup(kind, title)
+            if cached is not None:
+                return cached
+        self.metadata.replace(kind, list_ids())
+        return self.metadata.lookup(kind, title)
+
+    def _fetch_by_title(
+        self,
+        kind: str,
+        title: str,
+        list_ids: Callable[[], Dict[str, MetadataId]],
+        fetch: Callable[[Any], T],
+        title_of: Callable[[T], str],
+        refresh: bool = False,
+    ) -> Optional[T]:
+        """
+        Resolve a title and fetch the resource, resolving it again if it was deleted or renamed since it was cached.
+
+        Args:
+            kind (str): The kind of resource, e.g. "assignments".
+            title (str): The title to resolve.
+            list_ids (Callable): Lists every id of the kind by title, see _resolve_title.
+            fetch (Callable): Fetches the resource by id.
+            title_of (Callable): The current title of the fetched resource.
+            refresh (bool): List the titles again even if the title is cached.
+
+        Returns:
+            Optional[T]: The resource, None if no resource has this title.
+        """
+        resolved = self._resolve_title(kind, title, list_ids, refresh)
+        if resolved is None:
+            return None
+        try:
+            fetched = fetch(resolved)
+            if refresh or self.metadata.key(kind, title_of(fetched)) == self.metadata.key(kind, title):
+                return fetched
+        except requests.HTTPError as e:
+            if refresh or e.response is None or e.response.status_code != 404:
+                raise
+        Print(f"{kind} '{title}' was deleted or renamed, listing the {kind} again", log_type="WARN")
+        return self._fetch_by_title(kind, title, list_ids, fetch, title_of, refresh=True)
 
-    def get_users_in_course(
+    def iter_paginated(
         self,
-    ) -> List[UsersSchema]:
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        per_page: int = 100,
+        schema: Optional[Callable[..., T]] = None,
+        decode: Optional[DecodeMode] = None,
+    ) -> Iterator[T]:
+        """
+        Lazily iterate over every item of a paginated Canvas list endpoint.
+
+        Pages are requested one at a time while the caller consumes the items, following the
+        'Link: rel="next"' header until Canvas reports no more pages.
+
+        Args:
+            endpoint (str): The endpoint part of the URL after /courses/{course_id}.
+            params (Dict, optional): Query parameters for the first page, the next page URLs already contain them.
+            per_page (int): Number of items requested per page (Canvas caps it at 100).
+            schema (Callable, optional): Schema used to validate every item, raw dictionaries are yielded if None.
+            decode (DecodeMode, optional): How the pages are decoded into the schema, the CanvasAPI default if None.
+
+        Yields:
+            T: Every item of every page, validated with the schema.
+
+        Example:
+            >>> for module in canvas.iter_paginated("modules", schema=ModuleSchema):
+            ...     print(module.name)
+        """
+        url: Optional[str] = f"{self.base_url}/api/v1/courses/{self.course_id}/{endpoint}"
+        page_params: Optional[Dict[str, Any]] = {**(params or {}), "per_page": per_page}
+        while url:
+            response = self._request_with_retries("GET", url, params=page_params)
+            yield from decode_list(response.content, schema, decode or self.decode)
+            url = self.__get_next_page(response)
+            page_params = None  # The next page URL already has the query parameters
+
+    def get_users_in_course(self, per_page: int = 100) -> List[UsersSchema]:
         """
         Retrieve active users enrolled in the course.
 
+        Args:
+            per_page (int): Number of users requested per page.
+
         Returns:
             List[User]: A list of user dictionaries containing:
                 - id (int): User ID
@@ -87,23 +593,10 @@ class CanvasAPI:
                 - short_name (str): Short display name
                 - email (str): Email address
         """
+        if self.backend == "graphql":
+            return sorted(self.graphql.users(), key=lambda user: user["email"])
         params = {"sort": "email", "enrollment_state": "active"}
-        users: List[UsersSchema] = []
-        endpoint = "users"
-
-        while endpoint:
-            response = requests.get(
-                f"{self.base_url}/api/v1/courses/{self.course_id}/{endpoint}",
-                headers=self.headers,
-                params=params,
-            )
-            response.raise_for_status()  # Ensure we handle any errors
-            data = response.json()
-            users.extend(data)
-            # Handle pagination
-            endpoint = self.__get_next_page(response)
-            params = {}  # Clear params after the first request
-        return users
+        return list(self.iter_paginated("users", params, per_page=per_page, schema=UsersSchema))
 
     def get_student_grade(self, assignment_id: int, user_id: int) -> str:
         """
@@ -137,27 +630,223 @@ class CanvasAPI:
         updated_submission = self._make_request("PUT", endpoint, json=data)
         return updated_submission.get("grade", "No grade available")
 
-    def get_submissions(self, assignment_id: int) -> List[SubmissionSchema]:
+    def bulk_update_grades(
+        self,
+        assignment_id: int,
+        grades: Dict[int, float],
+        batch_size: int = 500,
+        wait: bool = True,
+        poll_interval: float = 1.0,
+        timeout: float = 300.0,
+    ) -> List[ProgressSchema]:
+        """
+        Update the grades of many students with as few requests as possible.
+
+        Canvas applies the grades in a background job and returns a Progress object for it. The grades are sent
+        in batches of ``batch_size`` students, one job per batch.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            grades (Dict[int, float]): The new grade of every user ID.
+            batch_size (int): Maximum number of students per job.
+            wait (bool): Whether to poll every job until it finishes.
+            poll_interval (float): Seconds between two polls of a job.
+            timeout (float): Seconds to wait for each job before giving up.
+
+        Returns:
+            List[ProgressSchema]: The progress of every job, completed if ``wait`` is True.
+
+        Raises:
+            requests.HTTPError: If a job could not be created or failed.
+            TimeoutError: If a job did not finish in time.
+
+        Example:
+            >>> canvas.bulk_update_grades(1192803, {143898: 95, 140799: 87.5})
+        """
+        endpoint = f"assignments/{assignment_id}/submissions/update_grades"
+        user_ids = list(grades)
+        jobs: List[ProgressSchema] = []
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start : start + batch_size]
+            data = {"grade_data": {str(user_id): {"posted_grade": grades[user_id]} for user_id in batch}}
+            progress = ProgressSchema(**self._make_request("POST", endpoint, json=data))
+            Print(f"Submitted grades of {len(batch)} students (job {progress.id})", log_type="INFO")
+            jobs.append(progress)
+        if wait:
+            jobs = [self.wait_for_progress(job, poll_interval=poll_interval, timeout=timeout) for job in jobs]
+        return jobs
+
+    def get_progress(self, progress_id: int) -> ProgressSchema:
+        """
+        Retrieve the state of a Canvas background job.
+
+        Args:
+            progress_id (int): The ID of the Progress object.
+
+        Returns:
+            ProgressSchema: The current state of the job.
+        """
+        url = f"{self.base_url}/api/v1/progress/{progress_id}"
+        return ProgressSchema(**self._request_with_retries("GET", url).json())
+
+    def wait_for_progress(
+        self, progress: ProgressSchema, poll_interval: float = 1.0, timeout: float = 300.0
+    ) -> ProgressSchema:
+        """
+        Poll a Canvas background job until it completes.
+
+        Args:
+            progress (ProgressSchema): The job to wait for.
+            poll_interval (float): Seconds between two polls.
+            timeout (float): Seconds to wait before giving up.
+
+        Returns:
+            ProgressSchema: The completed job.
+
+        Raises:
+            requests.HTTPError: If the job failed.
+            TimeoutError: If the job did not finish in time.
+            DeadlineExceeded: If the deadline of the operation is reached first.
+        """
+        deadline = time.monotonic() + timeout
+        while progress.workflow_state in ("queued", "running"):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Job {progress.id} did not finish after {timeout} seconds")
+            sleep_within_deadline(poll_interval, action=f"polling job {progress.id}")
+            progress = self.get_progress(progress.id)
+            Print(f"Job {progress.id} is {progress.workflow_state} ({progress.completion or 0:.0f}%)")
+        if progress.workflow_state == "failed":
+            raise requests.HTTPError(f"Job {progress.id} failed: {progress.message}")
+        return progress
+
+    def iter_submissions(
+        self, assignment_id: int, per_page: int = 100, decode: Optional[DecodeMode] = None
+    ) -> Iterator[SubmissionSchema]:
+        """
+        Lazily iterate over the submissions for a specific assignment, page by page.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            per_page (int): Number of submissions requested per page.
+            decode (DecodeMode, optional): How the pages are decoded, the CanvasAPI default if None.
+
+        Returns:
+            Iterator[SubmissionSchema]: Every submission, including its attachments.
+        """
+        if self.backend == "graphql":
+            return iter(self.graphql.submissions(assignment_id))
+        params = {"include[]": "attachments"}
+        endpoint = f"assignments/{assignment_id}/submissions"
+        return self.iter_paginated(endpoint, params, per_page=per_page, schema=SubmissionSchema, decode=decode)
+
+    def get_submissions(
+        self, assignment_id: int, per_page: int = 100, decode: Optional[DecodeMode] = None
+    ) -> List[SubmissionSchema]:
         """
         Retrieve all submissions for a specific assignment.
 
         Args:
             assignment_id (int): The ID of the assignment.
+            per_page (int): Number of submissions requested per page.
+            decode (DecodeMode, optional): How the pages are decoded, the CanvasAPI default if None.
 
         Returns:
             List[Dict]: A list of submission dictionaries.
         """
-        params = {"include[]": "attachments"}
-        submissions = self._make_request("GET", f"assignments/{assignment_id}/submissions", params=params)
-        return [SubmissionSchema(**submission) for submission in submissions]
+        return list(self.iter_submissions(assignment_id, per_page=per_page, decode=decode))
+
+    def get_roster_and_submissions(self, assignment_id: int) -> Tuple[List[UsersSchema], List[SubmissionSchema]]:
+        """
+        Retrieve the users of the course and the submissions of an assignment, and refresh the roster cache.
+
+        With the GraphQL backend both are fetched in the same paginated query, with REST they are two listings.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+
+        Returns:
+            Tuple[List[UsersSchema], List[SubmissionSchema]]: The users and the submissions.
+        """
+        if self.backend == "graphql":
+            users, submissions = self.graphql.roster_and_submissions(assignment_id)
+            users.sort(key=lambda user: user["email"])
+        else:
+            users, submissions = self.get_users_in_course(), self.get_submissions(assignment_id)
+        self.roster.prime(users)
+        return users, submissions
+
+    def iter_student_submissions(
+        self,
+        assignment_id: int,
+        user_ids: Optional[List[int]] = None,
+        per_page: int = 100,
+        decode: Optional[DecodeMode] = None,
+        **since: str,
+    ) -> Iterator[SubmissionSchema]:
+        """
+        Lazily iterate over the submissions of an assignment, filtered by student and by date.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            user_ids (List[int], optional): Only the submissions of these students, every student if None.
+            per_page (int): Number of submissions requested per page.
+            decode (DecodeMode, optional): How the pages are decoded, the CanvasAPI default if None.
+            **since (str): ``submitted_since`` and/or ``graded_since``, ISO 8601 timestamps.
 
-    def download_all_submission_attachments(self, assignment_id: int, download_dir: Optional[str] = None) -> List[str]:
+        Returns:
+            Iterator[SubmissionSchema]: The matching submissions, including their attachments.
+        """
+        params = {
+            "assignment_ids[]": [assignment_id],
+            "student_ids[]": user_ids if user_ids is not None else ["all"],
+            "include[]": "attachments",
+            **since,
+        }
+        return self.iter_paginated(
+            "students/submissions", params, per_page=per_page, schema=SubmissionSchema, decode=decode
+        )
+
+    def sync_submissions(self, assignment_id: int, user_ids: Optional[List[int]] = None) -> List[SubmissionSchema]:
+        """
+        Bring the submission store up to date and return the submissions.
+
+        The first sync lists every submission, or only those of ``user_ids`` with the ``student_ids[]`` filter.
+        The next ones only ask for the submissions submitted or graded since the previous sync, which is nothing
+        most of the time, and merge them into the store.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            user_ids (List[int], optional): The students whose submissions are needed, every student if None.
+
+        Returns:
+            List[SubmissionSchema]: The current submissions of the students.
+        """
+        started_at = (datetime.now(timezone.utc) - timedelta(seconds=SYNC_OVERLAP)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        since = self.submission_store.synced_at(assignment_id, user_ids)
+        if since is not None:
+            changed = [
+                *self.iter_student_submissions(assignment_id, user_ids, submitted_since=since),
+                *self.iter_student_submissions(assignment_id, user_ids, graded_since=since),
+            ]
+        elif user_ids is not None:
+            changed = list(self.iter_student_submissions(assignment_id, user_ids))
+        else:
+            changed = list(self.iter_submissions(assignment_id))
+        self.submission_store.merge(assignment_id, changed, started_at, user_ids)
+        return self.submission_store.submissions(assignment_id, user_ids)
+
+    def download_all_submission_attachments(
+        self, assignment_id: int, download_dir: Optional[str] = None, manifest_path: Optional[str] = None
+    ) -> List[str]:
         """
         Download all submission files for a specific assignment.
 
         Args:
             assignment_id (int): The ID of the assignment.
             download_dir (str, optional): Directory to save files. Defaults to current directory.
+            manifest_path (str, optional): Download manifest of the assignment. When given, attachments that did
+                                           not change since the last run are skipped and interrupted downloads
+                                           are resumed.
 
         Returns:
             List[str]: List of paths to downloaded files.
@@ -165,28 +854,43 @@ class CanvasAPI:
         download_dir = download_dir or os.getcwd()
         if not os.path.isdir(download_dir):
             raise ValueError(f"Invalid download directory: {download_dir}")
+        manifest = DownloadManifest(manifest_path, assignment_id) if manifest_path else None
 
-        downloaded_files = []
-        for submission in self.get_submissions(assignment_id):
+        jobs, attachments, skipped_files = [], [], []
+        for submission in self.sync_submissions(assignment_id):
             if not submission.attachments:
                 Print(f"No attachments found for submission {submission.user_id}", log_type="WARN")
                 continue
             folder_path = os.path.join(download_dir, str(submission.user_id))
             os.makedirs(folder_path, exist_ok=True)
             for attachment in submission.attachments:
-                file_url = attachment["url"]
-                filename = attachment["filename"]
-                filepath = os.path.join(folder_path, f"{filename}")
-                response = requests.get(file_url, headers=self.headers)
-                response.raise_for_status()
-                with open(filepath, "wb") as f:
-                    f.write(response.content)
-                downloaded_files.append(filepath)
-                Print(f"Downloaded {filename} to {filepath}", log_type="INFO")
-        return downloaded_files
+                if manifest and manifest.is_current(attachment):
+                    skipped_files.extend(manifest.get(attachment["id"])["files"])
+                    continue
+                filepath = os.path.join(folder_path, f"{attachment['filename']}")
+                jobs.append(DownloadJob(attachment["url"], filepath, attachment.get("size")))
+                attachments.append(attachment)
+
+        if not manifest:
+            return [result["path"] for result in self.downloader.download_many(jobs)]
+
+        Print(f"Skipping {len(skipped_files)} unchanged attachments", log_type="INFO")
+        try:
+            results = self.downloader.download_many(
+                jobs, resume=True, on_complete=lambda index, result: manifest.record(attachments[index], result)
+            )
+        finally:
+            # Keep track of the files that did download, so that a failed run can be resumed
+            manifest.save()
+        return skipped_files + [result["path"] for result in results]
 
     def download_student_submission_attachments(
-        self, assignment_id: int, user_id: int, download_dir: Optional[str] = None
+        self,
+        assignment_id: int,
+        user_id: int,
+        download_dir: Optional[str] = None,
+        manifest_path: Optional[str] = None,
+        submissions: Optional[List[SubmissionSchema]] = None,
     ) -> List[str]:
         """
         Download submission files for a specific student's assignment.
@@ -195,6 +899,11 @@ class CanvasAPI:
             assignment_id (int): The ID of the assignment.
             student_id (int): The ID of the student.
             download_dir (str, optional): Directory to save files. Defaults to current directory.
+            manifest_path (str, optional): Download manifest of the assignment. When given, attachments that did
+                                           not change since the last run are skipped and interrupted downloads
+                                           are resumed.
+            submissions (List[SubmissionSchema], optional): The submissions of the assignment, when already
+                                                            fetched for several students. Synced if None.
 
         Returns:
             List[str]: List of paths to downloaded files.
@@ -203,9 +912,12 @@ class CanvasAPI:
             os.makedirs(download_dir, exist_ok=True)
         else:
             download_dir = os.getcwd()
+        manifest = DownloadManifest(manifest_path, assignment_id) if manifest_path else None
 
         downloaded_files = []
-        for submission in self.get_submissions(assignment_id):
+        if submissions is None:
+            submissions = self.sync_submissions(assignment_id, [user_id])
+        for submission in submissions:
             if submission.user_id != user_id:
                 Print(
                     f"skipping submission for student {user_id}, the submission belongs to {submission.user_id}",
@@ -217,27 +929,38 @@ class CanvasAPI:
                 Print(f"No attachments found for student {user_id}", log_type="WARN")
                 return []
 
+            jobs, attachments = [], []
             for attachment in submission.attachments:
-                file_url = attachment["url"]
-                filename = attachment["filename"]
-                filepath = os.path.join(download_dir, f"{filename}")
-                response = requests.get(file_url, headers=self.headers)
-                response.raise_for_status()
-                with open(filepath, "wb") as f:
-                    f.write(response.content)
+                if manifest and manifest.is_current(attachment):
+                    Print(f"Skipping {attachment['filename']}, unchanged since the last download", log_type="INFO")
+                    downloaded_files.extend(manifest.get(attachment["id"])["files"])
+                    continue
+                filepath = os.path.join(download_dir, f"{attachment['filename']}")
+                jobs.append(DownloadJob(attachment["url"], filepath, attachment.get("size")))
+                attachments.append(attachment)
+
+            files_by_job: Dict[int, List[str]] = {}
+
+            def on_complete(index: int, result: DownloadResult):
+                attachment = attachments[index]
+                filepath = result["path"]
+                filename = os.path.basename(filepath)
                 if filename.endswith(".zip"):
                     Print(f"Unzipping {filename} to {download_dir}", log_type="INFO")
                     # Unzip the files to the download_dir
                     with zipfile.ZipFile(filepath, "r") as zip_ref:
                         zip_ref.extractall(download_dir)
                         # add all the files to the downloaded_files list
-                        downloaded_files.extend(zip_ref.namelist())
+                        files_by_job[index] = zip_ref.namelist()
 
                     # Move the files back a directory, skipping if target exists
+                    extracted_files = []
                     for file in zip_ref.namelist():
                         src = os.path.join(download_dir, file)
                         dst = os.path.join(download_dir, os.path.basename(file))
                         Print(f"src = {src}, dst = {dst}")
+                        if not file.endswith("/"):
+                            extracted_files.append(dst)
                         if os.path.exists(dst):
                             Print(f"Skipping {file} as it already exists at destination", log_type="WARN")
                             continue
@@ -246,55 +969,78 @@ class CanvasAPI:
                     # remove the old zip directory
                     shutil.rmtree(filepath.replace(".zip", ""))  # Remove the folder where the fils were extracted
                     os.remove(filepath)  # Remove the zip file
-                    continue
-                downloaded_files.append(filepath)
-                Print(f"Downloaded {filename} to {filepath}", log_type="INFO")
+                    if manifest:
+                        manifest.record(attachment, result, extracted_files)
+                    return
+                files_by_job[index] = [filepath]
+                if manifest:
+                    manifest.record(attachment, result)
+
+            try:
+                self.downloader.download_many(jobs, resume=bool(manifest), on_complete=on_complete)
+            finally:
+                # Keep track of the files that did download, so that a failed run can be resumed
+                if manifest:
+                    manifest.save()
+            for index in sorted(files_by_job):
+                downloaded_files.extend(files_by_job[index])
             break
 
         return downloaded_files
 
     def get_user_id_by_email(self, email: str) -> Optional[int]:
         """
-        Get the ID of a student by their email.
+        Get the ID of a student by their email, looked up in the cached roster.
         """
         if self.course_id == 15319:  # TODO: Temp while testing only, because there is no other student others
             return 143898
 
-        users = self.get_users_in_course()
-        Print(f"users = {users}", log_type="DEBUG")
-        for user in users:
-            if user["email"].strip().lower() == email.strip().lower():
-                return user["id"]
-        return None
+        user = self.roster.by_email(email)
+        return user["id"] if user else None
 
-    def get_assignments(self) -> List[AssignmentSchema]:
+    def get_assignments(self, per_page: int = 100) -> List[AssignmentSchema]:
         """
         Retrieve all assignments in the course.
 
+        Args:
+            per_page (int): Number of assignments requested per page.
+
         Returns:
             List[AssignmentSchema]: A list of assignment dictionaries.
         """
-        endpoint = "assignments"
-        assignments_ = self._make_request("GET", endpoint)
-        assignments: List[AssignmentSchema] = []
-        for assignment in assignments_:
-            assignments.append(AssignmentSchema(**assignment))
-        return assignments
+        return list(self.iter_paginated("assignments", per_page=per_page, schema=AssignmentSchema))
 
-    def get_assignment_by_title(self, assignment_title) -> int:
+    def get_assignment_by_title(self, assignment_title: str, refresh: bool = False) -> int:
         """
-        Gets assignment id based on title
+        Gets assignment id based on title, from the metadata cache when it was already resolved.
+
+        A cached id is checked with a request for the assignment, the assignments are listed again if it was deleted
+        or renamed.
+
+        Args:
+            assignment_title (str): The title, ignoring case and surrounding spaces.
+            refresh (bool): List the assignments again even if the title is cached.
 
         Returns:
             Assignment ID if it exists
+
+        Raises:
+            ValueError: If no assignment has this title.
         """
-        assignments = self.get_assignments()
-        for assignment in assignments:
-            if assignment.name.strip().lower() == assignment_title.strip().lower():
-                return assignment.id
-        raise ValueError(
-            f"Assignment with title '{assignment_title}' not found. The assignments are {[a.name for a in assignments]}"
+        assignment = self._fetch_by_title(
+            "assignments",
+            assignment_title,
+            lambda: {assignment.name: assignment.id for assignment in reversed(self.get_assignments())},
+            lambda assignment_id: AssignmentSchema(**self._make_request("GET", f"assignments/{assignment_id}")),
+            lambda assignment: assignment.name,
+            refresh,
         )
+        if assignment is None:
+            raise ValueError(
+                f"Assignment with title '{assignment_title}' not found. "
+                f"The assignments are {self.metadata.titles('assignments')}"
+            )
+        return assignment.id
 
     def create_announcement(self, title: str, message: str) -> Dict:
         """
@@ -388,12 +1134,31 @@ class CanvasAPI:
                     return next_url
         return None
 
-    def _create_quiz_with_questions(self, validated_quiz: QuizSchema) -> Dict:
+    def delete_quiz(self, quiz_id: int) -> Dict:
+        """
+        Delete a quiz of the course.
+
+        Args:
+            quiz_id (int): The ID of the quiz.
+
+        Returns:
+            Dict: The deleted quiz data.
+        """
+        quiz = self._make_request("DELETE", f"quizzes/{quiz_id}")
+        self._invalidate_cache("quizzes")
+        return quiz
+
+    def _create_quiz_with_questions(self, validated_quiz: QuizSchema, max_workers: int = 8) -> Dict:
         """
         Create a quiz and add multiple questions based on the provided data.
 
+        The questions are added concurrently, each one with its explicit ``position`` so the order of the quiz
+        does not depend on which request finishes first. If any question cannot be added after retries, the
+        quiz is deleted so no half-built quiz is left in the course.
+
         Args:
             validated_quiz (QuizSchema): An instance of QuizSchema containing the quiz information and questions.
+            max_workers (int): Number of questions added at the same time.
 
         Returns:
             Dict: The created quiz data.
@@ -412,34 +1177,46 @@ class CanvasAPI:
             shuffle_answers=validated_quiz.shuffle_answers,
             allowed_attempts=validated_quiz.allowed_attempts,
         )
+        if not quiz.get("id"):
+            raise ValueError(f"Quiz '{validated_quiz.title}' has no ID after creation.")
+
         # Step 2: Add questions to the quiz
-        for idx, question in enumerate(validated_quiz.questions, start=1):
-            question_dict = question.model_dump()
-            question_data = {"question": question_dict}
+        def add_question(position: int, question: Question):
+            question_data = {"question": {**question.model_dump(), "position": position}}
             added_question = self._add_question_to_quiz(quiz["id"], question_data)
             if not added_question:
                 raise requests.HTTPError(f"Failed to add question '{question.question_name}' to the quiz.")
 
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="canvas-quiz") as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, add_question, position, question)
+                    for position, question in enumerate(validated_quiz.questions, start=1)
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except Exception:
+                    # Drop the questions not sent yet and wait for the ones in flight before deleting the quiz
+                    executor.shutdown(cancel_futures=True)
+                    raise
+        except Exception as e:
+            Print(f"Deleting quiz '{validated_quiz.title}', a question could not be added: {e}", log_type="ERROR")
+            self.delete_quiz(quiz["id"])
+            raise
+
         Print(f"Quiz '{validated_quiz.title}' created successfully with all questions added.", log_type="INFO")
         return quiz
 
-    def create_quiz_from_file(self, file_path: str) -> Dict:
+    def _read_quiz_file(self, file_path: str) -> QuizSchema:
         """
-        Create a quiz by reading quiz data from a JSON file.
-
-        Args:
-            file_path (str): Path to the JSON file containing quiz data.
-
-        Returns:
-            Dict: The created quiz data.
+        Read and validate the quiz data of a JSON file.
 
         Raises:
             FileNotFoundError: If the file does not exist.
             ValueError: If the file content cannot be parsed as JSON.
             ValidationError: If the file content does not conform to the QuizSchema.
-            requests.HTTPError: If the quiz creation or question addition fails after retries.
         """
-
         # Step 1: Check if the file exists
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"The file '{file_path}' does not exist.")
@@ -452,10 +1229,146 @@ class CanvasAPI:
             raise ValueError(f"Failed to parse JSON file: {e}")
 
         # Unpacking the JSON data into the schema, would raise errors if the data is invalid
-        validated_quiz = QuizSchema(**quiz_data)
+        return QuizSchema(**quiz_data)
+
+    def create_quiz_from_file(self, file_path: str, engine: Literal["rest", "qti"] = "rest") -> Dict:
+        """
+        Create a quiz by reading quiz data from a JSON file.
+
+        Args:
+            file_path (str): Path to the JSON file containing quiz data.
+            engine (str): "rest" creates the quiz and then each question with its own request, "qti" imports the
+                          quiz with all its questions as a QTI package, see import_quizzes.
+
+        Returns:
+            Dict: The created quiz data.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file content cannot be parsed as JSON.
+            ValidationError: If the file content does not conform to the QuizSchema.
+            requests.HTTPError: If the quiz creation or question addition fails after retries.
+        """
+        return self.create_quizzes_from_files([file_path], engine=engine)[0]
+
+    def create_quizzes_from_files(self, file_paths: List[str], engine: Literal["rest", "qti"] = "rest") -> List[Dict]:
+        """
+        Create the quizzes of many JSON files.
 
-        # Step 3: Validate and create the quiz with questions
-        return self._create_quiz_with_questions(validated_quiz)
+        With the "qti" engine every quiz goes into one QTI package imported by a single content migration, so the
+        number of requests does not grow with the number of quizzes or questions. Quizzes using a question type
+        that QTI packages cannot express, or a title already used by another quiz of the package (the imported
+        quizzes are found by title), are created with the "rest" engine instead.
+
+        Args:
+            file_paths (List[str]): Paths to the JSON files containing quiz data.
+            engine (str): "qti" to import the quizzes in one content migration, "rest" to create them one by one.
+
+        Returns:
+            List[Dict]: The created quizzes, in the same order as the files.
+
+        Raises:
+            FileNotFoundError: If a file does not exist.
+            ValueError: If a file content cannot be parsed as JSON.
+            ValidationError: If a file content does not conform to the QuizSchema.
+            requests.HTTPError: If the quiz creation fails after retries.
+
+        Example:
+            >>> quizzes = canvas.create_quizzes_from_files(["team1/quiz.json", "team2/quiz.json"])
+            >>> [quiz["html_url"] for quiz in quizzes]
+        """
+        validated_quizzes = [self._read_quiz_file(file_path) for file_path in file_paths]
+        created: Dict[int, Dict] = {}
+        to_import: List[int] = []
+        imported_titles = set()
+        for index, validated_quiz in enumerate(validated_quizzes):
+            supported = all(q.question_type in SUPPORTED_QUESTION_TYPES for q in validated_quiz.questions)
+            if engine == "qti" and supported and validated_quiz.title not in imported_titles:
+                to_import.append(index)
+                imported_titles.add(validated_quiz.title)
+            else:
+                created[index] = self._create_quiz_with_questions(validated_quiz)
+        if to_import:
+            imported = self.import_quizzes([validated_quizzes[index] for index in to_import])
+            created.update(zip(to_import, imported))
+        return [created[index] for index in range(len(validated_quizzes))]
+
+    def import_quizzes(
+        self, quizzes: List[QuizSchema], poll_interval: float = 2.0, timeout: float = 600.0
+    ) -> List[Dict]:
+        """
+        Create quizzes with a single content migration instead of one request per quiz and per question.
+
+        The quizzes are compiled into a QTI package in memory, which is uploaded as the attachment of a
+        "qti_converter" content migration. Once Canvas has imported it, the quizzes are looked up by title, so
+        the titles must be distinct.
+
+        Args:
+            quizzes (List[QuizSchema]): The quizzes to create, their question types must be SUPPORTED_QUESTION_TYPES.
+            poll_interval (float): Seconds between two polls of the migration.
+            timeout (float): Seconds to wait for the migration before giving up.
+
+        Returns:
+            List[Dict]: The created quizzes, in the same order.
+
+        Raises:
+            ValueError: If a question type cannot be imported, two quizzes have the same title, or a quiz is missing
+                        after the import.
+            requests.HTTPError: If the migration fails.
+            TimeoutError: If the migration did not finish in time.
+        """
+        titles = [quiz.title for quiz in quizzes]
+        duplicates = sorted({title for title in titles if titles.count(title) > 1})
+        if duplicates:
+            # Both quizzes would be matched to the same imported quiz
+            raise ValueError(f"Quizzes imported together need distinct titles, {duplicates} are used more than once")
+        package = build_qti_package(quizzes)
+        Print(f"Importing {len(quizzes)} quizzes in a QTI package of {len(package)} bytes", log_type="INFO")
+
+        # Step 1: Create the migration, Canvas answers with where to upload the package
+        data = {
+            "migration_type": "qti_converter",
+            "pre_attachment": {"name": "quizzes.zip", "size": len(package), "content_type": "application/zip"},
+        }
+        migration = self._make_request("POST", "content_migrations", json=data)
+        upload_info = migration["pre_attachment"]
+
+        # Step 2: Upload the package, the migration starts once the file is confirmed
+        upload_response = self._request_with_retries(
+            "POST",
+            upload_info["upload_url"],
+            data=upload_info["upload_params"],
+            files={upload_info.get("file_param", "file"): ("quizzes.zip", package, "application/zip")},
+            allow_redirects=False,
+        )
+        if upload_response.is_redirect:
+            self._request_with_retries("GET", upload_response.headers["Location"])
+
+        # Step 3: Wait for the import
+        progress_id = int(migration["progress_url"].rstrip("/").split("/")[-1])
+        self.wait_for_progress(self.get_progress(progress_id), poll_interval=poll_interval, timeout=timeout)
+        self._invalidate_cache("quizzes")
+
+        # Step 4: Find the created quizzes, the newest one wins over older quizzes of the course with the same title
+        by_title = self.get_quizzes_by_title()
+        missing = [quiz.title for quiz in quizzes if quiz.title not in by_title]
+        if missing:
+            raise ValueError(f"Migration {migration['id']} did not create the quizzes {missing}")
+        Print(f"Imported {len(quizzes)} quizzes with migration {migration['id']}", log_type="INFO")
+        return [by_title[quiz.title] for quiz in quizzes]
+
+    def get_quizzes_by_title(self) -> Dict[str, Dict]:
+        """
+        List the quizzes of the course by title.
+
+        Returns:
+            Dict[str, Dict]: The newest quiz of every title, older quizzes with the same title are left out.
+        """
+        by_title: Dict[str, Dict] = {}
+        for quiz in self.iter_paginated("quizzes"):
+            if quiz["title"] not in by_title or quiz["id"] > by_title[quiz["title"]]["id"]:
+                by_title[quiz["title"]] = quiz
+        return by_title
 
     def get_public_file_url(self, file_id: int) -> str:
         """
@@ -468,17 +1381,25 @@ class CanvasAPI:
             str: The public URL for the file.
         """
         url = f"{self.base_url}/api/v1/files/{file_id}/public_url"
-        response = requests.get(url, headers=self.headers).json()
+        response = self._request("GET", url, headers=self.headers).json()
         return response["public_url"]
 
         return response["url"]
 
-    def upload_file(self, file_path: str) -> str:
+    def upload_file(
+        self,
+        file_path: str,
+        host_limiter: Optional[HostLimiter] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
         """
         Upload an image to the course's files.
 
         Args:
             file_path (str): The local path to the image file (e.g., '/path/to/image.png').
+            host_limiter (HostLimiter, optional): Caps the concurrent requests to each host when many uploads
+                                                  run in parallel, see UploadExecutor.
+            progress (Callable, optional): Called with (bytes sent, total bytes) while the file is sent.
 
         Returns:
             str: public URL .
@@ -502,6 +1423,14 @@ class CanvasAPI:
             raise ValueError("Cannot upload an empty file.")
         Print("File size = ", file_size)
 
+        # Skip the upload if a file with the same content was already uploaded to the course
+        digest = sha256_file(file_path) if self.upload_index is not None else None
+        if digest is not None:
+            existing_url = self._find_uploaded_file(digest, file_size)
+            if existing_url:
+                Print(f"'{file_path}' was already uploaded, reusing {existing_url}", log_type="INFO")
+                return existing_url
+
         # Step 3: Initiate the file upload
         file_name = os.path.basename(file_path)
         Print("file_name = ", file_name)
@@ -515,16 +1444,22 @@ class CanvasAPI:
             "Authorization": f"Bearer {self.api_token}",
         }
 
+        slot = host_limiter.slot if host_limiter else lambda url: contextlib.nullcontext()
+
         # Using _make_request to initiate the file upload
-        upload_info = self._make_request("POST", "files", json=data)
+        with slot(self.base_url):
+            upload_info = self._make_request("POST", "files", json=data)
 
         # Step 2: Upload the file to the pre-signed URL
         upload_url = upload_info["upload_url"]
         upload_params = upload_info["upload_params"]
 
-        with open(file_path, "rb") as file_data:
-            files = {"file": (file_name, file_data)}
-            upload_response = requests.post(upload_url, data=upload_params, files=files)
+        # The body is streamed from disk instead of being built in memory
+        body = MultipartEncoder(upload_params, upload_info.get("file_param", "file"), file_path, progress=progress)
+        with body, slot(upload_url):
+            upload_response = self._request(
+                "POST", upload_url, data=body, headers={"Content-Type": body.content_type}, allow_redirects=False
+            )
             try:
                 upload_response.raise_for_status()
             except requests.HTTPError as e:
@@ -534,7 +1469,14 @@ class CanvasAPI:
                 raise
 
         # Step 5: Confirm the file upload and retrieve
-        if upload_response.status_code == 201:
+        if upload_response.is_redirect:
+            # The storage host redirects to Canvas, which only creates the file once the redirect is followed
+            location = upload_response.headers["Location"]
+            with slot(location):
+                upload_response = self._request_with_retries("GET", location)
+            Print(f"File '{file_name}' uploaded successfully!")
+            return self._remember_upload(digest, upload_response.json())
+        if upload_response.status_code in (200, 201):
             Print(f"File '{file_name}' uploaded successfully!")
             # The file URI is usually returned as part of the upload_info or can be constructed from the file details
             """
@@ -579,38 +1521,113 @@ class CanvasAPI:
             """
 
             # self.get_public_file_url(upload_response.json()["id"]),
-            return upload_response.json()["url"]
+            return self._remember_upload(digest, upload_response.json())
         else:
             raise requests.HTTPError(f"File upload failed with status: {upload_response.status_code}")
 
-    def list_modules(self) -> List[ModuleSchema]:
+    def _find_uploaded_file(self, sha256: str, size: int) -> Optional[str]:
+        """Return the URL of a course file with this content, reconciling the upload index once per session."""
+        entry = self.upload_index.lookup(sha256)  # type: ignore
+        if entry is None or entry["size"] != size:
+            return None
+        if not self._upload_index_reconciled:
+            # The file may have been deleted from the course since it was indexed
+            self.reconcile_upload_index()
+            entry = self.upload_index.lookup(sha256)  # type: ignore
+        return entry["url"] if entry else None
+
+    def _remember_upload(self, sha256: Optional[str], uploaded: Dict[str, Any]) -> str:
+        """Record an uploaded file in the upload index and return its URL."""
+        if sha256 is not None and self.upload_index is not None:
+            self.upload_index.record(
+                sha256, uploaded["id"], uploaded["url"], uploaded["display_name"], uploaded["size"]
+            )
+        return uploaded["url"]
+
+    def list_files(self, per_page: int = 100) -> List[FileSchema]:
+        """
+        Retrieve all files in the course.
+
+        Args:
+            per_page (int): Number of files requested per page.
+
+        Returns:
+            List[FileSchema]: A list of files.
+        """
+        return list(self.iter_paginated("files", per_page=per_page, schema=FileSchema))
+
+    def reconcile_upload_index(self) -> int:
+        """
+        Forget the indexed uploads that were deleted from the course files.
+
+        Returns:
+            int: Number of entries removed from the upload index.
+        """
+        if self.upload_index is None:
+            return 0
+        removed = self.upload_index.reconcile(self.list_files())
+        self._upload_index_reconciled = True
+        return removed
+
+    def list_modules(self, per_page: int = 100) -> List[ModuleSchema]:
         """
         Retrieve all modules in the course.
 
+        Args:
+            per_page (int): Number of modules requested per page.
+
         Returns:
             List[Dict]: A list of module dictionaries.
         """
-        endpoint = "modules"
-        modules_dict = self._make_request("GET", endpoint)
-        # Print(modules_dict[0])
-        modules: List[ModuleSchema] = [ModuleSchema(**module) for module in modules_dict]
-        return modules
+        return list(self.iter_paginated("modules", per_page=per_page, schema=ModuleSchema))
 
-    def get_module_by_title(self, name: str) -> ModuleSchema:
+    def _list_module_ids(self) -> Dict[str, MetadataId]:
+        return {module.name: module.id for module in reversed(self.list_modules())}
+
+    def get_module_id_by_title(self, name: str, refresh: bool = False) -> int:
         """
-        Retrieve a specific module by its ID.
+        Resolve the name of a module to its ID, from the metadata cache when it was already resolved.
 
         Args:
-            name (str): The ID of the module.
+            name (str): The exact name of the module.
+            refresh (bool): List the modules again even if the name is cached.
 
         Returns:
-            Dict: The module data if found, otherwise None.
+            int: The ID of the module.
+
+        Raises:
+            ValueError: If no module has this name.
         """
-        self.list_modules()
-        for module in self.list_modules():
-            if module.name == name:
-                return module
-        raise ValueError(f"Module with name '{name}' not found.")
+        module_id = self._resolve_title("modules", name, self._list_module_ids, refresh)
+        if module_id is None:
+            raise ValueError(f"Module with name '{name}' not found.")
+        return int(module_id)
+
+    def get_module_by_title(self, name: str, refresh: bool = False) -> ModuleSchema:
+        """
+        Retrieve a specific module by its name.
+
+        Args:
+            name (str): The exact name of the module.
+            refresh (bool): List the modules again even if the name is cached.
+
+        Returns:
+            ModuleSchema: The module.
+
+        Raises:
+            ValueError: If no module has this name.
+        """
+        module = self._fetch_by_title(
+            "modules",
+            name,
+            self._list_module_ids,
+            lambda module_id: ModuleSchema(**self._make_request("GET", f"modules/{module_id}")),
+            lambda module: module.name,
+            refresh,
+        )
+        if module is None:
+            raise ValueError(f"Module with name '{name}' not found.")
+        return module
 
     def create_module(
         self, name: str, position: Optional[int] = None, unlock_at: Optional[datetime] = None
@@ -632,44 +1649,103 @@ class CanvasAPI:
         if unlock_at:
             data["module"]["unlock_at"] = unlock_at.isoformat()
 
-        module = self._make_request("POST", endpoint, json=data)
-        return ModuleSchema(**module)
+        module = ModuleSchema(**self._make_request("POST", endpoint, json=data))
+        self.metadata.record("modules", module.name, module.id)
+        return module
 
-    def list_module_items(self, module_id: int) -> List[ModuleItemSchema]:
+    def list_module_items(
+        self, module_id: int, per_page: int = 100, decode: Optional[DecodeMode] = None
+    ) -> List[ModuleItemSchema]:
         """
         Retrieve all items in a specific module.
 
         Args:
             module_id (int): The ID of the module.
+            per_page (int): Number of module items requested per page.
+            decode (DecodeMode, optional): How the pages are decoded, the CanvasAPI default if None.
 
         Returns:
             List[Dict]: A list of module item dictionaries.
         """
         endpoint = f"modules/{module_id}/items"
-        moduleItem = self._make_request("GET", endpoint)
-        return [ModuleItemSchema(**item) for item in moduleItem]
+        return list(self.iter_paginated(endpoint, per_page=per_page, schema=ModuleItemSchema, decode=decode))
 
-    def get_page_by_title(self, title: str, module_id: int) -> PageSchema:
-        pages = self.get_module_pages(module_id)
-        for page in pages:
-            if page.title == title:
-                return page
-        raise ValueError(f"Page with title '{title}' not found.")
+    def get_page_by_title(self, title: str, module_id: int, refresh: bool = False) -> PageSchema:
+        """
+        Retrieve a page of a module by its title, with its body.
+
+        The title is resolved to the page URL with the metadata cache, from the pages of the module when it is
+        missing, so a cached title costs the page request only.
+
+        Args:
+            title (str): The exact title of the page.
+            module_id (int): The ID of the module.
+            refresh (bool): List the pages of the module again even if the title is cached.
+
+        Returns:
+            PageSchema: The page.
+
+        Raises:
+            ValueError: If the module has no page with this title.
+        """
+
+        def list_page_urls() -> Dict[str, MetadataId]:
+            # The page titles, the title of a module item can differ from the title of its page
+            return {page.title: page.url for page in reversed(self.get_module_pages(module_id))}
+
+        page = self._fetch_by_title(
+            f"modules/{module_id}/pages", title, list_page_urls, self.get_page_by_id, lambda page: page.title, refresh
+        )
+        if page is None:
+            raise ValueError(f"Page with title '{title}' not found.")
+        return page
 
     def get_page_by_id(self, url: str) -> PageSchema:
         endpoint = f"pages/{url}"
         page = self._make_request("GET", endpoint)
         return PageSchema(**page)
 
-    def get_module_pages(self, module_id: int) -> List[PageSchema]:
-        items = self.list_module_items(module_id)
-        pages: List[PageSchema] = []
-        for item in items:
+    def get_module_pages(self, module_id: int, max_workers: int = 8) -> List[PageSchema]:
+        """
+        Retrieve the pages of a module, with their body.
+
+        The course pages are listed 100 at a time with their bodies and joined with the module items on their
+        URL, so a module with N pages costs a few requests instead of 1 + N. Pages missing from the listing
+        (e.g. renamed since the module item was created) are fetched individually, in parallel.
+
+        Args:
+            module_id (int): The ID of the module.
+            max_workers (int): Number of pages fetched at the same time for the pages missing from the listing.
+
+        Returns:
+            List[PageSchema]: The pages in the order of the module items.
+        """
+        page_urls: List[str] = []
+        for item in self.list_module_items(module_id):
             if item.type == "Page":
                 if not item.page_url:
                     raise ValueError(f"Page {item.id} has no page_url")
-                pages.append(self.get_page_by_id(item.page_url))
-        return pages
+                page_urls.append(item.page_url)
+        if not page_urls:
+            return []
+
+        wanted = set(page_urls)
+        pages_by_url: Dict[str, PageSchema] = {}
+        for page in self.iter_paginated("pages", {"include[]": "body"}, per_page=100, schema=PageSchema):
+            if page.url in wanted:
+                pages_by_url[page.url] = page
+                if len(pages_by_url) == len(wanted):
+                    break  # No need to list the remaining pages of the course
+
+        missing = [url for url in wanted if url not in pages_by_url]
+        if missing:
+            Print(f"{len(missing)} module pages not found in the page listing, fetching them", log_type="DEBUG")
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+                # The workers send their requests in the lane of the caller
+                futures = [executor.submit(contextvars.copy_context().run, self.get_page_by_id, url) for url in missing]
+                for url, future in zip(missing, futures):
+                    pages_by_url[url] = future.result()
+        return [pages_by_url[url] for url in page_urls]
 
     def create_page(
         self,
@@ -713,6 +1789,7 @@ class CanvasAPI:
             data["wiki_page"]["publish_at"] = publish_at.isoformat()
 
         page = self._make_request("POST", endpoint, json=data)
+        self._invalidate_cache("pages")
         Print("new_page = ")
         page = PageSchema(**page)
         pprint.pprint(page.model_dump()["body"])
@@ -735,18 +1812,20 @@ class CanvasAPI:
         if title:
             data["wiki_page"]["title"] = title
         page = self._make_request("PUT", endpoint, json=data)
+        self._invalidate_cache("pages")
         return PageSchema(**page)
 
-    def list_pages(self) -> List[PageSchema]:
+    def list_pages(self, per_page: int = 100) -> List[PageSchema]:
         """
         Retrieve all pages in the course.
 
+        Args:
+            per_page (int): Number of pages requested per page.
+
         Returns:
             List[Dict]: A list of page dictionaries.
         """
-        endpoint = "pages"
-        pages = self._make_request("GET", endpoint)
-        return [PageSchema(**page) for page in pages]
+        return list(self.iter_paginated("pages", per_page=per_page, schema=PageSchema))
 
     def create_module_item(
         self,
@@ -776,8 +1855,12 @@ class CanvasAPI:
             },
             # "Authorization": f"Bearer {self.api_token}",
         }
-        module_item = self._make_request("POST", endpoint, json=data)
-        return ModuleItemSchema(**module_item)
+        module_item = ModuleItemSchema(**self._make_request("POST", endpoint, json=data))
+        # The module listing embeds the items count, drop it with the items
+        self._invalidate_cache("modules")
+        if module_item.type == "Page" and module_item.page_url:
+            self.metadata.record(f"modules/{module_id}/pages", module_item.title, module_item.page_url)
+        return module_item
 
 
 if __name__ == "__main__":
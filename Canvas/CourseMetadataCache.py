@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Union
+
+from Canvas.RosterCache import normalize
+from Logging import Print
+
+# Modules and assignments resolve to their id, the pages of a module to their URL
+MetadataId = Union[int, str]
+
+# Kinds whose titles match ignoring case and surrounding spaces, the others match exactly
+NORMALIZED_KINDS = ("assignments",)
+
+
+class CourseMetadataCache:
+    """
+    Resolves the titles of the course modules, assignments and module pages to their ids.
+
+    The ids are kept by kind ("modules", "assignments", "modules/<id>/pages") and title, for the session and in a
+    JSON file shared by every course, so that a title is not listed again. CanvasAPI refreshes a kind with a
+    single listing when a title is missing, when its cached id no longer exists, or when asked to. Assignment
+    titles match ignoring case and surrounding spaces, module and page titles match exactly.
+
+    Example:
+        >>> metadata = CourseMetadataCache(course_id, "course_metadata.json")
+        >>> canvas = CanvasAPI(course_id, metadata_cache=metadata)
+        >>> canvas.get_assignment_by_title("Presentation")  # Lists the assignments once
+        >>> canvas.get_assignment_by_title("Presentation")  # Only checks the assignment, also after a restart
+    """
+
+    def __init__(self, course_id: int, path: Optional[str] = None):
+        """
+        Args:
+            course_id (int): The course whose titles are cached.
+            path (str, optional): Where the cache is stored, it is only kept in memory if None.
+        """
+        self.course_id = course_id
+        self.path = path
+        self._lock = threading.Lock()
+        self._courses: Dict[str, Dict[str, Dict[str, MetadataId]]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._courses = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                Print(f"Ignoring unreadable course metadata {path}: {e}", log_type="WARN")
+        self.kinds = self._courses.setdefault(str(course_id), {})
+
+    def save(self):
+        """Write the cache to disk atomically, does nothing for an in-memory cache."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._courses, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(kind: str, title: str) -> str:
+        """The title as it is cached, normalized for the kinds matched ignoring case."""
+        return normalize(title) if kind in NORMALIZED_KINDS else title
+
+    def lookup(self, kind: str, title: str) -> Optional[MetadataId]:
+        """The id of the title, None if it is not cached."""
+        with self._lock:
+            return self.kinds.get(kind, {}).get(self.key(kind, title))
+
+    def titles(self, kind: str) -> List[str]:
+        """The titles cached for a kind."""
+        with self._lock:
+            return list(self.kinds.get(kind, {}))
+
+    def replace(self, kind: str, ids: Dict[str, MetadataId]):
+        """Replace every title of a kind with a fresh listing and save the cache."""
+        with self._lock:
+            self.kinds[kind] = {self.key(kind, title): id for title, id in ids.items()}
+        Print(f"Cached {len(ids)} {kind} titles of course {self.course_id}", log_type="DEBUG")
+        self.save()
+
+    def record(self, kind: str, title: str, id: MetadataId):
+        """Add a title that was just created, and save the cache."""
+        with self._lock:
+            self.kinds.setdefault(kind, {})[self.key(kind, title)] = id
+        self.save()
+
+    def forget(self, kind: Optional[str] = None):
+        """Drop a kind, or every kind if None. The next lookup lists it again."""
+        with self._lock:
+            if kind is None:
+                self.kinds.clear()
+            else:
+                self.kinds.pop(kind, None)
+        self.save()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, TypedDict
+
+from Canvas.AttachmentDownloader import DownloadResult
+from Logging import Print
+
+
+class ManifestEntry(TypedDict):
+    attachment_id: int
+    filename: str
+    size: Optional[int]  # Size reported by Canvas
+    updated_at: Optional[str]  # Last modification reported by Canvas
+    sha256: str  # Hex digest of the downloaded attachment
+    path: str  # Where the attachment was saved
+    files: List[str]  # Files produced on disk, the extracted files for a zip attachment
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 of a file without loading it in memory.
+
+    Args:
+        path (str): Path of the file.
+        chunk_size (int): Bytes read at a time.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadManifest:
+    """
+    Remembers which attachments of an assignment were already downloaded.
+
+    For every attachment the manifest records the id, size and ``updated_at`` reported by Canvas, the SHA-256 of
+    the downloaded content and the files it produced. An attachment whose metadata did not change on Canvas and
+    whose files are still intact on disk does not need to be downloaded again.
+
+    Example:
+        >>> manifest = DownloadManifest("downloads/.manifest_42.json", assignment_id=42)
+        >>> if not manifest.is_current(attachment):
+        ...     result = downloader.download(attachment["url"], path)
+        ...     manifest.record(attachment, result)
+        >>> manifest.save()
+    """
+
+    def __init__(self, path: str, assignment_id: Optional[int] = None):
+        """
+        Args:
+            path (str): Where the manifest is stored, it is created on the first save.
+            assignment_id (int, optional): The assignment the manifest belongs to, a manifest written for
+                                           another assignment is discarded.
+        """
+        self.path = path
+        self.assignment_id = assignment_id
+        self._lock = threading.Lock()
+        self.entries: Dict[str, ManifestEntry] = {}
+        self.load()
+
+    def load(self):
+        """Read the manifest from disk, starting empty if it is missing or unreadable."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            Print(f"Ignoring unreadable download manifest {self.path}: {e}", log_type="WARN")
+            return
+        if self.assignment_id is not None and data.get("assignment_id") != self.assignment_id:
+            Print(f"Download manifest {self.path} belongs to another assignment, ignoring it", log_type="WARN")
+            return
+        self.entries = data.get("attachments", {})
+
+    def save(self):
+        """Write the manifest to disk atomically."""
+        with self._lock:
+            data = {"assignment_id": self.assignment_id, "attachments": self.entries}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def get(self, attachment_id: int) -> Optional[ManifestEntry]:
+        """Return the entry recorded for an attachment, if any."""
+        with self._lock:
+            return self.entries.get(str(attachment_id))
+
+    def is_current(self, attachment: Dict[str, Any], verify: bool = True) -> bool:
+        """
+        Whether an attachment was already downloaded and has not changed since.
+
+        Args:
+            attachment (Dict): The attachment as returned by Canvas in a submission.
+            verify (bool): Also check the SHA-256 of the file on disk, not only its size.
+
+        Returns:
+            bool: True if the attachment can be skipped.
+        """
+        entry = self.get(attachment["id"])
+        if entry is None:
+            return False
+        if entry["size"] != attachment.get("size") or entry["updated_at"] != attachment.get("updated_at"):
+            return False
+        if not entry["files"] or not all(os.path.exists(file) for file in entry["files"]):
+            return False
+        if entry["path"] in entry["files"]:
+            if entry["size"] is not None and os.path.getsize(entry["path"]) != entry["size"]:
+                return False
+            if verify and sha256_file(entry["path"]) != entry["sha256"]:
+                Print(f"{entry['path']} does not match its checksum, downloading it again", log_type="WARN")
+                return False
+        return True
+
+    def record(self, attachment: Dict[str, Any], result: DownloadResult, files: Optional[List[str]] = None):
+        """
+        Record a downloaded attachment.
+
+        Args:
+            attachment (Dict): The attachment as returned by Canvas in a submission.
+            result (DownloadResult): The result of the download.
+            files (List[str], optional): Files produced on disk, defaults to the downloaded file itself.
+        """
+        with self._lock:
+            self.entries[str(attachment["id"])] = ManifestEntry(
+                attachment_id=attachment["id"],
+                filename=attachment["filename"],
+                size=attachment.get("size"),
+                updated_at=attachment.get("updated_at"),
+                sha256=result["sha256"],
+                path=result["path"],
+                files=files if files is not None else [result["path"]],
+            )
@@ -0,0 +1,199 @@
+import asyncio
+import mmap
+import os
+import uuid
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+
+ProgressCallback = Callable[[int, int], None]  # (bytes sent, total bytes)
+
+
+class MultipartEncoder:
+    """
+    A ``multipart/form-data`` body that is read from disk while it is sent.
+
+    ``requests`` builds the whole body in memory when it is given ``files=``. This encoder is instead a
+    file-like object with a known length: the form fields are encoded up front, the file is then read
+    ``chunk_size`` bytes at a time as the connection asks for data, so memory stays flat whatever the size of
+    the file. The file is the last part of the body, as required by the Canvas storage hosts.
+
+    Example:
+        >>> with MultipartEncoder({"filename": "demo.mp4"}, "file", "demo.mp4", progress=print) as body:
+        ...     session.post(upload_url, data=body, headers={"Content-Type": body.content_type})
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, str],
+        file_field: str,
+        file_path: str,
+        file_name: Optional[str] = None,
+        file_content_type: str = "application/octet-stream",
+        chunk_size: int = 1024 * 1024,
+        progress: Optional[ProgressCallback] = None,
+        use_mmap: bool = False,
+        boundary: Optional[str] = None,
+    ):
+        """
+        Args:
+            fields (Dict[str, str]): Form fields sent before the file.
+            file_field (str): Name of the form field of the file.
+            file_path (str): The local path of the file.
+            file_name (str, optional): File name sent to the server, defaults to the name of the file.
+            file_content_type (str): Content type of the file part.
+            chunk_size (int): Largest number of bytes read from the file at a time.
+            progress (Callable, optional): Called with (bytes sent, total bytes) every time a chunk is read.
+            use_mmap (bool): Map the file in memory instead of reading it, the OS then pages it in and out as needed.
+            boundary (str, optional): Boundary between the parts, a random one by default.
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.progress = progress
+        file_name = file_name or os.path.basename(file_path)
+
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items()
+        )
+        head += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{file_name}"\r\n'
+            f"Content-Type: {file_content_type}\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+        self._file = open(file_path, "rb")
+        file_size = os.fstat(self._file.fileno()).st_size
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        if use_mmap and file_size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+        self._parts: List[Optional[Union[bytes, memoryview]]] = [head, self._view, tail]
+        self._sizes = [len(head), file_size, len(tail)]
+        self._length = sum(self._sizes)
+        self._part = 0
+        self._offset = 0
+        self._sent = 0
+
+    @property
+    def content_type(self) -> str:
+        """The Content-Type header of the body, with its boundary."""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read the next bytes of the body.
+
+        Args:
+            size (int): Maximum number of bytes to return, the rest of the body if negative.
+
+        Returns:
+            bytes: The next bytes, empty once the whole body was read.
+        """
+        if size is None or size < 0:
+            size = self._length - self._sent
+        else:
+            size = min(size, self.chunk_size)
+        chunks: List[bytes] = []
+        remaining = size
+        while remaining > 0 and self._part < len(self._parts):
+            part = self._parts[self._part]
+            available = self._sizes[self._part] - self._offset
+            if available <= 0:
+                self._part += 1
+                self._offset = 0
+                continue
+            count = min(remaining, available)
+            if part is not None:
+                chunk = bytes(part[self._offset : self._offset + count])
+            else:
+                chunk = self._file.read(count)
+                if not chunk:
+                    raise IOError(f"{self._file.name} is shorter than when the upload started")
+            chunks.append(chunk)
+            self._offset += len(chunk)
+            remaining -= len(chunk)
+        data = b"".join(chunks)
+        self._sent += len(data)
+        if self.progress and data:
+            self.progress(self._sent, self._length)
+        return data
+
+    def close(self):
+        """Release the file."""
+        if self._view is not None:
+            self._parts[1] = None
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncMultipartBody:
+    """
+    The ``multipart/form-data`` body of a MultipartEncoder, as the async iterable ``content=`` of an httpx request.
+
+    The file is read chunk by chunk in a worker thread while the request is sent, instead of being loaded in
+    memory. Every iteration encodes the body again from the start of the file, so a retried request sends it whole.
+
+    Example:
+        >>> body = AsyncMultipartBody({"filename": "demo.mp4"}, "file", "demo.mp4")
+        >>> await client.post(upload_url, content=body, headers=body.headers)
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, str],
+        file_field: str,
+        file_path: str,
+        file_name: Optional[str] = None,
+        chunk_size: int = 1024 * 1024,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        """
+        Args:
+            fields (Dict[str, str]): Form fields sent before the file.
+            file_field (str): Name of the form field of the file.
+            file_path (str): The local path of the file.
+            file_name (str, optional): File name sent to the server, defaults to the name of the file.
+            chunk_size (int): Largest number of bytes read from the file at a time.
+            progress (Callable, optional): Called with (bytes sent, total bytes) every time a chunk is read.
+        """
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self._encoder_arguments = dict(
+            fields=fields, file_field=file_field, file_path=file_path, file_name=file_name, chunk_size=chunk_size
+        )
+        self.progress = progress
+        with self._encoder() as encoder:
+            self._length = len(encoder)
+
+    def _encoder(self) -> MultipartEncoder:
+        return MultipartEncoder(**self._encoder_arguments, progress=self.progress, boundary=self.boundary)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """The Content-Type and Content-Length headers of the body, so that it is not sent chunked."""
+        return {"Content-Type": f"multipart/form-data; boundary={self.boundary}", "Content-Length": str(self._length)}
+
+    def __len__(self) -> int:
+        return self._length
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        encoder = await asyncio.to_thread(self._encoder)
+        try:
+            while chunk := await asyncio.to_thread(encoder.read, self.chunk_size):
+                yield chunk
+        finally:
+            encoder.close()
@@ -0,0 +1,50 @@
+import functools
+import json
+from typing import Any, Callable, List, Literal, Optional, TypeVar, Union
+
+from pydantic import BaseModel, TypeAdapter
+
+T = TypeVar("T")
+
+# How a list of Canvas items is turned into schema instances:
+# - "validate": every item is parsed from the JSON and validated on its own, schema(**item).
+# - "batch": the raw bytes of the page are parsed and validated at once by the compiled List[schema] validator,
+#   without building the intermediate dictionaries. Same validation and results as "validate".
+DecodeMode = Literal["validate", "batch"]
+DECODE_MODES = ("validate", "batch")
+
+
+@functools.lru_cache(maxsize=None)
+def list_adapter(schema: Any) -> TypeAdapter:
+    """The compiled validator of a list of ``schema``, built once per schema."""
+    return TypeAdapter(List[schema])
+
+
+def decode_list(content: Union[bytes, str], schema: Optional[Callable[..., T]], mode: DecodeMode = "batch") -> List[T]:
+    """
+    Decode a JSON array returned by Canvas into schema instances.
+
+    Only pydantic models are validated in batch, a TypedDict is not validated by ``schema(**item)`` and must not
+    start failing on items it accepted so far.
+
+    Args:
+        content (bytes): The body of the response.
+        schema (Callable, optional): The pydantic model or TypedDict of the items, raw dictionaries if None.
+        mode (DecodeMode): "validate" or "batch", see DecodeMode.
+
+    Returns:
+        List[T]: The decoded items.
+
+    Raises:
+        ValueError: If the mode is unknown.
+        pydantic.ValidationError: If an item does not match the schema.
+
+    Example:
+        >>> decode_list(response.content, SubmissionSchema, mode="batch")
+    """
+    if mode not in DECODE_MODES:
+        raise ValueError(f"Unknown decode mode {mode!r}, expected one of {DECODE_MODES}")
+    if mode == "batch" and isinstance(schema, type) and issubclass(schema, BaseModel):
+        return list_adapter(schema).validate_json(content)
+    items = json.loads(content)
+    return [schema(**item) for item in items] if schema else items
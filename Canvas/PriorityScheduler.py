@@ -0,0 +1,205 @@
+import contextvars
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Literal, Optional, TypedDict, TypeVar
+
+from Deadline import check_deadline, remaining
+
+T = TypeVar("T")
+
+Lane = Literal["interactive", "normal", "bulk"]
+LANES = ("interactive", "normal", "bulk")
+
+# Share of the request slots each lane gets while every lane has requests waiting
+DEFAULT_WEIGHTS: Dict[str, int] = {"interactive": 8, "normal": 4, "bulk": 1}
+
+_current_lane: contextvars.ContextVar[str] = contextvars.ContextVar("canvas_lane", default="normal")
+
+
+def current_lane() -> str:
+    """The lane of the requests sent from the current thread or task, "normal" unless set with ``lane``."""
+    return _current_lane.get()
+
+
+@contextmanager
+def lane(name: Lane) -> Iterator[None]:
+    """
+    Send the requests made inside the block in a lane.
+
+    Worker threads do not inherit the lane, submit their work with ``contextvars.copy_context().run`` to keep it.
+    """
+    if name not in LANES:
+        raise ValueError(f"Unknown lane {name!r}, expected one of {LANES}")
+    token = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class LaneStats(TypedDict):
+    waiting: int  # Requests waiting for a slot
+    in_flight: int  # Requests holding a slot
+    granted: int  # Requests that were given a slot
+    total_wait: float  # Seconds spent waiting for a slot, over every granted request
+    max_wait: float  # Longest wait for a slot
+
+
+class PriorityScheduler:
+    """
+    Shares the request slots to Canvas between interactive, normal and bulk traffic.
+
+    At most ``max_in_flight`` requests are sent at the same time. When a slot frees up and several lanes have
+    requests waiting, the lanes are served by smooth weighted round robin: with the default weights an interactive
+    request waits for at most one or two others, and bulk requests keep getting one slot in thirteen however busy
+    the other lanes are, so they are never starved. ``reserved_interactive`` slots are only given to interactive
+    requests, so a UI refresh does not wait for a full slot set of bulk requests to finish. Requests of a lane are
+    served in the order they arrived.
+
+    The lane of a request is taken from the context (see ``lane``), and ``submit`` runs a whole call in a lane on
+    the worker pool.
+
+    Example:
+        >>> scheduler = PriorityScheduler(max_in_flight=8)
+        >>> future = scheduler.submit(grader.post_grades, "Presentation", grades, lane="bulk")
+        >>> with lane("interactive"):
+        ...     canvas.get_module_pages(module_id)  # Served before the queued grade requests
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        weights: Optional[Dict[str, int]] = None,
+        reserved_interactive: int = 1,
+        workers: int = 4,
+    ):
+        """
+        Args:
+            max_in_flight (int): Requests sent at the same time, every lane included.
+            weights (Dict[str, int], optional): Share of the slots of each lane when they all have requests waiting.
+            reserved_interactive (int): Slots that only interactive requests may use.
+            workers (int): Threads running the calls passed to ``submit``.
+        """
+        if not 0 <= reserved_interactive < max_in_flight:
+            raise ValueError("reserved_interactive must leave at least one slot to the other lanes")
+        self.max_in_flight = max_in_flight
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.reserved_interactive = reserved_interactive
+        self.workers = workers
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+        self._waiting: Dict[str, Deque[int]] = {name: deque() for name in LANES}
+        self._credits: Dict[str, int] = {name: 0 for name in LANES}
+        self._granted_ticket: Optional[int] = None
+        self._in_flight: Dict[str, int] = {name: 0 for name in LANES}
+        self._stats: Dict[str, LaneStats] = {
+            name: LaneStats(waiting=0, in_flight=0, granted=0, total_wait=0.0, max_wait=0.0) for name in LANES
+        }
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _has_free_slot(self, name: str) -> bool:
+        if sum(self._in_flight.values()) >= self.max_in_flight:
+            return False
+        if name == "interactive":
+            return True
+        # The other lanes together stay out of the reserved slots
+        background = sum(count for lane_name, count in self._in_flight.items() if lane_name != "interactive")
+        return background < self.max_in_flight - self.reserved_interactive
+
+    def _next_lane(self) -> Optional[str]:
+        """Smooth weighted round robin over the lanes with requests waiting that may use a free slot."""
+        candidates = [name for name in LANES if self._waiting[name] and self._has_free_slot(name)]
+        if not candidates:
+            return None
+        for name in candidates:
+            self._credits[name] += self.weights[name]
+        chosen = max(candidates, key=lambda name: self._credits[name])
+        self._credits[chosen] -= sum(self.weights[name] for name in candidates)
+        return chosen
+
+    def _grant(self):
+        """Pick the next request to send, must be called with the condition held."""
+        if self._granted_ticket is None:
+            chosen = self._next_lane()
+            if chosen is not None:
+                self._granted_ticket = self._waiting[chosen][0]
+                self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, name: Optional[Lane] = None) -> Iterator[None]:
+        """
+        Hold a request slot while the block runs, waiting for the turn of the lane.
+
+        Args:
+            name (Lane, optional): The lane of the request, the one of the context if None.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the operation is reached while waiting, the slot is not taken.
+        """
+        name = name or current_lane()  # type: ignore[assignment]
+        if name not in LANES:
+            raise ValueError(f"Unknown lane {name!r}, expected one of {LANES}")
+        queued_at = time.monotonic()
+        with self._condition:
+            ticket = next(self._tickets)
+            self._waiting[name].append(ticket)
+            self._grant()
+            while self._granted_ticket != ticket:
+                left = remaining()
+                if left is not None and left <= 0:
+                    self._waiting[name].remove(ticket)
+                    self._grant()  # The lanes behind it may be served now
+                    check_deadline(f"a {name} request slot was free")
+                self._condition.wait(left)
+            self._waiting[name].popleft()
+            self._granted_ticket = None
+            self._in_flight[name] += 1
+            waited = time.monotonic() - queued_at
+            stats = self._stats[name]
+            stats["granted"] += 1
+            stats["total_wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+            self._grant()  # Another slot may still be free
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight[name] -= 1
+                self._grant()
+
+    def submit(self, fn: Callable[..., T], *args, lane: Lane = "normal", **kwargs) -> "Future[T]":
+        """
+        Run ``fn(*args, **kwargs)`` on the worker pool, with its requests sent in ``lane``.
+
+        Returns:
+            Future: The result of the call.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane {lane!r}, expected one of {LANES}")
+        with self._condition:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="canvas-lane")
+        context = contextvars.copy_context()
+        context.run(_current_lane.set, lane)
+        return self._executor.submit(context.run, fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, LaneStats]:
+        """The counters of every lane."""
+        with self._condition:
+            return {
+                name: LaneStats(
+                    **{**self._stats[name], "waiting": len(self._waiting[name]), "in_flight": self._in_flight[name]}
+                )
+                for name in LANES
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool, after the submitted calls if ``wait``."""
+        with self._condition:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
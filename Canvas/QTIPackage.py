@@ -0,0 +1,139 @@
+import io
+import zipfile
+from typing import Dict, List
+from xml.etree import ElementTree as ET
+
+from Canvas.schemas import Question, QuizSchema
+
+QTI_NAMESPACE = "http://www.imsglobal.org/xsd/ims_qtiasiv1p2"
+CANVAS_NAMESPACE = "http://canvas.instructure.com/xsd/cccv1p0"
+MANIFEST_NAMESPACE = "http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1"
+
+# Question types that are fully described by answers with a weight, the weight 100 marking the correct answers
+SINGLE_ANSWER_TYPES = ("multiple_choice_question", "true_false_question")
+MULTIPLE_ANSWER_TYPES = ("multiple_answers_question",)
+SUPPORTED_QUESTION_TYPES = SINGLE_ANSWER_TYPES + MULTIPLE_ANSWER_TYPES
+
+
+def _metadata_field(parent: ET.Element, label: str, entry: str):
+    field = ET.SubElement(parent, "qtimetadatafield")
+    ET.SubElement(field, "fieldlabel").text = label
+    ET.SubElement(field, "fieldentry").text = entry
+
+
+def _material(parent: ET.Element, text: str, texttype: str = "text/html"):
+    material = ET.SubElement(parent, "material")
+    ET.SubElement(material, "mattext", texttype=texttype).text = text
+
+
+def _question_item(section: ET.Element, question: Question, ident: str):
+    """Append a QTI 1.2 item describing ``question`` to the section of the assessment."""
+    if question.question_type not in SUPPORTED_QUESTION_TYPES:
+        raise ValueError(
+            f"Question '{question.question_name}' has the type {question.question_type}, "
+            f"only {', '.join(SUPPORTED_QUESTION_TYPES)} can be imported with QTI"
+        )
+    item = ET.SubElement(section, "item", ident=ident, title=question.question_name)
+    metadata = ET.SubElement(ET.SubElement(item, "itemmetadata"), "qtimetadata")
+    _metadata_field(metadata, "question_type", question.question_type)
+    _metadata_field(metadata, "points_possible", str(question.points_possible))
+
+    presentation = ET.SubElement(item, "presentation")
+    _material(presentation, question.question_text)
+    cardinality = "Multiple" if question.question_type in MULTIPLE_ANSWER_TYPES else "Single"
+    response = ET.SubElement(presentation, "response_lid", ident="response1", rcardinality=cardinality)
+    choices = ET.SubElement(response, "render_choice")
+    correct: List[str] = []
+    for index, answer in enumerate(question.answers, start=1):
+        answer_ident = f"{ident}_a{index}"
+        label = ET.SubElement(choices, "response_label", ident=answer_ident)
+        _material(label, answer.answer_text, texttype="text/plain")
+        if answer.answer_weight > 0:
+            correct.append(answer_ident)
+
+    processing = ET.SubElement(item, "resprocessing")
+    outcomes = ET.SubElement(processing, "outcomes")
+    ET.SubElement(outcomes, "decvar", maxvalue="100", minvalue="0", varname="SCORE", vartype="Decimal")
+    condition = ET.SubElement(processing, "respcondition", attrib={"continue": "No"})
+    variables = ET.SubElement(condition, "conditionvar")
+    if cardinality == "Multiple":
+        # Every correct answer and none of the others must be selected
+        both = ET.SubElement(variables, "and")
+        for answer_ident in (f"{ident}_a{index}" for index in range(1, len(question.answers) + 1)):
+            parent = both if answer_ident in correct else ET.SubElement(both, "not")
+            ET.SubElement(parent, "varequal", respident="response1").text = answer_ident
+    else:
+        # A single answer is selected, any of the correct ones scores
+        parent = ET.SubElement(variables, "or") if len(correct) > 1 else variables
+        for answer_ident in correct:
+            ET.SubElement(parent, "varequal", respident="response1").text = answer_ident
+    ET.SubElement(condition, "setvar", action="Set", varname="SCORE").text = "100"
+
+
+def _assessment_xml(quiz: QuizSchema, ident: str) -> bytes:
+    """The QTI 1.2 assessment holding the questions of the quiz."""
+    root = ET.Element("questestinterop", xmlns=QTI_NAMESPACE)
+    assessment = ET.SubElement(root, "assessment", ident=ident, title=quiz.title)
+    metadata = ET.SubElement(assessment, "qtimetadata")
+    _metadata_field(metadata, "cc_maxattempts", str(quiz.allowed_attempts))
+    section = ET.SubElement(assessment, "section", ident="root_section")
+    for index, question in enumerate(quiz.questions, start=1):
+        _question_item(section, question, f"{ident}_q{index}")
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def _assessment_meta_xml(quiz: QuizSchema, ident: str) -> bytes:
+    """The Canvas specific settings of the quiz, which QTI has no field for."""
+    root = ET.Element("quiz", identifier=ident, xmlns=CANVAS_NAMESPACE)
+    settings: Dict[str, str] = {
+        "title": quiz.title,
+        "description": quiz.description,
+        "quiz_type": quiz.quiz_type,
+        "time_limit": str(quiz.time_limit),
+        "shuffle_answers": str(quiz.shuffle_answers).lower(),
+        "allowed_attempts": str(quiz.allowed_attempts),
+        "points_possible": str(sum(question.points_possible for question in quiz.questions)),
+    }
+    for tag, value in settings.items():
+        ET.SubElement(root, tag).text = value
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def _manifest_xml(idents: List[str]) -> bytes:
+    root = ET.Element("manifest", identifier="quizzes_manifest", xmlns=MANIFEST_NAMESPACE)
+    ET.SubElement(root, "organizations")
+    resources = ET.SubElement(root, "resources")
+    for ident in idents:
+        resource = ET.SubElement(resources, "resource", identifier=ident, type="imsqti_xmlv1p2")
+        ET.SubElement(resource, "file", href=f"{ident}/{ident}.xml")
+        ET.SubElement(resource, "file", href=f"{ident}/assessment_meta.xml")
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def build_qti_package(quizzes: List[QuizSchema]) -> bytes:
+    """
+    Compile quizzes into a QTI 1.2 package that Canvas imports with a "qti_converter" content migration.
+
+    The package is built in memory: an IMS manifest, and for every quiz its questions as a QTI assessment
+    plus the Canvas settings (time limit, attempts, shuffling) that QTI cannot express.
+
+    Args:
+        quizzes (List[QuizSchema]): The validated quizzes, several quizzes go in the same package.
+
+    Returns:
+        bytes: The zip file.
+
+    Raises:
+        ValueError: If a question type cannot be expressed in QTI, see SUPPORTED_QUESTION_TYPES.
+
+    Example:
+        >>> package = build_qti_package([QuizSchema(**read_json_file("team1/quiz.json"))])
+    """
+    idents = [f"quiz_{index}" for index in range(1, len(quizzes) + 1)]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("imsmanifest.xml", _manifest_xml(idents))
+        for quiz, ident in zip(quizzes, idents):
+            package.writestr(f"{ident}/{ident}.xml", _assessment_xml(quiz, ident))
+            package.writestr(f"{ident}/assessment_meta.xml", _assessment_meta_xml(quiz, ident))
+    return buffer.getvalue()
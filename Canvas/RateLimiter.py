@@ -0,0 +1,236 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional, TypedDict
+
+from Deadline import check_deadline, remaining
+from Logging import Print
+
+
+class RateLimitMetrics(TypedDict):
+    bucket_remaining: Optional[float]  # Estimated quota left in the Canvas bucket, None until Canvas reports it
+    last_request_cost: Optional[float]  # Cost of the last request reported by Canvas
+    concurrency_limit: int  # Requests allowed in flight with the current bucket level
+    in_flight: int  # Requests currently being sent
+    queued: int  # Requests waiting for a slot
+    throttled: int  # Number of times Canvas answered "Rate Limit Exceeded"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, which is either a number of seconds or an HTTP date.
+
+    Args:
+        value (str, optional): The header value.
+
+    Returns:
+        Optional[float]: Seconds to wait, None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def is_rate_limited(status_code: int, text: str) -> bool:
+    """Canvas answers 403 "Rate Limit Exceeded" when the bucket is empty, other servers use 429."""
+    return status_code == 429 or (status_code == 403 and "rate limit exceeded" in text.lower())
+
+
+class RateLimitScheduler:
+    """
+    Paces the requests sent to Canvas based on its throttling headers.
+
+    Canvas gives every token a bucket of quota (about 700 units) which refills at a constant rate. Each response
+    reports the quota left in ``X-Rate-Limit-Remaining`` and what the request cost in ``X-Request-Cost``. The
+    scheduler keeps an estimate of the bucket and:
+
+    - lowers the number of requests allowed in flight as the bucket drains, down to ``min_concurrency``,
+    - once the bucket is below ``low_water``, spaces new requests by the time the bucket needs to regain the
+      cost of a request, up to twice that time as the bucket empties,
+    - blocks everyone for the ``Retry-After`` period when Canvas rejects a request for exceeding the limit.
+
+    Example:
+        >>> scheduler = RateLimitScheduler(max_concurrency=8)
+        >>> scheduler.acquire()
+        >>> response = session.get(url)
+        >>> scheduler.release(response.headers)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        bucket_capacity: float = 700.0,
+        refill_rate: float = 10.0,
+        low_water: float = 150.0,
+        max_pacing_delay: float = 10.0,
+    ):
+        """
+        Args:
+            max_concurrency (int): Requests allowed in flight when the bucket is full.
+            min_concurrency (int): Requests allowed in flight when the bucket is almost empty.
+            bucket_capacity (float): Size of the Canvas quota bucket.
+            refill_rate (float): Quota units the bucket regains per second.
+            low_water (float): Below this level new requests are paced to the refill rate of the bucket.
+            max_pacing_delay (float): Longest delay added to a single request while pacing.
+        """
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.bucket_capacity = bucket_capacity
+        self.refill_rate = refill_rate
+        self.low_water = low_water
+        self.max_pacing_delay = max_pacing_delay
+
+        self._condition = threading.Condition()
+        self._remaining: Optional[float] = None
+        self._observed_at = 0.0
+        self._last_cost: Optional[float] = None
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._queued = 0
+        self._throttled = 0
+
+    def _estimated_remaining(self, now: float) -> Optional[float]:
+        if self._remaining is None:
+            return None
+        return min(self._remaining + (now - self._observed_at) * self.refill_rate, self.bucket_capacity)
+
+    def _concurrency_limit(self, now: float) -> int:
+        remaining = self._estimated_remaining(now)
+        if remaining is None:
+            return self.max_concurrency
+        fraction = max(remaining, 0.0) / self.bucket_capacity
+        return max(self.min_concurrency, min(self.max_concurrency, int(self.max_concurrency * fraction)))
+
+    def pacing_delay(self) -> float:
+        """
+        Seconds a new request should wait before being sent.
+
+        Returns:
+            float: 0 while the bucket is above the low water mark, otherwise the time the bucket needs to regain
+                   the cost of a request, scaled up to twice that time as the bucket empties.
+        """
+        with self._condition:
+            return self._pacing_delay(time.monotonic())
+
+    def _pacing_delay(self, now: float) -> float:
+        """See pacing_delay. Must be called with the condition held."""
+        if self._blocked_until > now:
+            return self._blocked_until - now
+        remaining = self._estimated_remaining(now)
+        if remaining is None or remaining >= self.low_water:
+            return 0.0
+        cost = self._last_cost or 1.0
+        deficit = (self.low_water - max(remaining, 0.0)) / self.low_water
+        return min(cost / self.refill_rate * (1 + deficit), self.max_pacing_delay)
+
+    def acquire(self):
+        """
+        Block until a request may be sent, then reserve a slot for it. Always pair with release.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the operation is reached while waiting, no slot is reserved.
+        """
+        with self._condition:
+            self._queued += 1
+            # The pacing delay is waited before the slot is reserved, so that a paced request does not hold it
+            send_at = time.monotonic() + self._pacing_delay(time.monotonic())
+            try:
+                while True:
+                    check_deadline("a Canvas rate limit slot was free")
+                    now = time.monotonic()
+                    if self._blocked_until > now:
+                        wait = self._blocked_until - now
+                    elif send_at > now:
+                        wait = send_at - now
+                    elif self._in_flight >= self._concurrency_limit(now):
+                        # The bucket refills with time, so wake up periodically to re-evaluate the limit
+                        wait = 1.0
+                    else:
+                        break
+                    left = remaining()
+                    self._condition.wait(wait if left is None else min(wait, left))
+                self._in_flight += 1
+            finally:
+                self._queued -= 1
+
+    def release(self, headers: Optional[Mapping[str, str]] = None):
+        """
+        Free the slot reserved by acquire and record the throttling headers of the response.
+
+        Args:
+            headers (Mapping, optional): Headers of the response, None if the request failed without one.
+        """
+        with self._condition:
+            self._in_flight = max(self._in_flight - 1, 0)
+            if headers is not None:
+                self._observe(headers)
+            self._condition.notify_all()
+
+    def observe(self, headers: Mapping[str, str]):
+        """Record the throttling headers of a response without holding a slot."""
+        with self._condition:
+            self._observe(headers)
+            self._condition.notify_all()
+
+    def _observe(self, headers: Mapping[str, str]):
+        remaining = headers.get("X-Rate-Limit-Remaining")
+        cost = headers.get("X-Request-Cost")
+        try:
+            if remaining is not None:
+                self._remaining = float(remaining)
+                self._observed_at = time.monotonic()
+            if cost is not None:
+                self._last_cost = float(cost)
+        except ValueError:
+            Print(f"Invalid rate limit headers: remaining={remaining}, cost={cost}", log_type="WARN")
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """
+        Record that Canvas rejected a request for exceeding the rate limit.
+
+        Args:
+            retry_after (float, optional): Seconds Canvas asked to wait, otherwise the time needed to refill
+                                           the bucket up to the low water mark (at most max_pacing_delay).
+        """
+        with self._condition:
+            self._throttled += 1
+            self._remaining = 0.0
+            self._observed_at = time.monotonic()
+            wait = (
+                retry_after
+                if retry_after is not None
+                else min(self.low_water / self.refill_rate, self.max_pacing_delay)
+            )
+            self._blocked_until = max(self._blocked_until, self._observed_at + wait)
+            Print(f"Canvas rate limit exceeded, pausing requests for {wait:.1f} seconds", log_type="WARN")
+
+    def metrics(self) -> RateLimitMetrics:
+        """
+        Snapshot of the scheduler state.
+
+        Returns:
+            RateLimitMetrics: Current bucket level, cost of the last request and queued work.
+        """
+        with self._condition:
+            now = time.monotonic()
+            remaining = self._estimated_remaining(now)
+            return RateLimitMetrics(
+                bucket_remaining=None if remaining is None else round(remaining, 2),
+                last_request_cost=self._last_cost,
+                concurrency_limit=self._concurrency_limit(now),
+                in_flight=self._in_flight,
+                queued=self._queued,
+                throttled=self._throttled,
+            )
@@ -0,0 +1,160 @@
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypedDict
+
+import requests
+
+from Canvas.RequestMetrics import RequestMetrics
+
+
+class HedgeStats(TypedDict):
+    requests: int  # GET requests sent through the hedger
+    no_estimate: int  # Requests not hedged because their endpoint had too few latencies recorded
+    hedged: int  # Requests still waiting after the delay, for which a duplicate was sent
+    over_budget: int  # Requests still waiting after the delay, not hedged because the budget was spent
+    hedge_won: int  # Hedged requests answered first by the duplicate
+    primary_won: int  # Hedged requests answered first by the original request anyway
+
+
+class RequestHedger:
+    """
+    Sends a duplicate of the GET requests that take longer than usual, and keeps the first response.
+
+    A request that is still waiting after the ``percentile`` latency of its endpoint (see RequestMetrics) is sent a
+    second time, the response that arrives first is used and the other one is dropped. Only a few requests are in
+    the tail, so a long response stops dominating a serial run for little extra load. The duplicates are bounded
+    by a budget: every request earns ``budget`` of a hedge, so with the default at most one request in ten is sent
+    twice, whatever the latency distribution.
+
+    Only idempotent requests may be hedged, CanvasAPI hedges its GET requests when it is given a hedger.
+
+    Example:
+        >>> canvas = CanvasAPI(course_id, hedger=RequestHedger(percentile=95, budget=0.1))
+        >>> canvas.get_module_pages(module_id)
+        >>> canvas.hedger.stats()["hedge_won"]
+        3
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget: float = 0.1,
+        max_burst: float = 10.0,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        workers: int = 8,
+    ):
+        """
+        Args:
+            percentile (float): Latency percentile of the endpoint after which a request is hedged.
+            budget (float): Hedges earned by every request, 0.1 allows one request in ten to be hedged.
+            max_burst (float): Hedges that can be saved up while requests are fast, for a slow spell.
+            min_samples (int): Latencies an endpoint needs before its requests are hedged.
+            min_delay (float): Seconds to wait at least before hedging, however fast the endpoint usually is.
+            workers (int): Threads sending the original requests and their duplicates.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if budget < 0:
+            raise ValueError("budget must not be negative")
+        self.percentile = percentile
+        self.budget = budget
+        self.max_burst = max_burst
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._stats = HedgeStats(requests=0, no_estimate=0, hedged=0, over_budget=0, hedge_won=0, primary_won=0)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def delay(self, metrics: RequestMetrics, endpoint: str) -> Optional[float]:
+        """Seconds after which a request to the endpoint is hedged, None if too few of its latencies are known."""
+        latency = metrics.percentile(endpoint, self.percentile, min_samples=self.min_samples)
+        return None if latency is None else max(latency, self.min_delay)
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self._stats["over_budget"] += 1
+                return False
+            self._tokens -= 1
+            self._stats["hedged"] += 1
+            return True
+
+    def _submit(self, send: Callable[[], Optional[requests.Response]]) -> "Future[Optional[requests.Response]]":
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="canvas-hedge")
+        # The lane and the deadline of the caller apply to both requests
+        return self._executor.submit(contextvars.copy_context().run, send)
+
+    def run(
+        self, send: Callable[[], Optional[requests.Response]], delay: Optional[float]
+    ) -> Optional[requests.Response]:
+        """
+        Send a request, and send it again if it has not been answered after ``delay`` seconds.
+
+        Args:
+            send (Callable): Sends the request once, returns None if it failed without a response.
+            delay (float, optional): Seconds before hedging, the request is only sent once if None.
+
+        Returns:
+            requests.Response: The first response received, None if every attempt failed without one.
+        """
+        with self._lock:
+            self._stats["requests"] += 1
+            self._tokens = min(self._tokens + self.budget, self.max_burst)
+            if delay is None:
+                self._stats["no_estimate"] += 1
+        if delay is None:
+            return send()
+
+        started = threading.Event()
+
+        def send_primary() -> Optional[requests.Response]:
+            started.set()
+            return send()
+
+        primary = self._submit(send_primary)
+        started.wait()  # The hedge delay starts when the request is sent, not while it waits for a worker
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_token():
+            return primary.result()
+
+        hedge = self._submit(send)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                response = future.result()
+                if response is None:
+                    continue  # Failed without a response, the other one may still succeed
+                with self._lock:
+                    self._stats["hedge_won" if future is hedge else "primary_won"] += 1
+                for loser in pending:
+                    loser.add_done_callback(_close_response)  # Let it finish, its connection goes back to the pool
+                return response
+        return None
+
+    def stats(self) -> HedgeStats:
+        """The counters since the creation or the last reset."""
+        with self._lock:
+            return HedgeStats(**self._stats)
+
+    def reset(self):
+        with self._lock:
+            self._stats = HedgeStats(requests=0, no_estimate=0, hedged=0, over_budget=0, hedge_won=0, primary_won=0)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads, after the requests in flight if ``wait``."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def _close_response(future: "Future[Optional[requests.Response]]"):
+    if future.exception() is None and future.result() is not None:
+        future.result().close()  # type: ignore[union-attr]
@@ -0,0 +1,288 @@
+import math
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional, TypedDict
+from urllib.parse import urlparse
+
+from Logging import Print
+
+
+class RequestSample(TypedDict):
+    method: str  # HTTP method
+    url: str  # Absolute URL of the request, without the query string
+    endpoint: str  # Endpoint template, e.g. "GET /courses/:id/pages/:url"
+    status: Optional[int]  # Status code, None if the request failed before a response was received
+    seconds: float  # Time until the response headers were received
+    bytes_sent: int  # Size of the request body
+    bytes_received: int  # Size of the response body, from Content-Length when the body is streamed
+
+
+class EndpointStats(TypedDict):
+    endpoint: str  # Endpoint template
+    requests: int  # Requests sent, retries included
+    errors: int  # Connection errors and responses with a status of 400 or more
+    retries: int  # Requests sent again after a failure
+    bytes_sent: int  # Total size of the request bodies
+    bytes_received: int  # Total size of the response bodies
+    status_codes: Dict[str, int]  # Number of responses by status code, "error" for connection errors
+    total_seconds: float  # Time spent waiting for the responses
+    p50: float  # Median latency in seconds
+    p95: float  # 95th percentile latency in seconds
+    p99: float  # 99th percentile latency in seconds
+
+
+MetricsExporter = Callable[[RequestSample], None]
+
+_NUMERIC_SEGMENT = re.compile(r"^\d+$")
+# Segments following these ones are names chosen by users rather than ids
+_SLUG_PARENTS = {"pages": ":url", "front_page": ":url"}
+
+
+def endpoint_template(method: str, url: str, base_url: str) -> str:
+    """
+    Group the URL of a request with the other requests to the same endpoint.
+
+    Ids and page URLs are replaced by placeholders, and requests to other hosts (the file storage of uploads
+    and downloads) are grouped by host.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The absolute URL.
+        base_url (str): The base URL of the Canvas instance.
+
+    Returns:
+        str: The endpoint template.
+
+    Example:
+        >>> endpoint_template("GET", "https://canvas.test/api/v1/courses/1/pages/team-1", "https://canvas.test")
+        'GET /courses/:id/pages/:url'
+    """
+    parsed = urlparse(url)
+    if parsed.netloc != urlparse(base_url).netloc:
+        return f"{method} {parsed.netloc}"
+    path = parsed.path
+    if path.startswith("/api/v1"):
+        path = path[len("/api/v1") :]
+    segments = [segment for segment in path.split("/") if segment]
+    for index, segment in enumerate(segments):
+        if _NUMERIC_SEGMENT.match(segment):
+            segments[index] = ":id"
+        elif index > 0 and segments[index - 1] in _SLUG_PARENTS:
+            segments[index] = _SLUG_PARENTS[segments[index - 1]]
+    return f"{method} /{'/'.join(segments)}"
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class _Endpoint:
+    def __init__(self, max_samples: int):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.status_codes: Dict[str, int] = {}
+        self.total_seconds = 0.0
+        self.samples = 0  # Latencies recorded, the ones dropped from ``latencies`` included
+        self.latencies: Deque[float] = deque(maxlen=max_samples)
+
+    def copy(self) -> "_Endpoint":
+        """The counters, without the latencies."""
+        counters = _Endpoint(0)
+        counters.requests = self.requests
+        counters.errors = self.errors
+        counters.retries = self.retries
+        counters.bytes_sent = self.bytes_sent
+        counters.bytes_received = self.bytes_received
+        counters.status_codes = dict(self.status_codes)
+        counters.total_seconds = self.total_seconds
+        counters.samples = self.samples
+        return counters
+
+
+# The counters of every endpoint at some point, see RequestMetrics.mark
+MetricsMark = Dict[str, _Endpoint]
+
+
+class RequestMetrics:
+    """
+    Per-endpoint instrumentation of the requests sent by CanvasAPI.
+
+    Every request is counted under its endpoint template with its latency, status code and size, and every
+    retry is counted as well. Percentiles are computed over the last ``max_samples`` latencies of each endpoint.
+    Exporters registered with ``add_exporter`` receive every request as it completes, to forward them to a
+    monitoring system.
+
+    Example:
+        >>> canvas = CanvasAPI(course_id)
+        >>> with canvas.metrics.action("Create pages"):
+        ...     grader.create_multiple_canvas_pages_based_on_folder(folders)
+        >>> canvas.metrics.snapshot()[0]["p95"]
+    """
+
+    def __init__(self, max_samples: int = 1024):
+        """
+        Args:
+            max_samples (int): Latencies kept per endpoint for the percentiles.
+        """
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _Endpoint] = {}
+        self._exporters: List[MetricsExporter] = []
+        self._action_depth = 0
+        self._action_mark: MetricsMark = {}
+
+    def add_exporter(self, exporter: MetricsExporter):
+        """Call ``exporter`` with the RequestSample of every request, from the thread that sent it."""
+        self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter: MetricsExporter):
+        self._exporters.remove(exporter)
+
+    def _endpoint(self, endpoint: str) -> _Endpoint:
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = _Endpoint(self.max_samples)
+        return self._endpoints[endpoint]
+
+    def record(self, sample: RequestSample):
+        """Count a request that received a response or failed to."""
+        status = str(sample["status"]) if sample["status"] is not None else "error"
+        with self._lock:
+            stats = self._endpoint(sample["endpoint"])
+            stats.requests += 1
+            if sample["status"] is None or sample["status"] >= 400:
+                stats.errors += 1
+            stats.bytes_sent += sample["bytes_sent"]
+            stats.bytes_received += sample["bytes_received"]
+            stats.status_codes[status] = stats.status_codes.get(status, 0) + 1
+            stats.total_seconds += sample["seconds"]
+            stats.samples += 1
+            stats.latencies.append(sample["seconds"])
+        for exporter in self._exporters:
+            try:
+                exporter(sample)
+            except Exception as e:  # A broken exporter must not fail the request
+                Print(f"Metrics exporter {exporter} failed: {e}", log_type="WARN")
+
+    def record_retry(self, endpoint: str):
+        """Count a request that is about to be sent again."""
+        with self._lock:
+            self._endpoint(endpoint).retries += 1
+
+    def percentile(self, endpoint: str, percent: float, min_samples: int = 1) -> Optional[float]:
+        """
+        The latency percentile of an endpoint over its last requests.
+
+        Args:
+            endpoint (str): The endpoint template, see endpoint_template.
+            percent (float): The percentile, 95 for the p95.
+            min_samples (int): Latencies needed for the estimate.
+
+        Returns:
+            float: The latency in seconds, None if fewer than ``min_samples`` latencies are recorded.
+        """
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None or len(stats.latencies) < min_samples:
+                return None
+            latencies = sorted(stats.latencies)
+        return _percentile(latencies, percent)
+
+    def mark(self) -> MetricsMark:
+        """The counters as they are now, to report only the requests sent after it with ``snapshot(since=...)``."""
+        with self._lock:
+            return {endpoint: stats.copy() for endpoint, stats in self._endpoints.items()}
+
+    def snapshot(self, since: Optional[MetricsMark] = None) -> List[EndpointStats]:
+        """
+        Report the statistics of every endpoint.
+
+        Args:
+            since (MetricsMark, optional): Only count the requests sent after this mark, every request if None.
+                                           The percentiles then cover the latencies still kept since the mark.
+
+        Returns:
+            List[EndpointStats]: One entry per endpoint, the one where the most time was spent first.
+        """
+        result = []
+        with self._lock:
+            for endpoint, stats in self._endpoints.items():
+                base = (since or {}).get(endpoint) or _Endpoint(0)
+                new_samples = min(stats.samples - base.samples, len(stats.latencies))
+                if stats.requests == base.requests and stats.retries == base.retries:
+                    continue
+                latencies = sorted(list(stats.latencies)[len(stats.latencies) - new_samples :])
+                status_codes = {
+                    status: count - base.status_codes.get(status, 0)
+                    for status, count in stats.status_codes.items()
+                    if count > base.status_codes.get(status, 0)
+                }
+                result.append(
+                    EndpointStats(
+                        endpoint=endpoint,
+                        requests=stats.requests - base.requests,
+                        errors=stats.errors - base.errors,
+                        retries=stats.retries - base.retries,
+                        bytes_sent=stats.bytes_sent - base.bytes_sent,
+                        bytes_received=stats.bytes_received - base.bytes_received,
+                        status_codes=status_codes,
+                        total_seconds=stats.total_seconds - base.total_seconds,
+                        p50=_percentile(latencies, 50),
+                        p95=_percentile(latencies, 95),
+                        p99=_percentile(latencies, 99),
+                    )
+                )
+        return sorted(result, key=lambda stats: stats["total_seconds"], reverse=True)
+
+    def summary(self, title: str = "Canvas requests", since: Optional[MetricsMark] = None) -> str:
+        """Format the snapshot as a table, one line per endpoint, see snapshot for ``since``."""
+        rows = self.snapshot(since)
+        lines = [
+            f"{title}: {sum(row['requests'] for row in rows)} requests, "
+            f"{sum(row['total_seconds'] for row in rows):.2f}s",
+            f"{'endpoint':<45} {'reqs':>5} {'retry':>5} {'err':>4} {'p50':>7} {'p95':>7} {'p99':>7} {'total':>8} "
+            f"{'sent':>9} {'recv':>9}  statuses",
+        ]
+        for row in rows:
+            statuses = " ".join(f"{code}x{count}" for code, count in sorted(row["status_codes"].items()))
+            lines.append(
+                f"{row['endpoint'][:45]:<45} {row['requests']:>5} {row['retries']:>5} {row['errors']:>4} "
+                f"{row['p50']:>6.3f}s {row['p95']:>6.3f}s {row['p99']:>6.3f}s {row['total_seconds']:>7.2f}s "
+                f"{row['bytes_sent']:>9} {row['bytes_received']:>9}  {statuses}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        """Forget every request counted so far."""
+        with self._lock:
+            self._endpoints.clear()
+
+    @contextmanager
+    def action(self, title: str) -> Iterator["RequestMetrics"]:
+        """
+        Measure the requests of a UI action or batch run, and log their summary once it is over.
+
+        Only the requests sent during the block are reported, the counters and latencies are kept, so the
+        percentiles used by RequestHedger survive the actions. An action started inside another one, from any
+        thread, is counted and reported with the outer action.
+        """
+        with self._lock:
+            if self._action_depth == 0:
+                self._action_mark = {endpoint: stats.copy() for endpoint, stats in self._endpoints.items()}
+            self._action_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._action_depth -= 1
+                mark = self._action_mark if self._action_depth == 0 else None
+            if mark is not None:
+                Print(self.summary(title, since=mark), log_type="INFO")
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, TypedDict
+
+import requests
+
+from Logging import Print
+
+
+class CacheStats(TypedDict):
+    hits: int  # Responses served from the cache after Canvas answered 304 Not Modified
+    misses: int  # Requests that had to transfer the full body
+    stores: int  # Responses written to the cache
+    evictions: int  # Responses removed to stay under max_bytes
+    invalidations: int  # Responses removed because the resource was modified
+    size_bytes: int  # Current size of the cached bodies
+
+
+class ResponseCache:
+    """
+    Persistent cache of Canvas GET responses, stored in SQLite.
+
+    Responses are only cached when Canvas sends an ``ETag`` or a ``Last-Modified`` header. They are never served
+    blindly: the next request for the same URL is sent with ``If-None-Match`` / ``If-Modified-Since``, and when
+    Canvas answers ``304 Not Modified`` the body comes from the cache instead of the network. The cache keeps at
+    most ``max_bytes`` of bodies, evicting the least recently used responses first.
+
+    Example:
+        >>> cache = ResponseCache("canvas_cache.sqlite3")
+        >>> canvas = CanvasAPI(course_id, response_cache=cache)
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024):
+        """
+        Args:
+            path (str): The SQLite database file, created if missing.
+            max_bytes (int): Maximum total size of the cached bodies.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+        self._stats = CacheStats(hits=0, misses=0, stores=0, evictions=0, invalidations=0, size_bytes=0)
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None, token: Optional[str] = None) -> str:
+        """
+        The cache key of a GET request, its full URL with the query string.
+
+        Canvas answers with what the token may see, so the responses of two tokens are never shared: a hash of the
+        token follows the URL, which keeps ``invalidate`` working by URL prefix for every token.
+        """
+        key = requests.Request("GET", url, params=params).prepare().url or url
+        if token:
+            key += "#" + hashlib.sha256(token.encode()).hexdigest()[:16]
+        return key
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        """
+        Headers asking Canvas to only send the body if it changed since it was cached.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            Dict[str, str]: If-None-Match / If-Modified-Since, empty if the response is not cached.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT etag, last_modified FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return {}
+        etag, last_modified = row
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def resolve(self, key: str, response: requests.Response) -> requests.Response:
+        """
+        Record the response of a GET request and return the response the caller should use.
+
+        A ``304 Not Modified`` is replaced by the cached response, a successful response is cached if it has
+        validators.
+
+        Args:
+            key (str): The cache key of the request.
+            response (requests.Response): The response sent by Canvas.
+
+        Returns:
+            requests.Response: The response with its body.
+        """
+        if response.status_code == 304:
+            cached = self._load(key, response)
+            if cached is not None:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return cached
+            return response
+        with self._lock:
+            self._stats["misses"] += 1
+        if response.ok:
+            self._store(key, response)
+        return response
+
+    def _load(self, key: str, not_modified: requests.Response) -> Optional[requests.Response]:
+        with self._lock:
+            row = self._connection.execute("SELECT headers, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+        headers, body = row
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.headers.update(json.loads(headers))
+        # The 304 carries the current throttling headers and pagination links
+        response.headers.update(not_modified.headers)
+        response._content = body
+        response.encoding = not_modified.encoding or "utf-8"
+        return response
+
+    def _store(self, key: str, response: requests.Response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in ("content-length", "content-encoding")}
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, json.dumps(headers), body, len(body), time.time()),
+            )
+            self._stats["stores"] += 1
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Remove the least recently used responses until the cache fits in max_bytes. Lock must be held."""
+        (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while total > self.max_bytes:
+            row = self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            total -= row[1]
+            self._stats["evictions"] += 1
+
+    def invalidate(self, prefix: str) -> int:
+        """
+        Remove every cached response whose URL starts with ``prefix``.
+
+        Args:
+            prefix (str): Start of the URLs to remove, e.g. ".../courses/1/pages".
+
+        Returns:
+            int: Number of responses removed.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM responses WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+            self._connection.commit()
+            self._stats["invalidations"] += cursor.rowcount
+        if cursor.rowcount:
+            Print(f"Invalidated {cursor.rowcount} cached responses under {prefix}", log_type="DEBUG")
+        return cursor.rowcount
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def stats(self) -> CacheStats:
+        """
+        Report how effective the cache was.
+
+        Returns:
+            CacheStats: Hits, misses and size of the cache.
+        """
+        with self._lock:
+            (size,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return CacheStats(**{**self._stats, "size_bytes": size})
@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from Canvas.schemas import UsersSchema
+from Logging import Print
+
+
+def normalize(value: str) -> str:
+    """Normalize an email or a name for lookups, Canvas and the spreadsheets do not agree on case and spacing."""
+    return value.strip().lower()
+
+
+class RosterCache:
+    """
+    Keeps the course roster in memory, indexed by email, Canvas id and name.
+
+    The roster is fetched once with a single paginated listing and reused until it is older than ``ttl``
+    seconds or ``invalidate`` is called, so looking up a student costs a dictionary access instead of a
+    download of the whole roster.
+
+    Example:
+        >>> roster = RosterCache(canvas.get_users_in_course, ttl=600)
+        >>> roster.by_email(" Student@CSULB.edu ")["id"]
+        143898
+    """
+
+    def __init__(self, fetch: Callable[[], List[UsersSchema]], ttl: float = 600.0):
+        """
+        Args:
+            fetch (Callable): Returns every user of the course, usually CanvasAPI.get_users_in_course.
+            ttl (float): Seconds the roster is reused before being fetched again.
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users: List[UsersSchema] = []
+        self._by_email: Dict[str, UsersSchema] = {}
+        self._by_id: Dict[int, UsersSchema] = {}
+        self._by_name: Dict[str, List[UsersSchema]] = {}
+        self._fetched_at: Optional[float] = None
+
+    def _load(self):
+        """Fetch the roster if it was never fetched or is stale. Must be called with the lock held."""
+        if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return
+        self._index(self.fetch())
+
+    def _index(self, users: List[UsersSchema]):
+        """Replace the roster with ``users``. Must be called with the lock held."""
+        self._users = users
+        self._by_email = {normalize(user["email"]): user for user in users if user.get("email")}
+        self._by_id = {user["id"]: user for user in users}
+        self._by_name = {}
+        for user in users:
+            self._by_name.setdefault(normalize(user["name"]), []).append(user)
+        self._fetched_at = time.monotonic()
+        Print(f"Loaded {len(users)} users in the roster cache", log_type="DEBUG")
+
+    def prime(self, users: List[UsersSchema]):
+        """Use ``users``, fetched along with other data, as the roster instead of fetching it again."""
+        with self._lock:
+            self._index(users)
+
+    def invalidate(self):
+        """Forget the roster, the next lookup fetches it again."""
+        with self._lock:
+            self._fetched_at = None
+
+    def users(self) -> List[UsersSchema]:
+        """Every user of the course."""
+        with self._lock:
+            self._load()
+            return list(self._users)
+
+    def by_email(self, email: str) -> Optional[UsersSchema]:
+        """The user with this email, ignoring case and surrounding spaces."""
+        with self._lock:
+            self._load()
+            return self._by_email.get(normalize(email))
+
+    def by_id(self, user_id: int) -> Optional[UsersSchema]:
+        """The user with this Canvas id."""
+        with self._lock:
+            self._load()
+            return self._by_id.get(user_id)
+
+    def by_name(self, name: str) -> List[UsersSchema]:
+        """The users with this name, ignoring case and surrounding spaces. Names are not unique."""
+        with self._lock:
+            self._load()
+            return list(self._by_name.get(normalize(name), []))
+
+    def emails(self) -> Set[str]:
+        """The normalized emails of every user."""
+        with self._lock:
+            self._load()
+            return set(self._by_email)
+
+    def names(self) -> Set[str]:
+        """The normalized names of every user."""
+        with self._lock:
+            self._load()
+            return set(self._by_name)
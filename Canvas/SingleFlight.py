@@ -0,0 +1,99 @@
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypedDict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlightStats(TypedDict):
+    calls: int  # Calls made through the single-flight group
+    executed: int  # Calls that ran their function, including the ones that timed out waiting
+    coalesced: int  # Calls that waited for an identical call in flight and shared its result
+    timed_out: int  # Calls that stopped waiting for the identical call after their timeout and ran their function
+
+
+class _Call(Generic[T]):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs a function once for every group of identical calls made at the same time.
+
+    The first call with a key runs the function, calls with the same key made while it is running wait for it and
+    receive the same result, or the same exception. Calls made after it completed run the function again, nothing
+    is cached. A call that waits longer than its ``timeout`` runs the function itself, and a ``copy`` function gives
+    every waiting call its own copy of a result it may modify.
+
+    Example:
+        >>> flights = SingleFlight()
+        >>> flights.do(("GET", url), lambda: session.get(url))  # From several threads, one request is sent
+        >>> flights.stats()["coalesced"]
+        3
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call[Any]] = {}
+        self._stats = SingleFlightStats(calls=0, executed=0, coalesced=0, timed_out=0)
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], T],
+        timeout: Optional[float] = None,
+        copy: Optional[Callable[[T], T]] = None,
+    ) -> T:
+        """
+        Run ``fn``, or wait for the identical call in flight.
+
+        Args:
+            key (Hashable): Identifies identical calls.
+            fn (Callable): Computes the result.
+            timeout (float, optional): Seconds to wait for the identical call before running ``fn`` anyway.
+            copy (Callable, optional): Copies the result for every coalesced call, they share it if None.
+
+        Returns:
+            T: The result of ``fn``, shared with every coalesced call unless ``copy`` is given.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+
+        if not leader:
+            if not call.done.wait(None if timeout is None else max(timeout, 0)):
+                with self._lock:
+                    self._stats["timed_out"] += 1
+                    self._stats["executed"] += 1
+                return fn()
+            with self._lock:
+                self._stats["coalesced"] += 1
+            if call.error is not None:
+                raise call.error
+            return call.result if copy is None else copy(call.result)  # type: ignore[arg-type,return-value]
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> SingleFlightStats:
+        """The counters since the creation or the last reset."""
+        with self._lock:
+            return SingleFlightStats(**self._stats)
+
+    def reset(self):
+        with self._lock:
+            self._stats = SingleFlightStats(calls=0, executed=0, coalesced=0, timed_out=0)
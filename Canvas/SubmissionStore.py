@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, TypedDict
+
+from Canvas.schemas import SubmissionSchema
+from Logging import Print
+
+
+class AssignmentSubmissions(TypedDict):
+    synced_at: Optional[str]  # Start of the last sync of every student, ISO 8601 in UTC, None if never synced
+    students_synced_at: Dict[str, str]  # Start of the last sync of single students, by user id
+    submissions: Dict[str, dict]  # Last known submission of every student, by user id
+
+
+class SubmissionStore:
+    """
+    Local copy of the submissions of the course assignments, kept up to date incrementally.
+
+    Remembers when every assignment (or single student) was last synced, so that CanvasAPI.sync_submissions only
+    asks Canvas for the submissions submitted or graded since then and merges them in. The store is kept in a
+    JSON file so the sync timestamps survive restarts.
+
+    Example:
+        >>> store = SubmissionStore("submissions.json")
+        >>> canvas = CanvasAPI(course_id, submission_store=store)
+        >>> canvas.sync_submissions(assignment_id)  # Every submission
+        >>> canvas.sync_submissions(assignment_id)  # Only the ones changed since the previous call
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path (str, optional): Where the store is saved, it is only kept in memory if None.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.assignments: Dict[str, AssignmentSubmissions] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.assignments = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                Print(f"Ignoring unreadable submission store {path}: {e}", log_type="WARN")
+
+    def save(self):
+        """Write the store to disk atomically, does nothing for an in-memory store."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.assignments, f)
+            os.replace(tmp_path, self.path)
+
+    def _assignment(self, assignment_id: int) -> AssignmentSubmissions:
+        """Must be called with the lock held."""
+        return self.assignments.setdefault(
+            str(assignment_id), AssignmentSubmissions(synced_at=None, students_synced_at={}, submissions={})
+        )
+
+    def synced_at(self, assignment_id: int, user_ids: Optional[List[int]] = None) -> Optional[str]:
+        """
+        When the submissions were last synced.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            user_ids (List[int], optional): Only these students, every student if None.
+
+        Returns:
+            Optional[str]: The oldest sync of the students, None if one of them was never synced.
+        """
+        with self._lock:
+            assignment = self.assignments.get(str(assignment_id))
+            if assignment is None:
+                return None
+            if user_ids is None:
+                return assignment["synced_at"]
+            oldest = None
+            for user_id in user_ids:
+                synced = [assignment["synced_at"], assignment["students_synced_at"].get(str(user_id))]
+                latest = max((timestamp for timestamp in synced if timestamp), default=None)
+                if latest is None:
+                    return None
+                oldest = latest if oldest is None else min(oldest, latest)
+            return oldest
+
+    def merge(
+        self,
+        assignment_id: int,
+        submissions: Iterable[SubmissionSchema],
+        synced_at: str,
+        user_ids: Optional[List[int]] = None,
+    ) -> int:
+        """
+        Replace the stored submissions of the same students, record the sync and save the store.
+
+        Args:
+            assignment_id (int): The ID of the assignment.
+            submissions (Iterable[SubmissionSchema]): Submissions fetched from Canvas.
+            synced_at (str): When the sync started, ISO 8601 in UTC.
+            user_ids (List[int], optional): The students that were synced, every student if None.
+
+        Returns:
+            int: Number of submissions merged.
+        """
+        merged = 0
+        with self._lock:
+            assignment = self._assignment(assignment_id)
+            for submission in submissions:
+                assignment["submissions"][str(submission.user_id)] = submission.model_dump(mode="json")
+                merged += 1
+            if user_ids is None:
+                assignment["synced_at"] = synced_at
+                assignment["students_synced_at"] = {}
+            else:
+                for user_id in user_ids:
+                    assignment["students_synced_at"][str(user_id)] = synced_at
+        Print(f"Merged {merged} changed submissions of assignment {assignment_id}", log_type="DEBUG")
+        self.save()
+        return merged
+
+    def submissions(self, assignment_id: int, user_ids: Optional[List[int]] = None) -> List[SubmissionSchema]:
+        """The stored submissions of an assignment, only those of ``user_ids`` if given."""
+        with self._lock:
+            stored = self.assignments.get(str(assignment_id), {}).get("submissions", {})
+            if user_ids is None:
+                selected = list(stored.values())
+            else:
+                selected = [stored[str(user_id)] for user_id in user_ids if str(user_id) in stored]
+        return [SubmissionSchema(**submission) for submission in selected]
+
+    def forget(self, assignment_id: int):
+        """Drop an assignment, its next sync fetches every submission again."""
+        with self._lock:
+            self.assignments.pop(str(assignment_id), None)
+        self.save()
@@ -0,0 +1,164 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from Canvas.MultipartEncoder import ProgressCallback
+from Logging import Print
+
+if TYPE_CHECKING:
+    from Canvas.CanvasService import CanvasAPI
+
+
+class HostLimiter:
+    """
+    Caps the number of requests sent at the same time to each host.
+
+    A Canvas upload talks to two hosts: the Canvas API to initiate and confirm it, and the file storage host
+    which receives the content. Each one gets its own limit so that large transfers to the storage host do not
+    starve the small API calls, and the other way around.
+
+    Example:
+        >>> limiter = HostLimiter(per_host=4, limits={"csulb.instructure.com": 8})
+        >>> with limiter.slot("https://csulb.instructure.com/api/v1/courses/1/files"):
+        ...     session.post(...)
+    """
+
+    def __init__(self, per_host: int = 4, limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            per_host (int): Requests allowed in flight for a host without an explicit limit.
+            limits (Dict[str, int], optional): Requests allowed in flight by host name.
+        """
+        self.per_host = per_host
+        self.limits = limits or {}
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limits.get(host, self.per_host))
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Hold one of the slots of the host of ``url`` while the block runs."""
+        semaphore = self._semaphore(urlparse(url).netloc)
+        with semaphore:
+            yield
+
+
+class UploadExecutor:
+    """
+    Uploads files to the course concurrently.
+
+    Every upload runs the three-step Canvas protocol (initiate, send the content to the pre-signed URL, confirm)
+    in a worker thread, with the requests to each host capped by a HostLimiter. ``submit`` returns a future of
+    the URL of the uploaded file, so callers can start many uploads at once and use each URL as soon as it is
+    available.
+
+    Example:
+        >>> with UploadExecutor(canvas, max_workers=8) as uploads:
+        ...     paper = uploads.submit("team1/paper.pdf")
+        ...     slides = uploads.submit("team1/presentation.pdf")
+        ...     body = f'<a href="{paper.result()}">paper</a> <a href="{slides.result()}">slides</a>'
+    """
+
+    def __init__(
+        self,
+        canvas: "CanvasAPI",
+        max_workers: int = 8,
+        per_host: int = 4,
+        host_limits: Optional[Dict[str, int]] = None,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        """
+        Args:
+            canvas (CanvasAPI): The Canvas client used for the uploads.
+            max_workers (int): Number of files uploaded at the same time.
+            per_host (int): Requests allowed in flight for each host.
+            host_limits (Dict[str, int], optional): Requests allowed in flight by host name, overriding per_host.
+            progress (Callable, optional): Called from the worker threads with (bytes sent, total bytes) over all
+                                           the submitted uploads.
+        """
+        self.canvas = canvas
+        self.host_limiter = HostLimiter(per_host=per_host, limits=host_limits)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="canvas-upload")
+        self.progress = progress
+        self._progress_lock = threading.Lock()
+        self._sent: Dict[int, int] = {}
+        self._total = 0
+        self._reported_percent = -1
+
+    def submit(self, file_path: str) -> "Future[str]":
+        """
+        Start uploading a file.
+
+        Args:
+            file_path (str): The local path of the file.
+
+        Returns:
+            Future[str]: Resolves to the URL of the uploaded file, or raises the error of the upload.
+        """
+        Print(f"Queued upload of {file_path}", log_type="DEBUG")
+        file_progress = self._track(file_path) if self.progress else None
+        # The upload requests are sent in the scheduler lane of the caller
+        return self._executor.submit(
+            contextvars.copy_context().run,
+            self.canvas.upload_file,
+            file_path,
+            host_limiter=self.host_limiter,
+            progress=file_progress,
+        )
+
+    def _track(self, file_path: str) -> ProgressCallback:
+        """Add a file to the overall progress and return the progress callback of its upload."""
+        file_size = os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+        with self._progress_lock:
+            upload_id = len(self._sent)
+            self._sent[upload_id] = 0
+            self._total += file_size
+
+        def file_progress(sent: int, total: int):
+            with self._progress_lock:
+                if self._sent[upload_id] == 0:
+                    # The multipart overhead is only known once the body is encoded
+                    self._total += total - file_size
+                self._sent[upload_id] = sent
+                overall_sent, overall_total = sum(self._sent.values()), self._total
+                # Only report whole percent changes, the body is read in small blocks
+                percent = overall_sent * 100 // overall_total if overall_total else 100
+                if percent == self._reported_percent:
+                    return
+                self._reported_percent = percent
+            self.progress(overall_sent, overall_total)  # type: ignore
+
+        return file_progress
+
+    def upload_many(self, file_paths: List[str]) -> List[str]:
+        """
+        Upload many files concurrently and wait for all of them.
+
+        Args:
+            file_paths (List[str]): The local paths of the files.
+
+        Returns:
+            List[str]: The URLs of the uploaded files, in the same order as the paths.
+        """
+        futures = [self.submit(file_path) for file_path in file_paths]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """Stop the workers once the submitted uploads are done, or the started ones if ``cancel_pending``."""
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The uploads not started yet are of no use once the block failed, e.g. when its deadline is reached
+        self.shutdown(cancel_pending=exc_type is not None)
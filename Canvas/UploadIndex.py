@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, TypedDict
+
+from Canvas.schemas import FileSchema
+from Logging import Print
+
+
+class UploadIndexEntry(TypedDict):
+    sha256: str  # Hex digest of the uploaded content
+    file_id: int  # Canvas id of the file holding that content
+    url: str  # Download URL of the file
+    display_name: str  # Name of the file in the course files
+    size: int  # Size of the file in bytes
+    uploaded_at: str  # When the file was uploaded, ISO 8601
+
+
+class UploadIndex:
+    """
+    Content-addressed index of the files uploaded to a course.
+
+    Maps the SHA-256 of every uploaded file to its Canvas file, so uploading the same content again can reuse
+    the existing file instead of transferring it and creating a renamed copy in the course files. The index is
+    stored in a JSON file shared by every course, each course with its own entries, and can be reconciled
+    against the course file listing to forget files deleted on Canvas.
+
+    Example:
+        >>> index = UploadIndex(course_id, "upload_index.json")
+        >>> canvas = CanvasAPI(course_id, upload_index=index)
+        >>> canvas.upload_file("histogram.png")  # Uploaded
+        >>> canvas.upload_file("histogram.png")  # Same content, the URL of the first upload is returned
+    """
+
+    def __init__(self, course_id: int, path: Optional[str] = None):
+        """
+        Args:
+            course_id (int): The course whose uploads are indexed.
+            path (str, optional): Where the index is stored, it is only kept in memory if None.
+        """
+        self.course_id = course_id
+        self.path = path
+        self._lock = threading.Lock()
+        self._courses: Dict[str, Dict[str, UploadIndexEntry]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._courses = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                Print(f"Ignoring unreadable upload index {path}: {e}", log_type="WARN")
+        if any("sha256" in entry for entry in self._courses.values()):
+            Print(f"Ignoring the upload index {path}, it was written without courses", log_type="WARN")
+            self._courses = {}
+        self.entries = self._courses.setdefault(str(course_id), {})
+
+    def save(self):
+        """Write the index to disk atomically, does nothing for an in-memory index."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._courses, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def lookup(self, sha256: str) -> Optional[UploadIndexEntry]:
+        """Return the file already holding this content, if any."""
+        with self._lock:
+            return self.entries.get(sha256)
+
+    def record(self, sha256: str, file_id: int, url: str, display_name: str, size: int):
+        """
+        Record an uploaded file and save the index.
+
+        Args:
+            sha256 (str): Hex digest of the content.
+            file_id (int): Canvas id of the file.
+            url (str): Download URL of the file.
+            display_name (str): Name of the file in the course files.
+            size (int): Size of the file in bytes.
+        """
+        with self._lock:
+            self.entries[sha256] = UploadIndexEntry(
+                sha256=sha256,
+                file_id=file_id,
+                url=url,
+                display_name=display_name,
+                size=size,
+                uploaded_at=datetime.now(timezone.utc).isoformat(),
+            )
+        self.save()
+
+    def reconcile(self, files: Iterable[FileSchema]) -> int:
+        """
+        Drop the entries whose file no longer exists on Canvas, or changed size, and refresh the URLs of the others.
+
+        Only the entries of the course are reconciled, those of the other courses in the file are kept.
+
+        Args:
+            files (Iterable[FileSchema]): Every file of the course.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        files_by_id = {file.id: file for file in files}
+        removed = 0
+        with self._lock:
+            for sha256, entry in list(self.entries.items()):
+                file = files_by_id.get(entry["file_id"])
+                if file is None or file.size != entry["size"]:
+                    del self.entries[sha256]
+                    removed += 1
+                else:
+                    entry["url"] = file.url
+                    entry["display_name"] = file.display_name
+        Print(f"Upload index reconciled, {removed} stale entries removed", log_type="DEBUG")
+        self.save()
+        return removed
@@ -190,6 +190,41 @@ class AssignmentSchema(BaseModel):
     restrict_quantitative_data: bool
 
 
+class ProgressSchema(BaseModel):
+    id: int
+    context_id: Optional[int] = None
+    context_type: Optional[str] = None
+    user_id: Optional[int] = None
+    tag: Optional[str] = None
+    completion: Optional[float] = None
+    workflow_state: Literal["queued", "running", "completed", "failed"]
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    message: Optional[str] = None
+    results: Optional[Any] = None
+    url: Optional[str] = None
+
+
+class FileSchema(BaseModel):
+    class Config:
+        extra = "allow"
+
+    id: int
+    uuid: Optional[str] = None
+    folder_id: Optional[int] = None
+    display_name: str
+    filename: str
+    content_type: Optional[str] = Field(default=None, alias="content-type")
+    url: str
+    size: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    modified_at: Optional[datetime] = None
+    locked: bool = False
+    hidden: bool = False
+    mime_class: Optional[str] = None
+
+
 ############# MODULE ITEM ############
 class CompletionRequirement(BaseModel):
     type: str
@@ -0,0 +1,61 @@
+import functools
+import hashlib
+import os
+
+import pytest
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+fake_canvas = functools.partial(FakeCanvas.with_teams, 2, attachment_size=50_000)
+
+
+def attachment_of(fake: FakeCanvas):
+    assignment_id = fake.assignments[0]["id"]
+    submission = next(iter(fake.submissions[assignment_id].values()))
+    attachment = submission["attachments"][0]
+    return {**attachment, "url": attachment["url"].format(base_url=fake.base_url)}
+
+
+def test_download_resumes_from_the_partial_file(canvas: CanvasAPI, fake: FakeCanvas, tmp_path):
+    attachment = attachment_of(fake)
+    content = fake.blobs[attachment["id"]]
+    path = str(tmp_path / "submission.pdf")
+    with open(f"{path}.part", "wb") as f:
+        f.write(content[:20_000])
+
+    result = canvas.downloader.download(attachment["url"], path, size=attachment["size"], resume=True)
+    assert result["resumed_from"] == 20_000
+    assert result["sha256"] == hashlib.sha256(content).hexdigest()
+    assert open(path, "rb").read() == content
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_wrong_size_leaves_no_file(canvas: CanvasAPI, fake: FakeCanvas, tmp_path):
+    attachment = attachment_of(fake)
+    path = str(tmp_path / "submission.pdf")
+    with pytest.raises(ValueError):
+        canvas.downloader.download(attachment["url"], path, size=attachment["size"] + 1)
+    assert os.listdir(tmp_path) == []
+
+
+def download_requests(canvas: CanvasAPI) -> int:
+    return sum(endpoint["requests"] for endpoint in canvas.metrics.snapshot() if "/download/" in endpoint["endpoint"])
+
+
+def test_unchanged_attachments_are_skipped(canvas: CanvasAPI, fake: FakeCanvas, tmp_path):
+    assignment_id = fake.assignments[0]["id"]
+    manifest_path = str(tmp_path / "manifest.json")
+    first = canvas.download_all_submission_attachments(assignment_id, str(tmp_path), manifest_path)
+    assert download_requests(canvas) == len(first) == len(fake.submissions[assignment_id])
+
+    with open(first[0], "ab") as f:
+        f.write(b"changed on disk")
+    canvas.metrics.reset()
+    second = canvas.download_all_submission_attachments(assignment_id, str(tmp_path), manifest_path)
+    assert sorted(first) == sorted(second)
+    assert download_requests(canvas) == 1  # Only the file that no longer matches its checksum
@@ -0,0 +1,40 @@
+import functools
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+fake_canvas = functools.partial(FakeCanvas.with_teams, 3)
+
+
+def test_graphql_returns_what_rest_returns(fake: FakeCanvas):
+    assignment_id = fake.assignments[0]["id"]
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url) as canvas:
+        canvas.graphql.page_size = 2  # Both connections span several pages
+        users, submissions = canvas.graphql.roster_and_submissions(assignment_id)
+        rest_users = canvas.get_users_in_course()
+        rest_submissions = list(canvas.iter_submissions(assignment_id))
+    assert sorted(user["email"] for user in users) == sorted(user["email"] for user in rest_users)
+    assert sorted(s.user_id for s in submissions) == sorted(s.user_id for s in rest_submissions)
+    by_user = {s.user_id: s for s in rest_submissions}
+    for submission in submissions:
+        assert [a["id"] for a in submission.attachments] == [a["id"] for a in by_user[submission.user_id].attachments]
+
+
+def test_attachments_have_the_filename_and_size_of_rest(fake: FakeCanvas):
+    """GraphQL only has the display name and a display formatted size, the download manifest needs the REST ones"""
+    assignment_id = fake.assignments[0]["id"]
+    for submission in fake.submissions[assignment_id].values():
+        submission["attachments"][0]["display_name"] = "Final slides.pdf"
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url) as canvas:
+        submissions = canvas.graphql.submissions(assignment_id)
+        rest_submissions = {s.user_id: s for s in canvas.iter_submissions(assignment_id)}
+    for submission in submissions:
+        [attachment] = submission.attachments
+        [rest_attachment] = rest_submissions[submission.user_id].attachments
+        assert (attachment["filename"], attachment["size"]) == (rest_attachment["filename"], rest_attachment["size"])
+        assert attachment["display_name"] == "Final slides.pdf"
+        assert attachment["size"] == len(fake.blobs[attachment["id"]])
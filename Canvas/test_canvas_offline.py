@@ -0,0 +1,184 @@
+"""
+Offline tests of CanvasAPI and AsyncCanvasAPI, run against the local fake Canvas of the benchmarks.
+
+Usage:
+    python -m pytest Canvas/test_canvas_offline.py
+"""
+
+import functools
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.AsyncCanvasService import AsyncCanvasAPI
+from Canvas.CanvasService import CanvasAPI, RetryPolicy
+from Canvas.PriorityScheduler import lane
+from Canvas.schemas import QuizSchema
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+QUIZ = {
+    "title": "Quiz on team 1",
+    "description": "Quiz on the presentation",
+    "quiz_type": "assignment",
+    "time_limit": 10,
+    "allowed_attempts": 1,
+    "questions": [
+        {
+            "question_name": f"Question {index}",
+            "question_text": f"Question {index}?",
+            "question_type": "multiple_choice_question",
+            "points_possible": 1,
+            "answers": [{"answer_text": "Yes", "answer_weight": 100}, {"answer_text": "No", "answer_weight": 0}],
+        }
+        for index in range(3)
+    ],
+}
+
+
+fake_canvas = functools.partial(FakeCanvas.with_teams, 2)
+
+
+def async_canvas(fake: FakeCanvas) -> AsyncCanvasAPI:
+    return AsyncCanvasAPI(
+        fake.course_id, api_token="test", base_url=fake.base_url, retry_policy=RetryPolicy(backoff=0.01)
+    )
+
+
+def fail_route(monkeypatch, fake: FakeCanvas, method: str, path_part: str, status: int = 400):
+    """Answer the requests of the fake whose path contains ``path_part`` with an error."""
+    route = fake.route
+
+    def failing_route(request_method, path, query, body, headers):
+        if request_method == method and path_part in path:
+            return status, {"errors": [{"message": "injected failure"}]}, {}
+        return route(request_method, path, query, body, headers)
+
+    monkeypatch.setattr(fake, "route", failing_route)
+
+
+def test_async_upload_file(fake: FakeCanvas, tmp_path):
+    """The upload is confirmed by following the redirect of the upload host, its size is counted in the metrics"""
+    file_path = tmp_path / "slides.pdf"
+    file_path.write_bytes(b"%PDF" + b"x" * 5000)
+
+    async def upload():
+        async with async_canvas(fake) as canvas:
+            return await canvas.upload_file(str(file_path)), canvas.metrics.snapshot()
+
+    url, metrics = asyncio.run(upload())
+    file_id = int(url.rsplit("/", 1)[-1])
+    assert fake.blobs[file_id] == file_path.read_bytes()
+    assert sum(endpoint["bytes_sent"] for endpoint in metrics) > 5000
+
+
+def test_async_upload_file_is_sent_again_when_it_fails(fake: FakeCanvas, tmp_path, monkeypatch):
+    file_path = tmp_path / "slides.pdf"
+    file_path.write_bytes(b"%PDF" + b"x" * 5000)
+    route = fake.route
+    failures = []
+
+    def failing_once(method, path, query, body, headers):
+        if method == "POST" and "/upload/" in path and not failures:
+            failures.append(len(body))
+            return 503, {"errors": [{"message": "injected failure"}]}, {}
+        return route(method, path, query, body, headers)
+
+    monkeypatch.setattr(fake, "route", failing_once)
+
+    async def upload():
+        async with async_canvas(fake) as canvas:
+            return await canvas.upload_file(str(file_path))
+
+    file_id = int(asyncio.run(upload()).rsplit("/", 1)[-1])
+    assert failures and failures[0] > 5000
+    assert fake.blobs[file_id] == file_path.read_bytes()
+
+
+def test_async_quiz_deleted_when_a_question_fails(fake: FakeCanvas, monkeypatch):
+    fail_route(monkeypatch, fake, "POST", "/questions")
+
+    async def create():
+        async with async_canvas(fake) as canvas:
+            return await canvas._create_quiz_with_questions(QuizSchema(**QUIZ))
+
+    with pytest.raises(Exception):
+        asyncio.run(create())
+    assert fake.quizzes == []
+
+
+def write_quiz(path, title: str) -> str:
+    path.write_text(json.dumps({**QUIZ, "title": title}))
+    return str(path)
+
+
+def test_quizzes_with_the_same_title_get_their_own_quiz(canvas: CanvasAPI, fake: FakeCanvas, tmp_path):
+    paths = [write_quiz(tmp_path / f"quiz{index}.json", "Team quiz") for index in range(2)]
+    paths.append(write_quiz(tmp_path / "quiz2.json", "Other quiz"))
+    quizzes = canvas.create_quizzes_from_files(paths, engine="qti")
+    assert len({quiz["id"] for quiz in quizzes}) == 3
+    assert [quiz["title"] for quiz in quizzes] == ["Team quiz", "Team quiz", "Other quiz"]
+
+
+def test_quiz_package_upload_is_retried(canvas: CanvasAPI, fake: FakeCanvas, monkeypatch):
+    route = fake.route
+    failures = []
+
+    def failing_once(method, path, query, body, headers):
+        if method == "POST" and "/upload/" in path and not failures:
+            failures.append(path)
+            return 503, {"errors": [{"message": "injected failure"}]}, {}
+        return route(method, path, query, body, headers)
+
+    monkeypatch.setattr(fake, "route", failing_once)
+    [quiz] = canvas.import_quizzes([QuizSchema(**QUIZ)])
+    assert len(failures) == 1
+    assert [quiz["id"] for quiz in fake.quizzes] == [quiz["id"]]
+
+
+def test_import_quizzes_rejects_duplicate_titles(canvas: CanvasAPI):
+    with pytest.raises(ValueError, match="distinct titles"):
+        canvas.import_quizzes([QuizSchema(**QUIZ), QuizSchema(**QUIZ)])
+
+
+def test_manifest_keeps_the_attachments_downloaded_before_a_failure(
+    canvas: CanvasAPI, fake: FakeCanvas, tmp_path, monkeypatch
+):
+    assignment_id = fake.assignments[0]["id"]
+    user_id, submission = next(iter(fake.submissions[assignment_id].items()))
+    broken_id = fake.next_id()
+    fake.blobs[broken_id] = b"%PDF broken"
+    broken = {"id": broken_id, "filename": "broken.pdf", "size": 11, "url": f"{{base_url}}/download/{broken_id}"}
+    submission["attachments"].append({**submission["attachments"][0], **broken})
+    fail_route(monkeypatch, fake, "GET", f"/download/{broken_id}", status=403)
+
+    manifest_path = str(tmp_path / "manifest.json")
+    with pytest.raises(Exception):
+        canvas.download_student_submission_attachments(
+            assignment_id, user_id, download_dir=str(tmp_path), manifest_path=manifest_path
+        )
+    with open(manifest_path) as f:
+        recorded = json.load(f)["attachments"]
+    assert list(recorded) == [str(submission["attachments"][0]["id"])]
+
+
+def test_downloads_are_retried_in_the_lane_of_the_caller(canvas: CanvasAPI, fake: FakeCanvas, tmp_path, monkeypatch):
+    assignment_id = fake.assignments[0]["id"]
+    route = fake.route
+    failures = []
+
+    def flaky_route(method, path, query, body, headers):
+        if path.startswith("/download/") and not failures:
+            failures.append(path)
+            return 503, {"errors": [{"message": "injected failure"}]}, {}
+        return route(method, path, query, body, headers)
+
+    monkeypatch.setattr(fake, "route", flaky_route)
+    with lane("bulk"):
+        paths = canvas.download_all_submission_attachments(assignment_id, download_dir=str(tmp_path))
+    assert len(paths) == len(fake.submissions[assignment_id])
+    assert failures
+    assert canvas.scheduler.stats()["bulk"]["granted"] >= len(paths) + 1
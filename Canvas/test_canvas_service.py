@@ -2,6 +2,7 @@ import json
 import os
 import pprint
 import unittest
+from Canvas.AsyncCanvasService import AsyncCanvasAPI
 from Canvas.CanvasService import CanvasAPI
 
 import sys
@@ -45,6 +46,13 @@ class TestCanvasAPI(unittest.TestCase):
         )
         print(f"Updated grade for user {self.user_id}: {updated_grade}")
 
+    def test_bulk_update_grades(self):
+        """Grades are posted in a single job which is polled until it completes"""
+        jobs = self.canvas.bulk_update_grades(self.assignment_id, {self.user_id: 10})
+        self.assertEqual(len(jobs), 1, "A single job should be created")
+        self.assertEqual(jobs[0].workflow_state, "completed", "The job should be completed")
+        self.assertEqual(str(self.canvas.get_student_grade(self.assignment_id, self.user_id)), "10")
+
     def test_get_users_in_course(self):
         # Call the method to retrieve users
         users = self.canvas.get_users_in_course()
@@ -177,6 +185,14 @@ class TestCanvasAPI(unittest.TestCase):
         self.assertIsNotNone(updated_page, "Page should be updated successfully")
         print("updated_page = ", updated_page)
 
+    def test_connection_reuse(self):
+        """Consecutive requests should share the pooled keep-alive connection"""
+        self.canvas.list_modules()
+        self.canvas.list_modules()
+        stats = self.canvas.connection_stats()
+        self.assertGreater(stats["connections_reused"], 0, "The second request should reuse the open connection")
+        print("connection stats = ", stats)
+
     def test_get_submissions(self):
         """Testing get_submissions method"""
         # Get submissions for a specific assignment
@@ -207,5 +223,26 @@ class TestCanvasAPI(unittest.TestCase):
                 shutil.rmtree(parent_dir)
 
 
+class TestAsyncCanvasAPI(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.course_id = 15319
+        self.assignment_id = 53371
+        self.user_id = 140799
+        self.canvas = AsyncCanvasAPI(course_id=self.course_id, max_concurrency=5)
+
+    async def asyncTearDown(self):
+        await self.canvas.aclose()
+
+    async def test_get_users_in_course(self):
+        users = await self.canvas.get_users_in_course()
+        self.assertGreater(len(users), 0, "Users should be retrieved from the course")
+
+    async def test_update_student_grades(self):
+        """Grades are posted concurrently and returned per user"""
+        updated = await self.canvas.update_student_grades(self.assignment_id, {self.user_id: 10})
+        self.assertEqual(str(updated[self.user_id]), "10", "Updated grade should match the new grade")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,62 @@
+import functools
+import pytest
+
+from benchmarks.fake_canvas import ASSIGNMENT_TITLE, MODULE_TITLE, FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Canvas.CourseMetadataCache import CourseMetadataCache
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+fake_canvas = functools.partial(FakeCanvas.with_teams, 1)
+
+
+def test_cache_is_shared_through_its_file(tmp_path):
+    path = str(tmp_path / "metadata.json")
+    CourseMetadataCache(1, path).replace("modules", {"Presentations": 7})
+    CourseMetadataCache(2, path).record("modules", "Other course", 8)
+    metadata = CourseMetadataCache(1, path)
+    assert metadata.lookup("modules", "Presentations") == 7
+    assert metadata.lookup("modules", "Other course") is None
+
+
+def test_only_assignments_ignore_case():
+    metadata = CourseMetadataCache(1)
+    metadata.record("assignments", " Presentation ", 1)
+    metadata.record("modules", "Presentations", 2)
+    assert metadata.lookup("assignments", "presentation") == 1
+    assert metadata.lookup("modules", "presentations") is None
+    assert metadata.lookup("modules", "Presentations") == 2
+
+
+def test_module_and_page_titles_match_exactly(canvas: CanvasAPI):
+    assert canvas.get_module_by_title(MODULE_TITLE).name == MODULE_TITLE
+    with pytest.raises(ValueError):
+        canvas.get_module_by_title(MODULE_TITLE.lower())
+
+
+def test_page_is_found_by_its_own_title(canvas: CanvasAPI, fake: FakeCanvas):
+    module_id = fake.modules[0]["id"]
+    page = fake.add_page("Team 1", "<p>Team 1</p>")
+    fake.add_module_item(module_id, "Team 1 presentation", page_url=page["url"])
+    assert canvas.get_page_by_title("Team 1", module_id).body == "<p>Team 1</p>"
+    with pytest.raises(ValueError):
+        canvas.get_page_by_title("Team 1 presentation", module_id)
+
+
+def test_renamed_page_is_looked_up_again(canvas: CanvasAPI, fake: FakeCanvas):
+    module_id = fake.modules[0]["id"]
+    for title in ("Team 1", "Team 2"):
+        page = fake.add_page(title, f"<p>{title}</p>")
+        fake.add_module_item(module_id, title, page_url=page["url"])
+    canvas.get_page_by_title("Team 1", module_id)
+    fake.pages["team-1"]["title"], fake.pages["team-2"]["title"] = "Team 2", "Team 1"
+    assert canvas.get_page_by_title("Team 1", module_id).body == "<p>Team 2</p>"
+
+
+def test_deleted_assignment_is_looked_up_again(canvas: CanvasAPI, fake: FakeCanvas):
+    first = canvas.get_assignment_by_title(ASSIGNMENT_TITLE.upper())
+    fake.assignments.clear()
+    second = fake.add_assignment(ASSIGNMENT_TITLE)["id"]
+    assert canvas.get_assignment_by_title(ASSIGNMENT_TITLE) == second != first
@@ -0,0 +1,67 @@
+import asyncio
+import email.parser
+import os
+
+import pytest
+
+from Canvas.MultipartEncoder import AsyncMultipartBody, MultipartEncoder
+
+
+def parse(body: bytes, content_type: str):
+    message = email.parser.BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return {
+        part.get_param("name", header="Content-Disposition"): part.get_payload(decode=True)
+        for part in message.walk()
+        if not part.is_multipart()
+    }
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_body_is_streamed_in_chunks(tmp_path, use_mmap):
+    path = tmp_path / "slides.pdf"
+    content = os.urandom(10_000)
+    path.write_bytes(content)
+    progress = []
+
+    with MultipartEncoder(
+        {"key": "uploads/slides.pdf"},
+        "file",
+        str(path),
+        chunk_size=1024,
+        progress=lambda *p: progress.append(p),
+        use_mmap=use_mmap,
+    ) as body:
+        chunks = list(iter(lambda: body.read(4096), b""))
+        assert max(len(chunk) for chunk in chunks) == 1024
+        data = b"".join(chunks)
+        assert len(data) == len(body)
+        parts = parse(data, body.content_type)
+    assert parts == {"key": b"uploads/slides.pdf", "file": content}
+    assert progress[-1] == (len(data), len(data))
+
+
+def test_file_truncated_during_the_upload(tmp_path):
+    path = tmp_path / "slides.pdf"
+    path.write_bytes(b"x" * 1000)
+    with MultipartEncoder({}, "file", str(path)) as body:
+        with open(path, "wb"):
+            pass
+        with pytest.raises(IOError):
+            body.read()
+
+
+def test_async_body_is_sent_whole_every_time(tmp_path):
+    path = tmp_path / "slides.pdf"
+    content = os.urandom(10_000)
+    path.write_bytes(content)
+    body = AsyncMultipartBody({"key": "uploads/slides.pdf"}, "file", str(path), chunk_size=1024)
+
+    async def collect():
+        return [chunk async for chunk in body]
+
+    for _ in range(2):  # A retried request iterates the body again
+        chunks = asyncio.run(collect())
+        assert max(len(chunk) for chunk in chunks) == 1024
+        data = b"".join(chunks)
+        assert len(data) == len(body) == int(body.headers["Content-Length"])
+        assert parse(data, body.headers["Content-Type"]) == {"key": b"uploads/slides.pdf", "file": content}
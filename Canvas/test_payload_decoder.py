@@ -0,0 +1,39 @@
+import json
+
+import pydantic
+import pytest
+
+from Canvas.PayloadDecoder import decode_list
+from Canvas.schemas import ModuleItemSchema
+
+ITEMS = [
+    {
+        "id": index,
+        "module_id": 1,
+        "position": index,
+        "title": f"Team {index}",
+        "indent": 0,
+        "type": "Page",
+        "html_url": f"https://canvas.test/courses/1/modules/items/{index}",
+        "page_url": f"team-{index}",
+    }
+    for index in range(1, 4)
+]
+
+
+def test_batch_and_validate_decode_the_same_items():
+    content = json.dumps(ITEMS).encode()
+    batch = decode_list(content, ModuleItemSchema, mode="batch")
+    assert batch == decode_list(content, ModuleItemSchema, mode="validate")
+    assert [item.page_url for item in batch] == ["team-1", "team-2", "team-3"]
+
+
+def test_without_schema_returns_the_dictionaries():
+    assert decode_list(json.dumps(ITEMS), None) == ITEMS
+
+
+def test_invalid_item_and_unknown_mode():
+    with pytest.raises(pydantic.ValidationError):
+        decode_list(json.dumps([{"id": "not a number"}]), ModuleItemSchema)
+    with pytest.raises(ValueError):
+        decode_list(b"[]", ModuleItemSchema, mode="lazy")  # type: ignore[arg-type]
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from Canvas.PriorityScheduler import PriorityScheduler, current_lane, lane
+from Deadline import DeadlineExceeded, deadline
+
+
+def test_lane_of_the_context():
+    assert current_lane() == "normal"
+    with lane("bulk"):
+        assert current_lane() == "bulk"
+    assert current_lane() == "normal"
+    with pytest.raises(ValueError):
+        with lane("urgent"):  # type: ignore[arg-type]
+            pass
+
+
+def test_submit_runs_in_its_lane():
+    scheduler = PriorityScheduler(max_in_flight=2)
+    assert scheduler.submit(current_lane, lane="bulk").result() == "bulk"
+    scheduler.shutdown()
+
+
+def test_reserved_slot_is_only_given_to_interactive_requests():
+    scheduler = PriorityScheduler(max_in_flight=2, reserved_interactive=1)
+    with scheduler.slot("bulk"):
+        with deadline(0.1):
+            with pytest.raises(DeadlineExceeded):
+                with scheduler.slot("normal"):
+                    pass
+        with scheduler.slot("interactive"):
+            assert scheduler.stats()["interactive"]["in_flight"] == 1
+    assert scheduler.stats()["normal"]["waiting"] == 0
+
+
+def test_waiting_lanes_are_served_by_weight():
+    scheduler = PriorityScheduler(max_in_flight=1, reserved_interactive=0, weights={"interactive": 2, "bulk": 1})
+    order = []
+    ready = threading.Barrier(7)
+
+    def request(name):
+        ready.wait()
+        with scheduler.slot(name):
+            order.append(name)
+
+    with scheduler.slot("normal"):  # Hold the only slot until every request is waiting
+        threads = [threading.Thread(target=request, args=(name,)) for name in ["bulk"] * 3 + ["interactive"] * 3]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+        while sum(stats["waiting"] for stats in scheduler.stats().values()) < 6:
+            time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    assert order[:3] == ["interactive", "bulk", "interactive"]
+    assert sorted(order) == ["bulk"] * 3 + ["interactive"] * 3
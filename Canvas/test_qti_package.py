@@ -0,0 +1,62 @@
+import io
+import zipfile
+from xml.etree import ElementTree as ET
+
+import pytest
+
+from Canvas.QTIPackage import QTI_NAMESPACE, build_qti_package
+from Canvas.schemas import QuizSchema
+
+NS = {"qti": QTI_NAMESPACE}
+
+
+def quiz(question_type: str, weights) -> QuizSchema:
+    return QuizSchema(
+        title="Quiz",
+        description="",
+        quiz_type="assignment",
+        time_limit=10,
+        allowed_attempts=1,
+        questions=[
+            {
+                "question_name": "Question",
+                "question_text": "Which ones?",
+                "question_type": question_type,
+                "points_possible": 1,
+                "answers": [
+                    {"answer_text": f"Answer {index}", "answer_weight": weight} for index, weight in enumerate(weights)
+                ],
+            }
+        ],
+    )
+
+
+def condition(package: bytes) -> ET.Element:
+    with zipfile.ZipFile(io.BytesIO(package)) as archive:
+        assert "imsmanifest.xml" in archive.namelist()
+        root = ET.fromstring(archive.read("quiz_1/quiz_1.xml"))
+    return root.find(".//qti:respcondition/qti:conditionvar", NS)  # type: ignore[return-value]
+
+
+def test_single_answer_with_several_correct_answers_scores_any_of_them():
+    variables = condition(build_qti_package([quiz("multiple_choice_question", [50, 50, 0])]))
+    (either,) = list(variables)
+    assert either.tag == f"{{{QTI_NAMESPACE}}}or"
+    assert [equal.text for equal in either] == ["quiz_1_q1_a1", "quiz_1_q1_a2"]
+
+
+def test_single_answer_with_one_correct_answer():
+    variables = condition(build_qti_package([quiz("multiple_choice_question", [0, 100])]))
+    assert [(child.tag.split("}")[1], child.text) for child in variables] == [("varequal", "quiz_1_q1_a2")]
+
+
+def test_multiple_answers_require_exactly_the_correct_ones():
+    variables = condition(build_qti_package([quiz("multiple_answers_question", [100, 0])]))
+    (both,) = list(variables)
+    assert both.tag == f"{{{QTI_NAMESPACE}}}and"
+    assert [child.tag.split("}")[1] for child in both] == ["varequal", "not"]
+
+
+def test_unsupported_question_type():
+    with pytest.raises(ValueError, match="essay_question"):
+        build_qti_package([quiz("essay_question", [100])])
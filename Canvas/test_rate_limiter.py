@@ -0,0 +1,72 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from Canvas.RateLimiter import RateLimitScheduler, is_rate_limited, parse_retry_after
+from Deadline import DeadlineExceeded, deadline
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 < parse_retry_after(in_a_minute) <= 60  # type: ignore[operator]
+
+
+def test_is_rate_limited():
+    assert is_rate_limited(429, "")
+    assert is_rate_limited(403, "403 Forbidden (Rate Limit Exceeded)")
+    assert not is_rate_limited(403, "unauthorized")
+
+
+def test_concurrency_and_pacing_follow_the_bucket():
+    scheduler = RateLimitScheduler(max_concurrency=8, bucket_capacity=700, refill_rate=10, low_water=150)
+    assert scheduler.pacing_delay() == 0
+    scheduler.observe({"X-Rate-Limit-Remaining": "350", "X-Request-Cost": "5"})
+    assert scheduler.metrics()["concurrency_limit"] == 4
+    assert scheduler.pacing_delay() == 0
+    scheduler.observe({"X-Rate-Limit-Remaining": "0"})
+    assert scheduler.metrics()["concurrency_limit"] == 1
+    assert 0.5 < scheduler.pacing_delay() <= 1.0
+
+
+def test_throttle_blocks_for_retry_after():
+    scheduler = RateLimitScheduler()
+    scheduler.throttle(0.2)
+    start = time.monotonic()
+    scheduler.acquire()
+    scheduler.release()
+    assert time.monotonic() - start >= 0.19
+
+
+def paced_scheduler() -> RateLimitScheduler:
+    scheduler = RateLimitScheduler(refill_rate=10, low_water=150, max_pacing_delay=0.5)
+    scheduler.observe({"X-Rate-Limit-Remaining": "0", "X-Request-Cost": "5"})
+    return scheduler
+
+
+def test_pacing_does_not_hold_a_slot():
+    scheduler = paced_scheduler()
+    paced = threading.Thread(target=scheduler.acquire)
+    paced.start()
+    time.sleep(0.1)
+    assert scheduler.metrics()["in_flight"] == 0
+    assert scheduler.metrics()["queued"] == 1
+    paced.join()
+    assert scheduler.metrics()["in_flight"] == 1
+
+
+def test_pacing_stops_at_the_deadline():
+    scheduler = paced_scheduler()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded), deadline(0.1):
+        scheduler.acquire()
+    assert time.monotonic() - start < 0.4
+    assert scheduler.metrics()["in_flight"] == 0
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+import requests
+
+from Canvas.RequestHedger import RequestHedger
+from Canvas.RequestMetrics import RequestMetrics, RequestSample
+
+ENDPOINT = "GET /courses/:id/pages/:url"
+
+
+def response(status: int = 200) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    return response
+
+
+def test_delay_needs_enough_samples():
+    metrics = RequestMetrics()
+    hedger = RequestHedger(percentile=50, min_samples=5, min_delay=0.05)
+    assert hedger.delay(metrics, ENDPOINT) is None
+    for _ in range(5):
+        metrics.record(
+            RequestSample(
+                method="GET",
+                url="https://canvas.test",
+                endpoint=ENDPOINT,
+                status=200,
+                seconds=0.01,
+                bytes_sent=0,
+                bytes_received=0,
+            )
+        )
+    assert hedger.delay(metrics, ENDPOINT) == 0.05
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        RequestHedger(percentile=100)
+    with pytest.raises(ValueError):
+        RequestHedger(budget=-1)
+
+
+def test_slow_request_is_hedged_and_the_duplicate_wins():
+    hedger = RequestHedger(budget=1, max_burst=1)
+    calls = []
+    slow = response(200)
+
+    def send():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return slow
+        return response(201)
+
+    assert hedger.run(send, delay=0.05).status_code == 201
+    stats = hedger.stats()
+    assert stats["hedged"] == stats["hedge_won"] == 1
+    hedger.shutdown()
+
+
+def test_no_hedge_without_budget():
+    hedger = RequestHedger(budget=0)
+    assert hedger.run(lambda: (time.sleep(0.1), response())[1], delay=0.01).status_code == 200
+    assert hedger.stats()["over_budget"] == 1
+    hedger.shutdown()
+
+
+def test_time_queued_for_a_worker_does_not_count_toward_the_delay():
+    hedger = RequestHedger(budget=1, max_burst=1, workers=1)
+    hedger._submit(lambda: time.sleep(0.3))  # Another request holds the only worker
+
+    assert hedger.run(lambda: (time.sleep(0.02), response())[1], delay=0.1).status_code == 200
+    assert hedger.stats()["hedged"] == 0
+    hedger.shutdown()
@@ -0,0 +1,71 @@
+import threading
+
+from Canvas.RequestMetrics import RequestMetrics, RequestSample, endpoint_template
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+ENDPOINT = "GET /courses/:id/pages/:url"
+
+
+def sample(seconds: float, status: int = 200) -> RequestSample:
+    return RequestSample(
+        method="GET",
+        url="https://canvas.test/api/v1/courses/1/pages/team-1",
+        endpoint=ENDPOINT,
+        status=status,
+        seconds=seconds,
+        bytes_sent=0,
+        bytes_received=100,
+    )
+
+
+def test_endpoint_template():
+    base_url = "https://canvas.test"
+    assert endpoint_template("GET", f"{base_url}/api/v1/courses/1/pages/team-1?x=1", base_url) == ENDPOINT
+    assert endpoint_template("GET", "https://files.test/download/1", base_url) == "GET files.test"
+
+
+def test_action_reports_its_requests_without_dropping_the_latencies():
+    metrics = RequestMetrics()
+    for _ in range(20):
+        metrics.record(sample(0.01))
+    with metrics.action("Create pages"):
+        metrics.record(sample(1.0, status=500))
+
+    assert metrics.percentile(ENDPOINT, 50, min_samples=20) == 0.01  # Still known to RequestHedger
+    totals = metrics.snapshot()[0]
+    assert totals["requests"] == 21
+    assert totals["errors"] == 1
+
+
+def test_snapshot_since_a_mark():
+    metrics = RequestMetrics(max_samples=4)
+    for _ in range(10):
+        metrics.record(sample(0.01))
+    mark = metrics.mark()
+    metrics.record(sample(2.0, status=404))
+    (stats,) = metrics.snapshot(since=mark)
+    assert stats["requests"] == 1
+    assert stats["errors"] == 1
+    assert stats["status_codes"] == {"404": 1}
+    assert stats["p50"] == stats["p99"] == 2.0
+
+
+def test_concurrent_actions_are_reported_once():
+    metrics = RequestMetrics()
+    summaries = []
+    metrics.summary = lambda title, since=None: summaries.append(title) or ""  # type: ignore[method-assign]
+    started = threading.Barrier(4)
+
+    def action():
+        with metrics.action("Download"):
+            started.wait()
+            metrics.record(sample(0.01))
+
+    threads = [threading.Thread(target=action) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert summaries == ["Download"]
@@ -0,0 +1,63 @@
+import requests
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Canvas.ResponseCache import ResponseCache
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+URL = "https://canvas.test/api/v1/courses/1/pages"
+
+
+def test_key_depends_on_the_token():
+    assert ResponseCache.key(URL, {"page": 2}) == f"{URL}?page=2"
+    first, second = ResponseCache.key(URL, token="first"), ResponseCache.key(URL, token="second")
+    assert first != second
+    assert first.startswith(URL) and second.startswith(URL)
+
+
+def page_response(body: bytes, etag: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["ETag"] = etag
+    response._content = body
+    return response
+
+
+def test_invalidate_removes_the_responses_of_every_token(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    for token in ("first", "second"):
+        cache.resolve(ResponseCache.key(f"{URL}/team-1", token=token), page_response(b"{}", '"1"'))
+    assert cache.conditional_headers(ResponseCache.key(f"{URL}/team-1", token="first")) == {"If-None-Match": '"1"'}
+    assert cache.conditional_headers(ResponseCache.key(f"{URL}/team-1", token="third")) == {}
+    assert cache.invalidate(URL) == 2
+    cache.close()
+
+
+def test_not_modified_is_answered_from_the_cache(fake: FakeCanvas, tmp_path):
+    url = fake.add_page("Team 1", "<p>Team 1</p>")["url"]
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url, response_cache=cache) as canvas:
+        canvas.get_page_by_id(url)
+        page = canvas.get_page_by_id(url)
+        assert page.body == "<p>Team 1</p>"
+        assert cache.stats()["hits"] == 1
+
+
+def test_not_modified_after_the_cached_response_is_gone(fake: FakeCanvas, tmp_path, monkeypatch):
+    """The response is evicted between sending the validators and receiving the 304: it is requested again"""
+    url = fake.add_page("Team 1", "<p>Team 1</p>")["url"]
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url, response_cache=cache) as canvas:
+        canvas.get_page_by_id(url)
+        conditional_headers = cache.conditional_headers
+
+        def evicted_in_flight(key):
+            headers = conditional_headers(key)
+            cache.clear()
+            return headers
+
+        monkeypatch.setattr(cache, "conditional_headers", evicted_in_flight)
+        page = canvas.get_page_by_id(url)
+        assert page.body == "<p>Team 1</p>"
@@ -0,0 +1,29 @@
+from Canvas.RosterCache import RosterCache
+
+USERS = [
+    {"id": 1, "name": "Ada Lovelace", "email": "Ada@Example.edu"},
+    {"id": 2, "name": "Alan Turing", "email": "alan@example.edu"},
+    {"id": 3, "name": "alan turing ", "email": None},
+]
+
+
+def test_lookups_ignore_case_and_spaces():
+    roster = RosterCache(lambda: USERS)
+    assert roster.by_email(" ada@example.EDU ")["id"] == 1
+    assert roster.by_id(2)["name"] == "Alan Turing"
+    assert [user["id"] for user in roster.by_name("Alan Turing")] == [2, 3]
+    assert roster.emails() == {"ada@example.edu", "alan@example.edu"}
+
+
+def test_roster_is_fetched_once_until_stale():
+    fetches = []
+    roster = RosterCache(lambda: fetches.append(None) or USERS, ttl=600)
+    roster.by_email("ada@example.edu")
+    roster.by_id(1)
+    assert len(fetches) == 1
+    roster.invalidate()
+    roster.users()
+    assert len(fetches) == 2
+    roster.prime(USERS[:1])
+    assert roster.by_id(2) is None
+    assert len(fetches) == 2
@@ -0,0 +1,106 @@
+import functools
+import threading
+import time
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Canvas.PriorityScheduler import lane
+from Canvas.SingleFlight import SingleFlight
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+def run_together(*calls):
+    """Start the calls on threads, the first one a little before the others so that it leads."""
+    results = [None] * len(calls)
+
+    def run(index):
+        results[index] = calls[index]()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(calls))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow(result, seconds: float = 0.2):
+    def fn():
+        time.sleep(seconds)
+        return result
+
+    return fn
+
+
+def test_identical_calls_run_once():
+    flights = SingleFlight()
+    calls = []
+    results = run_together(*[lambda: flights.do("key", lambda: calls.append(None) or slow("result")())] * 3)
+    assert results == ["result"] * 3
+    assert len(calls) == 1
+    assert flights.stats() == {"calls": 3, "executed": 1, "coalesced": 2, "timed_out": 0}
+
+
+def test_error_is_shared():
+    flights = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("failed")
+
+    errors = []
+
+    def call():
+        try:
+            flights.do("key", fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    run_together(call, call)
+    assert len(errors) == 2
+
+
+def test_follower_runs_its_own_call_after_its_timeout():
+    flights = SingleFlight()
+    start = time.monotonic()
+    leader, follower = run_together(
+        lambda: flights.do("key", slow("leader", 1.0)),
+        lambda: flights.do("key", lambda: "follower", timeout=0.05),
+    )
+    assert (leader, follower) == ("leader", "follower")
+    assert flights.stats() == {"calls": 2, "executed": 2, "coalesced": 0, "timed_out": 1}
+    assert time.monotonic() - start < 1.5
+
+
+def test_every_follower_gets_its_own_copy():
+    flights = SingleFlight()
+    results = run_together(*[lambda: flights.do("key", slow({"title": "Page"}), copy=dict)] * 3)
+    results[1]["title"] = "Changed"
+    assert results[0] == results[2] == {"title": "Page"}
+
+
+fake_canvas = functools.partial(FakeCanvas, latency=0.2)
+
+
+def test_requests_of_different_lanes_are_not_coalesced(fake: FakeCanvas):
+    url = fake.add_page("Team 1", "<p>Team 1</p>")["url"]
+
+    def get_page(name):
+        with lane(name):
+            return canvas._make_request("GET", f"pages/{url}")
+
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url) as canvas:
+        run_together(lambda: get_page("bulk"), lambda: get_page("interactive"), lambda: get_page("interactive"))
+        assert canvas.single_flight.stats()["coalesced"] == 1
+
+
+def test_coalesced_json_is_not_shared(fake: FakeCanvas):
+    url = fake.add_page("Team 1", "<p>Team 1</p>")["url"]
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url) as canvas:
+        pages = run_together(*[lambda: canvas._make_request("GET", f"pages/{url}")] * 3)
+        assert canvas.single_flight.stats()["coalesced"] == 2
+        pages[0]["title"] = "Changed"
+        assert pages[1]["title"] == pages[2]["title"] == "Team 1"
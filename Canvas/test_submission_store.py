@@ -0,0 +1,48 @@
+import functools
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Canvas.schemas import SubmissionSchema
+from Canvas.SubmissionStore import SubmissionStore
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+def submission(user_id: int, score: float) -> SubmissionSchema:
+    return SubmissionSchema(assignment_id=1, user_id=user_id, score=score, workflow_state="graded", redo_request=False)
+
+
+def test_merge_is_kept_in_the_file(tmp_path):
+    path = str(tmp_path / "submissions.json")
+    SubmissionStore(path).merge(1, [submission(10, 50), submission(11, 60)], "2024-01-01T00:00:00Z")
+    store = SubmissionStore(path)
+    store.merge(1, [submission(10, 90)], "2024-01-02T00:00:00Z", user_ids=[10])
+    assert {s.user_id: s.score for s in store.submissions(1)} == {10: 90, 11: 60}
+    assert [s.user_id for s in store.submissions(1, [11])] == [11]
+
+
+def test_synced_at_is_the_oldest_sync_of_the_students():
+    store = SubmissionStore()
+    assert store.synced_at(1) is None
+    store.merge(1, [], "2024-01-01T00:00:00Z", user_ids=[10])
+    store.merge(1, [], "2024-01-03T00:00:00Z", user_ids=[11])
+    assert store.synced_at(1, [10, 11]) == "2024-01-01T00:00:00Z"
+    assert store.synced_at(1, [10, 12]) is None
+    assert store.synced_at(1) is None  # Never synced as a whole
+    store.forget(1)
+    assert store.submissions(1) == []
+
+
+fake_canvas = functools.partial(FakeCanvas.with_teams, 2)
+
+
+def test_sync_only_fetches_the_changed_submissions(fake: FakeCanvas):
+    assignment_id = fake.assignments[0]["id"]
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url) as canvas:
+        assert len(canvas.sync_submissions(assignment_id)) == len(fake.submissions[assignment_id])
+        user_id = next(iter(fake.submissions[assignment_id]))
+        fake.submissions[assignment_id][user_id].update(grade="95", score=95.0, graded_at="2999-01-01T00:00:00Z")
+        synced = {s.user_id: s.score for s in canvas.sync_submissions(assignment_id)}
+    assert synced[user_id] == 95.0
+    assert len(synced) == len(fake.submissions[assignment_id])
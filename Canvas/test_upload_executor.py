@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Canvas.UploadExecutor import HostLimiter, UploadExecutor
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+def test_upload_many_reports_the_overall_progress(fake: FakeCanvas, tmp_path):
+    paths = []
+    for index in range(4):
+        path = tmp_path / f"paper{index}.pdf"
+        path.write_bytes(b"%PDF" + bytes([index]) * 20_000)
+        paths.append(str(path))
+    progress = []
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url) as canvas:
+        with UploadExecutor(canvas, max_workers=4, progress=lambda *p: progress.append(p)) as uploads:
+            urls = uploads.upload_many(paths)
+    file_ids = [int(url.rsplit("/", 1)[-1]) for url in urls]
+    assert [fake.blobs[file_id] for file_id in file_ids] == [open(path, "rb").read() for path in paths]
+    sent, total = progress[-1]
+    assert sent == total > 80_000
+
+
+def test_failed_upload_is_raised_by_its_future(fake: FakeCanvas, tmp_path):
+    with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url) as canvas:
+        with UploadExecutor(canvas) as uploads:
+            future = uploads.submit(str(tmp_path / "missing.pdf"))
+            with pytest.raises(Exception):
+                future.result()
+
+
+def test_host_limiter_caps_each_host():
+    limiter = HostLimiter(per_host=2, limits={"files.test": 1})
+    in_flight = {"canvas.test": 0, "files.test": 0}
+    peak = dict(in_flight)
+    lock = threading.Lock()
+
+    def request(host):
+        with limiter.slot(f"https://{host}/upload"):
+            with lock:
+                in_flight[host] += 1
+                peak[host] = max(peak[host], in_flight[host])
+            time.sleep(0.02)
+            with lock:
+                in_flight[host] -= 1
+
+    threads = [threading.Thread(target=request, args=(host,)) for host in ["canvas.test", "files.test"] * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == {"canvas.test": 2, "files.test": 1}
@@ -0,0 +1,68 @@
+import pytest
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Canvas.schemas import FileSchema
+from Canvas.UploadIndex import UploadIndex
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+
+def file(file_id: int, size: int) -> FileSchema:
+    return FileSchema(
+        id=file_id, display_name="paper.pdf", filename="paper.pdf", url=f"https://files.test/{file_id}", size=size
+    )
+
+
+def test_record_is_kept_in_the_file(tmp_path):
+    path = str(tmp_path / "upload_index.json")
+    UploadIndex(1, path).record("abc", 1, "https://files.test/old", "paper.pdf", 100)
+    assert UploadIndex(1, path).lookup("abc")["file_id"] == 1
+    assert UploadIndex(1, path).lookup("def") is None
+    assert UploadIndex(2, path).lookup("abc") is None
+
+
+def test_reconcile_drops_deleted_and_changed_files():
+    index = UploadIndex(1)
+    index.record("deleted", 1, "https://files.test/old", "paper.pdf", 100)
+    index.record("changed", 2, "https://files.test/old", "paper.pdf", 100)
+    index.record("kept", 3, "https://files.test/old", "paper.pdf", 100)
+    assert index.reconcile([file(2, 50), file(3, 100)]) == 2
+    assert list(index.entries) == ["kept"]
+    assert index.lookup("kept")["url"] == "https://files.test/3"
+
+
+def test_same_content_is_uploaded_once(fake: FakeCanvas, tmp_path):
+    paths = [tmp_path / "paper.pdf", tmp_path / "paper copy.pdf"]
+    for path in paths:
+        path.write_bytes(b"%PDF same paper")
+    with CanvasAPI(
+        fake.course_id, api_token="test", base_url=fake.base_url, upload_index=UploadIndex(fake.course_id)
+    ) as canvas:
+        urls = [canvas.upload_file(str(path)) for path in paths]
+    assert urls[0] == urls[1]
+    assert len(fake.files) == 1
+
+
+def test_courses_keep_their_own_uploads(tmp_path):
+    index_path = str(tmp_path / "upload_index.json")
+    paper = tmp_path / "paper.pdf"
+    paper.write_bytes(b"%PDF same paper")
+    fakes = [FakeCanvas(course_id=1), FakeCanvas(course_id=2)]
+    for fake in fakes:
+        fake.start()
+    try:
+        for fake in fakes + fakes:  # Switching back and forth between the courses
+            index = UploadIndex(fake.course_id, index_path)
+            with CanvasAPI(fake.course_id, api_token="test", base_url=fake.base_url, upload_index=index) as canvas:
+                canvas.upload_file(str(paper))
+    finally:
+        for fake in fakes:
+            fake.stop()
+    assert [len(fake.files) for fake in fakes] == [1, 1]
+
+
+def test_index_of_another_course_is_rejected():
+    with pytest.raises(ValueError):
+        CanvasAPI(1, api_token="test", base_url="https://canvas.test", upload_index=UploadIndex(2))
@@ -0,0 +1,104 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
+
+# Seconds a single HTTP request may take when no deadline is set, so that a hung socket cannot block forever
+DEFAULT_REQUEST_TIMEOUT = 60.0
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an operation runs out of its time budget, the work still to do is not started."""
+
+
+class _Deadline(NamedTuple):
+    expires_at: float  # time.monotonic() when the budget runs out
+    budget: float  # Seconds given to the operation
+    operation: str  # What the budget was given to, for the error messages
+
+
+_current_deadline: contextvars.ContextVar[Optional[_Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float], operation: str = "The operation") -> Iterator[None]:
+    """
+    Give the code inside the block a total time budget.
+
+    Every request sent inside the block gets the remaining budget as its timeout, and the waits for a request slot
+    or a retry stop once it is spent. A nested budget cannot extend the one of the enclosing block. Worker threads
+    do not inherit the deadline, submit their work with ``contextvars.copy_context().run`` to keep it.
+
+    Args:
+        seconds (float, optional): The budget, the block runs without one if None.
+        operation (str): Named in the DeadlineExceeded errors.
+
+    Example:
+        >>> with deadline(300, "Posting the grades"):
+        ...     canvas.bulk_update_grades(assignment_id, grades)  # Raises DeadlineExceeded after 300 seconds
+    """
+    if seconds is None:
+        yield
+        return
+    current = _current_deadline.get()
+    expires_at = time.monotonic() + seconds
+    if current is not None and current.expires_at <= expires_at:
+        yield  # The enclosing budget runs out first
+        return
+    token = _current_deadline.set(_Deadline(expires_at, seconds, operation))
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, None if there is none. Negative once it is spent."""
+    current = _current_deadline.get()
+    return None if current is None else current.expires_at - time.monotonic()
+
+
+def check_deadline(action: str = ""):
+    """
+    Raise if the current budget is spent.
+
+    Args:
+        action (str): What was about to be done, for the error message.
+
+    Raises:
+        DeadlineExceeded: If the budget is spent.
+    """
+    current = _current_deadline.get()
+    if current is not None and time.monotonic() >= current.expires_at:
+        detail = f" before {action}" if action else ""
+        raise DeadlineExceeded(f"{current.operation} ran out of its {current.budget:g} second budget{detail}")
+
+
+def request_timeout(default: float = DEFAULT_REQUEST_TIMEOUT, action: str = "") -> float:
+    """
+    The timeout of an HTTP request: the remaining budget, at most ``default``.
+
+    Raises:
+        DeadlineExceeded: If the budget is already spent.
+    """
+    check_deadline(action)
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def sleep_within_deadline(seconds: float, action: str = ""):
+    """
+    Sleep, unless the current budget would run out first.
+
+    Raises:
+        DeadlineExceeded: Right away if the budget ends before the sleep would.
+    """
+    left = remaining()
+    if left is not None and left <= seconds:
+        check_deadline(action)  # Spent already
+        current = _current_deadline.get()
+        raise DeadlineExceeded(
+            f"{current.operation} would run out of its {current.budget:g} second budget "  # type: ignore[union-attr]
+            f"while waiting {seconds:.1f} seconds{f' before {action}' if action else ''}"
+        )
+    time.sleep(seconds)
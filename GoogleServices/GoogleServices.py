@@ -20,6 +20,7 @@ from GoogleServices.schemas import (
     Request as RequestType,
     Response,
 )
+from Deadline import request_timeout
 from Logging import Print
 
 SCOPES = [
@@ -388,7 +389,8 @@ class GoogleServicesManager:
         Print("Headers:", headers)
         Print("Body:", body)
 
-        response = requests.post(url, headers=headers, json=body)
+        # Times out like the Canvas requests, sooner when the deadline of the operation is closer
+        response = requests.post(url, headers=headers, json=body, timeout=request_timeout(action="disabling the form"))
 
         # More debugging information
         Print("Response Status Code:", response.status_code)
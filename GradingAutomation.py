@@ -1,18 +1,29 @@
+from concurrent.futures import Future
+import functools
 import os
 import pprint
-from typing import List, Tuple, Union
+from typing import Callable, List, Literal, Tuple, TypeVar, Union
 
 from matplotlib import pyplot as plt
 import pandas as pd
 import yaml
 from Canvas.CanvasService import CanvasAPI
+from Canvas.CourseMetadataCache import CourseMetadataCache
+from Canvas.MultipartEncoder import ProgressCallback
+from Canvas.ResponseCache import ResponseCache
+from Canvas.SubmissionStore import SubmissionStore
+from Canvas.UploadExecutor import UploadExecutor
+from Canvas.UploadIndex import UploadIndex
 from Canvas.schemas import PageSchema, QuizSchema
+from Deadline import deadline
 from GoogleServices.GoogleServices import GoogleServicesManager
 from Logging import Print
 from schemas import *
 import json
 from gspread.worksheet import Worksheet
 
+T = TypeVar("T")
+
 
 def read_json_file(file_path: str) -> Dict[str, Any]:
     """Read a JSON file and return its contents as a dictionary"""
@@ -32,6 +43,17 @@ def read_yml_file(file_path: str) -> Dict[str, Any]:
     return data
 
 
+def budgeted(method: Callable[..., T]) -> Callable[..., T]:
+    """Run a Grader method within the time budget set for it in ``Grader.budgets``, DeadlineExceeded otherwise"""
+
+    @functools.wraps(method)
+    def wrapper(self: "Grader", *args, **kwargs) -> T:
+        with deadline(self.budgets.get(method.__name__), f"Grader.{method.__name__}"):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 def create_image(responses: pd.DataFrame, output_path: str):
     """
     This function takes a DataFrame of responses and an output path to save the generated image.
@@ -118,19 +140,67 @@ class Grader:
         "presentation_skills": "Overall grade to this team's Presentation skills?",
         "research_topic": "Overall grade to this team's Research topic and (summary) paper content?",
     }
+    # Seconds every Canvas and Google request of an operation may take in total, so that a hung request cannot
+    # freeze a grading run. The requests get the remaining budget as their timeout.
+    DEFAULT_BUDGETS: Dict[str, Optional[float]] = {
+        "grade_presentation_project": 900,
+        "post_grades": 300,
+        "create_multiple_canvas_pages_based_on_folder": 3600,
+        "create_canvas_page_based_on_folder": 900,
+        "create_quizzes": 1200,
+        "add_google_forms_and_create_quiz": 300,
+        "get_page_status": 60,
+        "remove_feedback_url_and_quiz": 120,
+        "add_images_to_body": 600,
+        "get_pages_posted_in_module": 120,
+    }
 
     def __init__(
         self,
         course_id: int,
         module_title: str,
         api_token: Optional[str] = None,
+        cache_path: Optional[str] = None,
+        upload_index_path: Optional[str] = None,
+        submission_store_path: Optional[str] = None,
+        metadata_path: Optional[str] = None,
+        base_url: str = "https://csulb.instructure.com",
+        google: Optional[GoogleServicesManager] = None,
+        canvas_backend: Literal["rest", "graphql"] = "rest",
+        budgets: Optional[Dict[str, Optional[float]]] = None,
     ):
-        self.canvas = CanvasAPI(course_id=course_id, api_token=api_token)
-        self.google = GoogleServicesManager()
+        # Time budget of the operations by method name, None runs an operation without one
+        self.budgets = {**self.DEFAULT_BUDGETS, **(budgets or {})}
+        # Canvas GET responses are cached on disk and revalidated with ETags when a cache path is given
+        response_cache = ResponseCache(cache_path) if cache_path else None
+        # Files already uploaded to the course are reused instead of being uploaded again
+        upload_index = UploadIndex(course_id, upload_index_path)
+        # Submissions are synced incrementally, only the ones changed since the last sync are fetched
+        submission_store = SubmissionStore(submission_store_path)
+        # Module, assignment and page titles are resolved to ids once and remembered between sessions
+        metadata_cache = CourseMetadataCache(course_id, metadata_path)
+        self.canvas = CanvasAPI(
+            course_id=course_id,
+            api_token=api_token,
+            base_url=base_url,
+            response_cache=response_cache,
+            upload_index=upload_index,
+            submission_store=submission_store,
+            metadata_cache=metadata_cache,
+            backend=canvas_backend,  # The roster and the submissions can be read through GraphQL instead
+        )
+        self._google = google
         self.module_id_with_presentations = self.canvas.get_module_by_title(module_title)
         self.student_records: StudentRecords = []
         self.worksheet: Worksheet
 
+    @property
+    def google(self) -> GoogleServicesManager:
+        # Signing in to Google is only needed by the sheet and form workflows, not by the Canvas ones
+        if self._google is None:
+            self._google = GoogleServicesManager()
+        return self._google
+
     def set_worksheet(self, sheet_id: str, worksheet_index: int = 1):
         self.worksheet = self.google.open_spreadsheet_by_id(sheet_id).get_worksheet(worksheet_index)
 
@@ -374,14 +444,28 @@ class Grader:
 
         return group_averages, student_averages, top_3_presentations, student_outliers
 
+    @budgeted
     def grade_presentation_project(
         self,
         form_id: str,
         assignment_title: str,
         emails: List[str],
         path_image: str,
-    ):
-        """Grade the presentation for a group of students, this will read the scores from a Google Forms and update the grades in Canvas"""
+        pending_grades: Optional[Dict[int, float]] = None,
+    ) -> Dict[int, float]:
+        """Grade the presentation for a group of students, this will read the scores from a Google Forms and update the grades in Canvas
+
+        Args:
+            form_id (str): ID of the Google Form with the feedback for the team.
+            assignment_title (str): Title of the Canvas assignment to grade.
+            emails (List[str]): Emails of the team members.
+            path_image (str): Where to save the histogram of the responses.
+            pending_grades (Dict[int, float], optional): When given, the grades of the team are added to it instead
+                of being posted, so the grades of many teams can be posted at once with post_grades.
+
+        Returns:
+            Dict[int, float]: The grade of every team member, by Canvas user ID.
+        """
         Print("Grading presentation project...")
         # Get responses from Google Forms
         df_responses = self.google.get_form_responses(form_id)  # DataFrame
@@ -398,8 +482,7 @@ class Grader:
         Print("\n\n")
         #### PROCESSING ####
         # processing - removing emails that are not in the class list
-        students = self.canvas.get_users_in_course()
-        student_emails = [student["email"].strip().lower() for student in students]
+        student_emails = self.canvas.roster.emails()
         Print("student_emails = ", student_emails)
         # Remove responses from students not in the class
         df_responses["Email"] = df_responses["Email"].str.strip().str.lower()
@@ -423,18 +506,36 @@ class Grader:
         # fmt: on
         Print("Grade:", grade, log_type="INFO")
 
-        # Get assignment id based on title
-        assignment_id = self.get_assignment_id_by_title(assignment_title)
+        # Collect the grades of the team members
+        team_grades: Dict[int, float] = {}
+        for email in emails:
+            student = self.canvas.roster.by_email(email)
+            if student:
+                Print(f"Grade for {student['email']} = {grade}", log_type="INFO")
+                team_grades[student["id"]] = grade
+
+        if pending_grades is not None:
+            pending_grades.update(team_grades)
+            return team_grades
 
         # Update grades in Canvas
-        emails = [email.strip().lower() for email in emails]
-        for student in students:
-            if student["email"].strip().lower() in emails:
-                Print(f"Updating grade for {student['email']}", log_type="INFO")
-                try:
-                    self.canvas.update_student_grade(assignment_id, student["id"], grade)
-                except Exception as e:
-                    Print(f"Error updating grade for {student['email']}: {e}", log_type="ERROR")
+        self.post_grades(assignment_title, team_grades)
+        return team_grades
+
+    @budgeted
+    def post_grades(self, assignment_title: str, grades: Dict[int, float]):
+        """Post the grades of many students in a few bulk jobs instead of one request per student
+
+        Args:
+            assignment_title (str): Title of the Canvas assignment to grade.
+            grades (Dict[int, float]): The grade of every student, by Canvas user ID.
+        """
+        if not grades:
+            Print("No grades to post", log_type="WARN")
+            return
+        assignment_id = self.get_assignment_id_by_title(assignment_title)
+        Print(f"Posting {len(grades)} grades", log_type="INFO")
+        self.canvas.bulk_update_grades(assignment_id, grades)
         Print("Grading complete", log_type="INFO")
 
     def __read_team_info_file(self, path: str, raise_error: bool = True) -> TeamInfo:  # type: ignore
@@ -446,25 +547,58 @@ class Grader:
             if raise_error:
                 raise e
 
-    def create_multiple_canvas_pages_based_on_folder(self, folders: List[str]) -> List[PageSchema]:
+    @budgeted
+    def create_multiple_canvas_pages_based_on_folder(
+        self, folders: List[str], progress: Optional[ProgressCallback] = None
+    ) -> List[PageSchema]:
         """Create multiple Canvas pages based on a list of folder paths
 
         Args:
             folders (List[str]): List of folder paths containing presentation materials
+            progress (Callable, optional): Called with (bytes sent, total bytes) over all the uploads, from the
+                                           upload threads
 
         Returns:
             List[PageSchema]: List of created Canvas page objects
 
-        This function iterates through a list of folder paths and creates a Canvas page
-        for each folder by calling create_canvas_page_based_on_folder(). Each folder
+        Raises:
+            ValueError: If a folder is invalid, before anything is uploaded, or if the page of a team could not
+                        be created, once the pages of the other teams are created.
+
+        The files of every team are uploaded concurrently through an UploadExecutor, then the pages are
+        created in the order of the folders as soon as the uploads of each team are done. Each folder
         should contain presentation materials like PDFs and team info.
         """
+        # Verify every folder before uploading anything
+        teams, errors = [], []
+        for folder in folders:
+            try:
+                teams.append((folder, *self._verify_team_folder(folder)))
+            except ValueError as e:
+                errors.append(f"{folder}: {e}")
+        if errors:
+            raise ValueError("No page was created, some folders are invalid:\n" + "\n".join(errors))
+
         # Initialize empty list to store created pages
         pages = []
-
-        # Create Canvas page for each folder path in the input list
-        for folder in folders:
-            pages.append(self.create_canvas_page_based_on_folder(folder))
+        failures = []
+
+        # Start the uploads of all the teams at once, a team that fails does not stop the others
+        with UploadExecutor(self.canvas, progress=progress) as uploads:
+            started = [
+                (folder, team_info, self._start_team_uploads(folder_path, uploads))
+                for folder, folder_path, team_info in teams
+            ]
+            for folder, team_info, team_uploads in started:
+                try:
+                    pages.append(self._publish_team_page(team_info, team_uploads))
+                except Exception as e:
+                    Print(f"Failed to create the page of {team_info.team_name}: {e}", log_type="ERROR")
+                    failures.append(f"{folder}: {e}")
+        if failures:
+            raise ValueError(
+                f"Created {len(pages)} of {len(folders)} pages, these folders failed:\n" + "\n".join(failures)
+            )
 
         # Return list of created Canvas pages
         return pages
@@ -561,6 +695,7 @@ class Grader:
 
         return verification_results
 
+    @budgeted
     def create_canvas_page_based_on_folder(self, folder_path: str) -> PageSchema:
         """
         Creates a Canvas page for a team project based on the contents of a folder.
@@ -586,17 +721,43 @@ class Grader:
             >>> grader = Grader(course_id=12345, module_title="Team Presentations")
             >>> page = grader.create_canvas_page_based_on_folder("path/to/team1_folder")
         """
+        folder_path, team_info = self._verify_team_folder(folder_path)
+        with UploadExecutor(self.canvas) as uploads:
+            return self._publish_team_page(team_info, self._start_team_uploads(folder_path, uploads))
+
+    def _verify_team_folder(self, folder_path: str) -> Tuple[str, TeamInfo]:
+        """Verify the project folder of a team and find its team info
+
+        Returns:
+            Tuple[str, TeamInfo]: The absolute folder path and the team info.
+
+        Raises:
+            ValueError: If files are missing or invalid, or if the team is not in the student records.
+        """
         # Verify project files and get absolute path
         folder_path, errors = self.verify_project_files(folder_path)
         if errors:
             raise ValueError(f"Project verification failed:\n" + "\n".join(f"- {error}" for error in errors))
         team_name = os.path.basename(folder_path)
-        team_info = self.convert_student_record_sheets_to_team_info(team_name)
+        return folder_path, self.convert_student_record_sheets_to_team_info(team_name)
+
+    def _start_team_uploads(self, folder_path: str, uploads: UploadExecutor) -> Dict[str, Future]:
+        """Start uploading the files of a verified project folder
+
+        Returns:
+            Dict[str, Future]: The pending upload of each file, by file name.
+        """
+        # Upload the presentation, paper and github link
+        return {
+            file_name: uploads.submit(os.path.join(folder_path, file_name))
+            for file_name in ("presentation.pdf", "paper.pdf", "github.txt")
+        }
 
-        # Upload the presentation and paper
-        presentation_url = self.canvas.upload_file(folder_path + "/presentation.pdf")
-        paper_url = self.canvas.upload_file(folder_path + "/paper.pdf")
-        github_url = self.canvas.upload_file(folder_path + "/github.txt")
+    def _publish_team_page(self, team_info: TeamInfo, team_uploads: Dict[str, Future]) -> PageSchema:
+        """Create the Canvas page of a team once its files are uploaded, and add it to the module"""
+        presentation_url = team_uploads["presentation.pdf"].result()
+        paper_url = team_uploads["paper.pdf"].result()
+        github_url = team_uploads["github.txt"].result()
         # Create a Canvas page
         team_members_html = "".join([f"<li>{member.name} - {member.email} </li>" for member in team_info.team_members])
 
@@ -627,7 +788,51 @@ class Grader:
     def retrieve_page_structure(self, url: str) -> PageSchema:
         return self.canvas.get_page_by_id(url)
 
-    def add_google_forms_and_create_quiz(self, page: PageSchema, folder_path: str):
+    @budgeted
+    def create_quizzes(self, folder_paths: List[str]) -> Dict[str, Dict]:
+        """
+        Create the quizzes of many teams at once, imported in a single QTI content migration.
+
+        Args:
+            folder_paths (List[str]): The team folders, each one holding a quiz.json.
+
+        Returns:
+            Dict[str, Dict]: The created quiz of every folder, to pass to add_google_forms_and_create_quiz.
+        """
+        if not folder_paths:
+            return {}
+        quizzes = self.find_quizzes(folder_paths)
+        missing = [folder_path for folder_path in folder_paths if folder_path not in quizzes]
+        if missing:
+            created = self.canvas.create_quizzes_from_files(
+                [os.path.join(folder_path, "quiz.json") for folder_path in missing], engine="qti"
+            )
+            quizzes.update(zip(missing, created))
+        return quizzes
+
+    @budgeted
+    def find_quizzes(self, folder_paths: List[str]) -> Dict[str, Dict]:
+        """
+        Find the quizzes of the course already titled like the quiz.json of the team folders.
+
+        An import that timed out can still create its quizzes afterwards, they are reused instead of created again.
+
+        Args:
+            folder_paths (List[str]): The team folders, each one holding a quiz.json.
+
+        Returns:
+            Dict[str, Dict]: The existing quiz of every folder that has one, a quiz is given to one folder only.
+        """
+        by_title = self.canvas.get_quizzes_by_title()
+        found: Dict[str, Dict] = {}
+        for folder_path in folder_paths:
+            quiz = by_title.pop(read_json_file(os.path.join(folder_path, "quiz.json"))["title"], None)
+            if quiz is not None:
+                found[folder_path] = quiz
+        return found
+
+    @budgeted
+    def add_google_forms_and_create_quiz(self, page: PageSchema, folder_path: str, quiz: Optional[Dict] = None):
         page_status = self.get_page_status(page)
         if page.body and (page_status == "Quiz and Feedback added" or page_status == "Done"):
             Print("Form and quiz URLs already present on the page. Skipping update.")
@@ -650,7 +855,8 @@ class Grader:
         )
 
         form_url = form["responderUri"]
-        quiz = self.canvas.create_quiz_from_file(folder_path + "/quiz.json")
+        if quiz is None:
+            quiz = self.canvas.create_quiz_from_file(folder_path + "/quiz.json")
         quiz_url = quiz["html_url"]
 
         # Check if form and quiz already exist on the page to avoid duplicates
@@ -665,13 +871,15 @@ class Grader:
         # create canvas quiz based on the quiz file
         return self.canvas.update_page(page.page_id, body=body), form
 
+    @budgeted
     def get_page_status(
-        self, page: PageSchema
+        self, page: PageSchema, refresh: bool = True
     ) -> Literal["Created", "Quiz and Feedback added", "Done", "Evaluation Form"]:
         if page.url is None:
             raise ValueError("Page ID is None")
 
-        page = self.canvas.get_page_by_id(page.url)
+        if refresh or not page.body:  # A page the caller just fetched does not need to be fetched again
+            page = self.canvas.get_page_by_id(page.url)
 
         if not page.body:
             raise ValueError("Page body is None")
@@ -685,6 +893,7 @@ class Grader:
         # else
         return "Created"
 
+    @budgeted
     def remove_feedback_url_and_quiz(self, page: PageSchema):
         old_body: str = page.body  # type: ignore
         # Remove the feedback form and quiz
@@ -694,12 +903,14 @@ class Grader:
             body = old_body
         return self.canvas.update_page(page.page_id, body=body)
 
-    def add_images_to_body(self, page: PageSchema, image_paths: List[str]):
+    @budgeted
+    def add_images_to_body(self, page: PageSchema, image_paths: List[str], progress: Optional[ProgressCallback] = None):
         old_body: str = page.body  # type: ignore
+        with UploadExecutor(self.canvas, progress=progress) as uploads:
+            image_urls = uploads.upload_many(image_paths)
         # Add the images to the body
-        for image_path in image_paths:
+        for image_path, image_url in zip(image_paths, image_urls):
             file_name = os.path.basename(image_path)
-            image_url = self.canvas.upload_file(image_path)
             if file_name in old_body:  # Replace the image
                 Print("*****")
                 old_image_url = old_body.split(file_name)[0]
@@ -711,6 +922,7 @@ class Grader:
             # add HTML comment to the body "DONE"
         return self.canvas.update_page(page.page_id, body=old_body)
 
+    @budgeted
     def get_pages_posted_in_module(self) -> List[PageSchema]:
         return self.canvas.get_module_pages(self.module_id_with_presentations.id)
 
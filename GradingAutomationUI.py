@@ -1,3 +1,6 @@
+from concurrent.futures import wait
+import contextlib
+import functools
 import datetime
 from enum import IntEnum
 import os
@@ -25,11 +28,12 @@ from PyQt6.QtWidgets import (
     QScrollArea,
     QTextEdit,
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QColor, QIcon, QKeySequence, QShortcut, QPalette
 from pathlib import Path
 import json
 import sys
+from Canvas.PriorityScheduler import lane
 from Canvas.schemas import PageSchema
 from GoogleServices.GoogleServices import get_id_from_url
 from GoogleServices.schemas import Form
@@ -48,6 +52,10 @@ class LogLevel(IntEnum):
 # Define valid color strings
 base_path = os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.path.abspath(".")
 state_path = os.path.join(base_path, "state.json")
+cache_path = os.path.join(base_path, "canvas_cache.sqlite3")
+upload_index_path = os.path.join(base_path, "upload_index.json")
+submission_store_path = os.path.join(base_path, "submissions.json")
+metadata_path = os.path.join(base_path, "course_metadata.json")
 
 
 class QuizTableRowData(TypedDict, total=False):
@@ -60,7 +68,28 @@ class QuizTableRowData(TypedDict, total=False):
     FontColor: Optional[Literal["white", "black"]]
 
 
+def summarize_requests(title: str):
+    """Log a summary of the Canvas requests sent by the decorated UI action once it is over
+
+    Qt passes every argument of a signal (e.g. ``checked`` of ``clicked``) to a slot taking ``*args``, so the
+    decorated actions are connected through a lambda.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self: "GradingAutomationUI", *args, **kwargs):
+            with self.request_summary(title):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 class GradingAutomationUI(QMainWindow):
+    # (bytes sent, total bytes) of the running uploads, emitted from the upload threads
+    upload_progress = pyqtSignal("qint64", "qint64")
+
     # Color mapping dictionary
     _COLOR_MAP = {
         "red": Qt.GlobalColor.red,
@@ -122,6 +151,9 @@ class GradingAutomationUI(QMainWindow):
         self.setCentralWidget(main_widget)
         self.main_layout = QVBoxLayout(main_widget)
 
+        # Set while run_with_upload_progress waits for its worker thread
+        self._upload_running = False
+
         # Initialize tabs but don't create them yet
         self.tabs = QTabWidget()
         self.pages_created: List[PageSchema] = []
@@ -134,7 +166,16 @@ class GradingAutomationUI(QMainWindow):
             self.course_selection_container.setVisible(True)
             self.tabs.setVisible(False)
         else:
-            self.grader = Grader(self.state["course_id"], self.state["module_title"], self.state["canvas_token"])
+            self.grader = Grader(
+                self.state["course_id"],
+                self.state["module_title"],
+                self.state["canvas_token"],
+                cache_path=cache_path,
+                upload_index_path=upload_index_path,
+                submission_store_path=submission_store_path,
+                metadata_path=metadata_path,
+                canvas_backend=self.state.get("canvas_backend", "rest"),
+            )
             self.course_selection_container.setVisible(False)
             self.tabs.setVisible(True)
 
@@ -152,6 +193,13 @@ class GradingAutomationUI(QMainWindow):
         self.log_scroll_area.setVisible(True)
         self.log_scroll_area.setStyleSheet("QScrollArea { border: 1px solid gray; border-radius: 10px; padding: 5px; }")
 
+        # Progress of the file uploads, only visible while files are being uploaded
+        self.upload_progress_bar = QProgressBar()
+        self.upload_progress_bar.setRange(0, 100)
+        self.upload_progress_bar.setVisible(False)
+        self.upload_progress.connect(self.update_upload_progress)
+        self.main_layout.addWidget(self.upload_progress_bar)
+
         self.main_layout.addWidget(self.log_scroll_area)
 
         # Set up keyboard shortcut for saving state
@@ -165,6 +213,49 @@ class GradingAutomationUI(QMainWindow):
         if self.is_course_connected() and self.state.get("worksheet_url"):
             self.verify_projects()
 
+    def update_upload_progress(self, sent: int, total: int):
+        self.upload_progress_bar.setVisible(True)
+        self.upload_progress_bar.setValue(int(sent * 100 / total) if total else 0)
+
+    def run_with_upload_progress(self, function: Callable, *args, **kwargs):
+        """Run a Grader call that uploads files in a worker thread, keeping the UI and the progress bar responsive
+
+        The call receives a ``progress`` callback emitting upload_progress, its result is returned once it is done.
+        The tabs and the course selection are disabled meanwhile, so that their buttons cannot start another action
+        from the events processed while waiting.
+        """
+        if self._upload_running:
+            raise RuntimeError("Another upload is still running")
+        self._upload_running = True
+        disabled = [widget for widget in (self.tabs, self.course_selection_container) if widget.isEnabled()]
+        for widget in disabled:
+            widget.setEnabled(False)
+        self.upload_progress_bar.setValue(0)
+        try:
+            # Bulk lane, so that the tabs refreshed while it runs are not queued behind its requests
+            future = self.grader.canvas.submit(
+                function, *args, lane="bulk", progress=self.upload_progress.emit, **kwargs
+            )
+            while not future.done():
+                wait([future], timeout=0.05)
+                QApplication.processEvents()
+            QApplication.processEvents()  # Deliver the last progress updates before hiding the bar
+        finally:
+            self.upload_progress_bar.setVisible(False)
+            for widget in disabled:
+                widget.setEnabled(True)
+            self._upload_running = False
+        return future.result()
+
+    @contextlib.contextmanager
+    def request_summary(self, title: str):
+        """Log a summary of the Canvas requests sent by a UI action once it is over, also usable as a decorator"""
+        if not hasattr(self, "grader"):
+            yield
+            return
+        with self.grader.canvas.metrics.action(title):
+            yield
+
     def is_course_connected(self):
         return self.state.get("course_id") and self.state.get("canvas_token") and self.state.get("module_title")
 
@@ -227,7 +318,16 @@ class GradingAutomationUI(QMainWindow):
             module_title = self.module_title_input.text()  # Get module title
 
             # Initialize grader
-            self.grader = Grader(course_id, module_title, canvas_token)
+            self.grader = Grader(
+                course_id,
+                module_title,
+                canvas_token,
+                cache_path=cache_path,
+                upload_index_path=upload_index_path,
+                submission_store_path=submission_store_path,
+                metadata_path=metadata_path,
+                canvas_backend=self.state.get("canvas_backend", "rest"),
+            )
 
             # Save to state
             self.state["course_id"] = course_id
@@ -262,6 +362,7 @@ class GradingAutomationUI(QMainWindow):
             errors_name.append(f"Name {record['Names']} not found in Canvas from team {record['Team_Name']}")
         return errors_email, errors_name
 
+    @summarize_requests("Verify projects")
     def verify_projects(self):
         """Continues the verification process after worksheet ID is entered"""
         worksheet_id = get_id_from_url(self.worksheet_url.text())
@@ -275,9 +376,8 @@ class GradingAutomationUI(QMainWindow):
         print(f"student_records = {self.grader.student_records}")
         seen_path = set()
         projects_to_download = []
-        user_from_canvas = self.grader.canvas.get_users_in_course()
-        emails_in_canvas = {user["email"].strip().lower() for user in user_from_canvas}
-        names_in_canvas = {user["name"].strip().lower() for user in user_from_canvas}
+        emails_in_canvas = self.grader.canvas.roster.emails()
+        names_in_canvas = self.grader.canvas.roster.names()
         Print(f"emails_in_canvas = {emails_in_canvas}")
         Print(f"names_in_canvas = {names_in_canvas}")
         errors_email = []
@@ -372,6 +472,7 @@ class GradingAutomationUI(QMainWindow):
         self.verify_results.setWordWrap(True)
         # self.verify_results.resizeColumnsToContents()
 
+    @summarize_requests("Create pages")
     def create_pages(self):
         try:
             # Get the pages to create from the table
@@ -381,7 +482,7 @@ class GradingAutomationUI(QMainWindow):
                 if self.pages_table.item(i, 0).checkState() == Qt.CheckState.Checked
             ]
             Print(f"pages_to_create: {pages_to_create}")
-            self.grader.create_multiple_canvas_pages_based_on_folder(pages_to_create)
+            self.run_with_upload_progress(self.grader.create_multiple_canvas_pages_based_on_folder, pages_to_create)
 
             # Update status in pages table for created pages
             for i in range(self.pages_table.rowCount()):
@@ -403,6 +504,7 @@ class GradingAutomationUI(QMainWindow):
         except Exception as e:
             self.log(str(e), log_type="ERROR")
 
+    @summarize_requests("Add forms and quizzes")
     def add_forms_quizzes(self):
         try:
             form_quizzes_to_create = []  # Contains folder paths
@@ -417,6 +519,34 @@ class GradingAutomationUI(QMainWindow):
                         folder_path = folder_path_item.text()
                         form_quizzes_to_create.append((folder_path, i))
 
+            # Import the quizzes of every team still missing one in a single content migration
+            quizzes: Dict[str, Dict] = {}
+            still_importing: set[str] = set()
+            pending: List[str] = []
+            try:
+                pending = [
+                    folder_path
+                    for folder_path, _ in form_quizzes_to_create
+                    if self.local_projects_info[folder_path][1]
+                    and self.grader.get_page_status(self.local_projects_info[folder_path][1]) == "Created"
+                ]
+                quizzes = self.grader.create_quizzes(pending)
+            except Exception as e:  # Each quiz is then created on its own below
+                self.log(f"Could not import the quizzes at once: {e}", log_type="WARN")
+                try:  # Quizzes the import created anyway must not be created a second time
+                    quizzes = self.grader.find_quizzes(pending)
+                except Exception as find_error:
+                    self.log(f"Could not look the imported quizzes up: {find_error}", log_type="WARN")
+                    still_importing.update(pending)
+                if isinstance(e, TimeoutError):  # The import can still finish and create the missing quizzes
+                    still_importing.update(folder_path for folder_path in pending if folder_path not in quizzes)
+                if still_importing:
+                    self.log(
+                        f"Skipping {len(still_importing)} teams whose quizzes may still be imported, add them again"
+                        " once Canvas is done",
+                        log_type="WARN",
+                    )
+
             # Add forms and quizzes to each page
             for folder_path, row_index in form_quizzes_to_create:
                 # Get page schema
@@ -433,7 +563,15 @@ class GradingAutomationUI(QMainWindow):
                         status_item.setForeground(self._COLOR_MAP["white"])
                         self.quizzes_table.setItem(row_index, 3, status_item)
                         continue
-                    page, form = self.grader.add_google_forms_and_create_quiz(page, folder_path)
+                    if folder_path in still_importing:
+                        status_item = QTableWidgetItem("Importing")
+                        status_item.setBackground(self._COLOR_MAP["yellow"])
+                        status_item.setForeground(self._COLOR_MAP["black"])
+                        self.quizzes_table.setItem(row_index, 3, status_item)
+                        continue
+                    page, form = self.grader.add_google_forms_and_create_quiz(
+                        page, folder_path, quiz=quizzes.get(folder_path)
+                    )
                     if page is None or form is None:
                         status_item = QTableWidgetItem("Quiz and Feedback added")
                         status_item.setBackground(self._COLOR_MAP["blue"])
@@ -479,6 +617,7 @@ class GradingAutomationUI(QMainWindow):
             ok_callback=handle_ok,  # Function call is done here
         )
 
+    @summarize_requests("Grade presentations")
     def _remove_forms_quizzes(self, assignment_title: str = "Presentation Grade"):
         # Implementation for removing forms/quizzes
         local_paths_selected: List[Tuple[str, int, str]] = []  # (local_path, row_index, Team_Name)
@@ -489,8 +628,12 @@ class GradingAutomationUI(QMainWindow):
                 if local_path_item is not None:
                     local_paths_selected.append((local_path_item.text(), i, self.quizzes_table.item(i, 2).text()))
 
+        # The grades of all the teams are posted together once every team is processed
+        pending_grades: Dict[int, float] = {}
+        graded_rows: List[int] = []
         for local_path, row_index, team_name in local_paths_selected:
-            if local_path in self.local_projects_info:
+            page_just_fetched = local_path not in self.local_projects_info
+            if not page_just_fetched:
                 _, page = self.local_projects_info[local_path]
             else:
                 Print(f"Team_Name = {team_name}")
@@ -503,7 +646,7 @@ class GradingAutomationUI(QMainWindow):
             if not page:
                 self.log("### not page - HEY YOU NEED TO CREATE THE QUIZ FIRST ####", log_type="WARN")
                 continue
-            status = self.grader.get_page_status(page)
+            status = self.grader.get_page_status(page, refresh=not page_just_fetched)
             if status == "Created":
                 self.log("### Created - HEY YOU NEED TO CREATE THE QUIZ FIRST ####", log_type="WARN")
                 continue
@@ -524,15 +667,27 @@ class GradingAutomationUI(QMainWindow):
             image = local_path + "/" + team.team_name + ".png"  # TODO: Local path does not exist, fix:
             try:
                 self.grader.grade_presentation_project(
-                    form_id=form_id, assignment_title=assignment_title, emails=emails, path_image=image
+                    form_id=form_id,
+                    assignment_title=assignment_title,
+                    emails=emails,
+                    path_image=image,
+                    pending_grades=pending_grades,
                 )
-                status_item = QTableWidgetItem("Done")
-                status_item.setBackground(self._COLOR_MAP["green"])
-                status_item.setForeground(self._COLOR_MAP["white"])
-                self.quizzes_table.setItem(row_index, 3, status_item)
+                graded_rows.append(row_index)
             except Exception as e:
                 Print(f"Error grading project {local_path}: {e}", log_type="ERROR")
-            page = self.grader.add_images_to_body(page, [image])
+            page = self.run_with_upload_progress(self.grader.add_images_to_body, page, [image])
+
+        try:
+            self.grader.post_grades(assignment_title, pending_grades)
+        except Exception as e:
+            self.log(f"Error posting grades: {e}", log_type="ERROR")
+            return
+        for row_index in graded_rows:
+            status_item = QTableWidgetItem("Done")
+            status_item.setBackground(self._COLOR_MAP["green"])
+            status_item.setForeground(self._COLOR_MAP["white"])
+            self.quizzes_table.setItem(row_index, 3, status_item)
 
     def load_state(self):
         """Load application state from state.json"""
@@ -605,7 +760,7 @@ class GradingAutomationUI(QMainWindow):
         verify_layout = QVBoxLayout()
 
         verify_button = QPushButton("Verify Selected Projects")
-        verify_button.clicked.connect(self.verify_projects)
+        verify_button.clicked.connect(lambda: self.verify_projects())
 
         self.verify_results = QTableWidget()
         self.verify_results.setColumnCount(3)
@@ -718,8 +873,14 @@ class GradingAutomationUI(QMainWindow):
         dialog.show()
 
     def download_folder_click(self):
+        @self.request_summary("Download submissions")
         def handle_ok(assignment_title: str):
             Print("assignment_title", assignment_title)
+            assignment_id = self.grader.canvas.get_assignment_by_title(assignment_title)
+            # The manifest lets repeated downloads skip the attachments that did not change
+            manifest_path = os.path.join(self.folder_path.text(), f".download_manifest_{assignment_id}.json")
+            # Synced once for every team instead of once per student, only the changed submissions are fetched
+            submissions = self.grader.canvas.sync_submissions(assignment_id)
             for checked_row in range(self.file_to_download.rowCount()):
                 if self.file_to_download.item(checked_row, 0).checkState() == Qt.CheckState.Checked:
                     # Get the students emails from the self.grader.google.get_student_emails(student_id)
@@ -732,9 +893,11 @@ class GradingAutomationUI(QMainWindow):
                                 Print(f"Student ID not found for {student_email}", log_type="ERROR")
                                 continue
                             files_downloaded = self.grader.canvas.download_student_submission_attachments(
-                                assignment_id=self.grader.canvas.get_assignment_by_title(assignment_title),
+                                assignment_id=assignment_id,
                                 download_dir=self.folder_path.text() + "/" + team_name,
                                 user_id=student_id,
+                                manifest_path=manifest_path,
+                                submissions=submissions,
                             )
                             if files_downloaded:
                                 self.log(f"Downloaded {len(files_downloaded)} files for {team_name}", log_type="INFO")
@@ -785,7 +948,7 @@ class GradingAutomationUI(QMainWindow):
         self.pages_table.horizontalHeader().setDefaultAlignment(Qt.AlignmentFlag.AlignCenter)
 
         create_pages_button = QPushButton("Create Selected Pages")
-        create_pages_button.clicked.connect(self.create_pages)
+        create_pages_button.clicked.connect(lambda: self.create_pages())
 
         pages_layout.addWidget(self.pages_table)
         pages_layout.addWidget(create_pages_button)
@@ -831,7 +994,7 @@ class GradingAutomationUI(QMainWindow):
 
         button_layout = QHBoxLayout()
         add_forms_button = QPushButton("Add Forms/Quizzes")
-        add_forms_button.clicked.connect(self.add_forms_quizzes)
+        add_forms_button.clicked.connect(lambda: self.add_forms_quizzes())
         remove_forms_button = QPushButton("Close and Grade")
         remove_forms_button.setToolTip(
             "This will remove the quizzes/feedback form, post a image of the feedback and post grades"
@@ -1055,11 +1218,13 @@ class GradingAutomationUI(QMainWindow):
         super().closeEvent(event)
 
     def on_tab_changed(self, index):
-        # Check if the new tab is Pages Management (index 1)
-        if index == 1:  # Pages Management tab
-            self.on_pages_management_selected()
-        elif index == 2:  # Forms and Quizzes tab
-            self.on_forms_quizzes_management_selected()
+        # The refresh requests go before the ones of bulk jobs still running
+        with lane("interactive"):
+            # Check if the new tab is Pages Management (index 1)
+            if index == 1:  # Pages Management tab
+                self.on_pages_management_selected()
+            elif index == 2:  # Forms and Quizzes tab
+                self.on_forms_quizzes_management_selected()
 
     def on_forms_quizzes_management_selected(self):
         # Clear existing rows if they exist
@@ -1095,7 +1260,8 @@ class GradingAutomationUI(QMainWindow):
                 continue
             if any(team.team_name == page.title for page in pages_posted_in_module):
                 page = [page for page in pages_posted_in_module if page.title == team.team_name][0]
-                status = self.grader.get_page_status(page)  # Literal['Created', 'Quiz and Feedback added', 'Done']
+                # The pages of the module were just loaded with their body
+                status = self.grader.get_page_status(page, refresh=False)
                 Print(f" ###status = {status}")
                 color = "green" if status == "Done" else "blue" if status == "Quiz and Feedback added" else "gray"
                 self._add_quiz_table_row(
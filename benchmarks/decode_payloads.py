@@ -0,0 +1,134 @@
+"""
+Micro-benchmark of the decoding of Canvas list responses into schemas.
+
+Synthetic pages of submissions and module items, shaped like the Canvas responses, are decoded with each
+DecodeMode: "validate" (what the list methods did before, one schema per item) and "batch" (the compiled
+List[schema] validator over the raw bytes). model_construct, which skips the validation, is measured as well
+for reference: it runs in Python and is not faster than the validation done by pydantic-core, so it is not
+offered as a mode. Reports the items decoded per second and the speedup over "validate".
+
+Usage:
+    python -m benchmarks.decode_payloads --items 5000 --repeat 5
+"""
+
+import argparse
+import gc
+import json
+import time
+from typing import Any, Callable, Dict, List, Union
+
+from Canvas.PayloadDecoder import DECODE_MODES, decode_list
+from Canvas.schemas import ModuleItemSchema, SubmissionSchema
+
+BASE_URL = "https://csulb.instructure.com"
+PAGE_SIZE = 100
+
+
+def submission(index: int) -> Dict[str, Any]:
+    user_id = 100000 + index
+    return {
+        "id": 500000 + index,
+        "assignment_id": 42,
+        "attempt": 1,
+        "body": None,
+        "grade": "95",
+        "grade_matches_current_submission": True,
+        "html_url": f"{BASE_URL}/courses/1/assignments/42/submissions/{user_id}",
+        "preview_url": f"{BASE_URL}/courses/1/assignments/42/submissions/{user_id}?preview=1&version=1",
+        "score": 95.0,
+        "submission_type": "online_upload",
+        "submitted_at": "2024-09-01T12:00:00Z",
+        "user_id": user_id,
+        "grader_id": 7,
+        "graded_at": "2024-09-03T08:30:00Z",
+        "late": False,
+        "assignment_visible": True,
+        "missing": False,
+        "excused": False,
+        "late_policy_status": None,
+        "points_deducted": None,
+        "seconds_late": 0,
+        "workflow_state": "graded",
+        "extra_attempts": None,
+        "anonymous_id": f"a{index:04x}",
+        "posted_at": "2024-09-03T08:30:00Z",
+        "read_status": "read",
+        "redo_request": False,
+        "attachments": [
+            {
+                "id": 900000 + index,
+                "display_name": "presentation.pdf",
+                "filename": "presentation.pdf",
+                "content-type": "application/pdf",
+                "url": f"{BASE_URL}/files/{900000 + index}/download?download_frd=1",
+                "size": 1048576,
+                "created_at": "2024-09-01T12:00:00Z",
+                "updated_at": "2024-09-01T12:00:00Z",
+            }
+        ],
+    }
+
+
+def module_item(index: int) -> Dict[str, Any]:
+    return {
+        "id": 700000 + index,
+        "module_id": 3,
+        "position": index + 1,
+        "title": f"Team {index}",
+        "indent": 0,
+        "type": "Page",
+        "html_url": f"{BASE_URL}/courses/1/modules/items/{700000 + index}",
+        "url": f"{BASE_URL}/api/v1/courses/1/pages/team-{index}",
+        "page_url": f"team-{index}",
+        "published": True,
+    }
+
+
+def pages(make: Callable[[int], Dict[str, Any]], items: int) -> List[bytes]:
+    """The items serialized like Canvas pages them."""
+    return [
+        json.dumps([make(index) for index in range(start, min(start + PAGE_SIZE, items))]).encode()
+        for start in range(0, items, PAGE_SIZE)
+    ]
+
+
+def construct(content: Union[bytes, str], schema: Any, mode: str) -> List[Any]:
+    """Build the models without validating them."""
+    return [schema.model_construct(**item) for item in json.loads(content)]
+
+
+def run(name: str, schema: Any, payloads: List[bytes], items: int, repeat: int) -> None:
+    decoders = {**{mode: decode_list for mode in DECODE_MODES}, "model_construct": construct}
+    results = {mode: float("inf") for mode in decoders}
+    for mode, decode in decoders.items():
+        decode(payloads[0], schema, mode)  # Build the validator outside of the measurements
+    gc.disable()  # Like timeit, so that collections triggered by one mode are not charged to the next one
+    try:
+        for _ in range(repeat):
+            for mode, decode in decoders.items():  # Interleaved so that a noisy moment does not favour one mode
+                start = time.perf_counter()
+                for payload in payloads:
+                    decode(payload, schema, mode)
+                results[mode] = min(results[mode], time.perf_counter() - start)
+    finally:
+        gc.enable()
+    for mode, seconds in results.items():
+        print(
+            f"{name:<12} {mode:<15} {items / seconds:>12,.0f} items/s {seconds * 1000:>9.1f} ms "
+            f"{results['validate'] / seconds:>6.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000, help="Items decoded per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode, the best one is reported")
+    args = parser.parse_args()
+
+    print(f"{'schema':<12} {'mode':<15} {'throughput':>18} {'best run':>12} {'speedup':>7}")
+    run("submissions", SubmissionSchema, pages(submission, args.items), args.items, args.repeat)
+    run("module items", ModuleItemSchema, pages(module_item, args.items), args.items, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
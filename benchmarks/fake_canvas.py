@@ -0,0 +1,877 @@
+"""
+A local stand-in for the Canvas REST API, to benchmark and regression-test CanvasAPI and Grader offline.
+
+It emulates the endpoints used by CanvasAPI: users, assignments, submissions and their attachments, grades and
+progress jobs, pages, modules and module items, quizzes and questions, QTI content migrations, and files with the
+pre-signed upload protocol (initiate, send the content to another URL, follow the redirect to confirm), and the
+GraphQL query of the roster and the submissions (answered from its variables, other queries are not parsed). Lists are
+paginated with Link headers, GET responses carry an ETag, and every request can be delayed and rate limited like
+Canvas does.
+
+Usage:
+    python -m benchmarks.fake_canvas --teams 10 --latency 0.02 --port 8080
+
+Example:
+    >>> fake = FakeCanvas.with_teams(10, latency=0.01)
+    >>> base_url = fake.start()
+    >>> canvas = CanvasAPI(fake.course_id, api_token="fake", base_url=base_url)
+    >>> len(canvas.get_users_in_course())
+    30
+    >>> fake.stop()
+"""
+
+import argparse
+import hashlib
+import html
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+TIMESTAMP = "2024-09-01T12:00:00Z"
+MODULE_TITLE = "Fall 2024 - Presentation"
+ASSIGNMENT_TITLE = "Presentation"
+
+
+@dataclass
+class RateLimit:
+    """
+    The Canvas throttling: every token has a bucket of quota which refills at a constant rate, each request costs
+    some quota and is rejected with 403 "Rate Limit Exceeded" once the bucket is empty.
+    """
+
+    capacity: float = 700.0
+    refill_rate: float = 10.0  # Quota regained per second
+    cost: float = 1.0  # Quota used by every request
+
+
+class FakeCanvas:
+    """
+    In-memory Canvas course served over HTTP from a background thread.
+
+    The course content lives in plain dictionaries shaped like the Canvas responses, so tests can seed or inspect
+    it directly. ``request_counts`` counts the requests received by endpoint template.
+    """
+
+    def __init__(
+        self,
+        course_id: int = 1,
+        latency: float = 0.0,
+        rate_limit: Optional[RateLimit] = None,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+    ):
+        """
+        Args:
+            course_id (int): The ID of the course.
+            latency (float): Seconds every request takes before it is answered.
+            rate_limit (RateLimit, optional): Throttle the requests like Canvas, no limit if None.
+            slow_rate (float): Share of the requests that take ``slow_latency`` instead, the tail of the latencies.
+            slow_latency (float): Seconds the slow requests take.
+        """
+        self.course_id = course_id
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._random = random.Random(0)  # The same requests are slow from one run to the next
+        self.rate_limit = rate_limit
+        self.base_url = ""
+        self.users: List[Dict[str, Any]] = []
+        self.assignments: List[Dict[str, Any]] = []
+        self.submissions: Dict[int, Dict[int, Dict[str, Any]]] = {}  # assignment id -> user id -> submission
+        self.modules: List[Dict[str, Any]] = []
+        self.module_items: Dict[int, List[Dict[str, Any]]] = {}
+        self.pages: Dict[str, Dict[str, Any]] = {}  # By page URL
+        self.quizzes: List[Dict[str, Any]] = []
+        self.questions: Dict[int, List[Dict[str, Any]]] = {}
+        self.files: Dict[int, Dict[str, Any]] = {}
+        self.blobs: Dict[int, bytes] = {}  # Content of the files and attachments, by id
+        self.progress: Dict[int, Dict[str, Any]] = {}
+        self.request_counts: Dict[str, int] = {}
+        self._pending_uploads: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1000)
+        self._lock = threading.RLock()
+        self._bucket = rate_limit.capacity if rate_limit else 0.0
+        self._bucket_time = time.monotonic()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # Course content
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    @classmethod
+    def with_teams(
+        cls,
+        teams: int,
+        members_per_team: int = 3,
+        attachment_size: int = 4096,
+        module_title: str = MODULE_TITLE,
+        **kwargs,
+    ) -> "FakeCanvas":
+        """
+        Create a course with ``teams`` teams of students, the presentations module and a presentation assignment
+        where every student submitted a file.
+
+        Args:
+            teams (int): Number of teams.
+            members_per_team (int): Students in each team.
+            attachment_size (int): Size of the file submitted by every student.
+            module_title (str): Name of the presentations module.
+            **kwargs: Passed to FakeCanvas.
+        """
+        fake = cls(**kwargs)
+        fake.add_module(module_title)
+        assignment = fake.add_assignment(ASSIGNMENT_TITLE)
+        for team in range(1, teams + 1):
+            for member in range(1, members_per_team + 1):
+                user = fake.add_user(f"Student {team}-{member}", f"student{team}.{member}@example.edu")
+                fake.add_submission(assignment["id"], user["id"], b"%PDF" + bytes(attachment_size - 4))
+        return fake
+
+    def add_user(self, name: str, email: str) -> Dict[str, Any]:
+        user = {
+            "id": self.next_id(),
+            "name": name,
+            "created_at": TIMESTAMP,
+            "sortable_name": ", ".join(reversed(name.split(" ", 1))),
+            "short_name": name,
+            "email": email,
+        }
+        self.users.append(user)
+        return user
+
+    def add_module(self, name: str) -> Dict[str, Any]:
+        module_id = self.next_id()
+        module = {
+            "id": module_id,
+            "workflow_state": "active",
+            "position": len(self.modules) + 1,
+            "name": name,
+            "require_sequential_progress": False,
+            "prerequisite_module_ids": [],
+            "items_count": 0,
+            "items_url": f"https://canvas.test/api/v1/courses/{self.course_id}/modules/{module_id}/items",
+            "published": True,
+        }
+        self.modules.append(module)
+        self.module_items[module_id] = []
+        return module
+
+    def add_module_item(
+        self, module_id: int, title: str, type: str = "Page", page_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        with self._lock:
+            items = self.module_items[module_id]
+            item_id = self.next_id()
+            item = {
+                "id": item_id,
+                "module_id": module_id,
+                "position": len(items) + 1,
+                "title": title,
+                "indent": 0,
+                "type": type,
+                "html_url": f"https://canvas.test/courses/{self.course_id}/modules/items/{item_id}",
+                "page_url": page_url,
+                "published": True,
+            }
+            items.append(item)
+        return item
+
+    def add_page(
+        self, title: str, body: str = "", editing_roles: str = "teachers", published: bool = True
+    ) -> Dict[str, Any]:
+        """Create a page, its URL is derived from the title like Canvas does."""
+        base = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+        with self._lock:
+            url = base
+            suffix = 2
+            while url in self.pages:
+                url = f"{base}-{suffix}"
+                suffix += 1
+            self.pages[url] = {
+                "page_id": self.next_id(),
+                "url": url,
+                "title": title,
+                "created_at": TIMESTAMP,
+                "updated_at": TIMESTAMP,
+                "hide_from_students": False,
+                "editing_roles": editing_roles,
+                "body": body,
+                "published": published,
+                "front_page": False,
+                "locked_for_user": False,
+            }
+            return self.pages[url]
+
+    def add_assignment(self, name: str) -> Dict[str, Any]:
+        assignment_id = self.next_id()
+        assignment = {
+            **{field: False for field in _ASSIGNMENT_FLAGS},
+            "id": assignment_id,
+            "name": name,
+            "description": "",
+            "points_possible": 100.0,
+            "grading_type": "points",
+            "assignment_group_id": 1,
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+            "position": len(self.assignments) + 1,
+            "grader_count": 0,
+            "allowed_attempts": -1,
+            "secure_params": "",
+            "lti_context_id": "",
+            "course_id": self.course_id,
+            "submission_types": ["online_upload"],
+            "max_name_length": 255,
+            "workflow_state": "published",
+            "html_url": f"https://canvas.test/courses/{self.course_id}/assignments/{assignment_id}",
+            "needs_grading_count": 0,
+            "published": True,
+            "visible_to_everyone": True,
+            "submissions_download_url": "",
+        }
+        self.assignments.append(assignment)
+        self.submissions[assignment_id] = {}
+        return assignment
+
+    def add_submission(
+        self,
+        assignment_id: int,
+        user_id: int,
+        content: bytes,
+        filename: str = "submission.pdf",
+        submitted_at: str = TIMESTAMP,
+    ):
+        attachment_id = self.next_id()
+        self.blobs[attachment_id] = content
+        self.submissions[assignment_id][user_id] = {
+            "assignment_id": assignment_id,
+            "user_id": user_id,
+            "workflow_state": "submitted",
+            "submission_type": "online_upload",
+            "submitted_at": submitted_at,
+            "graded_at": None,
+            "redo_request": False,
+            "grade": None,
+            "score": None,
+            "attachments": [
+                {
+                    "id": attachment_id,
+                    "filename": filename,
+                    "display_name": filename,
+                    "size": len(content),
+                    "updated_at": TIMESTAMP,
+                    "url": f"{{base_url}}/download/{attachment_id}",
+                }
+            ],
+        }
+
+    # Server
+
+    def start(self, port: int = 0) -> str:
+        """Start serving in a background thread and return the base URL to give to CanvasAPI."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeCanvas":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(self.request_counts.values())
+
+    def _count(self, method: str, path: str):
+        template = re.sub(r"/\d+", "/:id", path)
+        template = re.sub(r"/pages/[^/:][^/]*", "/pages/:url", template)
+        template = re.sub(r"/upload/[^/]+", "/upload/:token", template)
+        with self._lock:
+            key = f"{method} {template}"
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+    def _take_quota(self) -> Optional[float]:
+        """Use the quota of a request, return the quota left or None if the request must be rejected."""
+        if self.rate_limit is None:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            self._bucket = min(
+                self.rate_limit.capacity, self._bucket + (now - self._bucket_time) * self.rate_limit.refill_rate
+            )
+            self._bucket_time = now
+            if self._bucket < self.rate_limit.cost:
+                return -1.0
+            self._bucket -= self.rate_limit.cost
+            return self._bucket
+
+    # Routes, each one returns (status, body, headers)
+
+    def route(self, method: str, path: str, query: Dict[str, str], body: bytes, headers: Dict[str, str]):
+        course = f"/api/v1/courses/{self.course_id}"
+        for route_method, pattern, handler in self._routes:
+            if route_method != method:
+                continue
+            match = re.fullmatch(pattern.replace("{course}", course), path)
+            if match:
+                return handler(self, match, query, body, headers)
+        return 404, {"errors": [{"message": f"No route for {method} {path}"}]}, {}
+
+    def _json(self, body: bytes) -> Dict[str, Any]:
+        return json.loads(body or b"{}")
+
+    def _list_users(self, match, query, body, headers):
+        return 200, sorted(self.users, key=lambda user: user["email"]), {}
+
+    def _list_assignments(self, match, query, body, headers):
+        return 200, self.assignments, {}
+
+    def _get_assignment(self, match, query, body, headers):
+        for assignment in self.assignments:
+            if assignment["id"] == int(match["assignment"]):
+                return 200, assignment, {}
+        return 404, {"errors": [{"message": "The specified resource does not exist."}]}, {}
+
+    def _list_submissions(self, match, query, body, headers):
+        submissions = self.submissions.get(int(match["assignment"]), {})
+        return 200, [self._with_urls(submission) for submission in submissions.values()], {}
+
+    def _list_student_submissions(self, match, query, body, headers):
+        student_ids = query.get("student_ids[]", ["all"])
+        since = {field: query[f"{field}_since"] for field in ("submitted", "graded") if f"{field}_since" in query}
+        result = []
+        for assignment_id in query.get("assignment_ids[]", []):
+            for submission in self.submissions.get(int(assignment_id), {}).values():
+                if "all" not in student_ids and str(submission["user_id"]) not in student_ids:
+                    continue
+                # Timestamps all have the same format, so they compare as strings
+                if any(not submission[f"{field}_at"] or submission[f"{field}_at"] <= t for field, t in since.items()):
+                    continue
+                result.append(self._with_urls(submission))
+        return 200, result, {}
+
+    def _get_submission(self, match, query, body, headers):
+        submission = self.submissions.get(int(match["assignment"]), {}).get(int(match["user"]))
+        if submission is None:
+            return 404, {"errors": [{"message": "The specified resource does not exist."}]}, {}
+        return 200, self._with_urls(submission), {}
+
+    def _grade_submission(self, match, query, body, headers):
+        submission = self.submissions[int(match["assignment"])][int(match["user"])]
+        grade = self._json(body).get("submission", {}).get("posted_grade")
+        submission.update(grade=str(grade), score=float(grade), workflow_state="graded", graded_at=_now())
+        return 200, self._with_urls(submission), {}
+
+    def _update_grades(self, match, query, body, headers):
+        submissions = self.submissions[int(match["assignment"])]
+        for user_id, data in self._json(body)["grade_data"].items():
+            if int(user_id) in submissions:
+                grade = data["posted_grade"]
+                submissions[int(user_id)].update(
+                    grade=str(grade), score=float(grade), workflow_state="graded", graded_at=_now()
+                )
+        return 200, self._new_progress("submissions_update"), {}
+
+    def _get_progress(self, match, query, body, headers):
+        progress = self.progress.get(int(match["id"]))
+        if progress is None:
+            return 404, {"errors": [{"message": "The specified resource does not exist."}]}, {}
+        return 200, progress, {}
+
+    def _list_modules(self, match, query, body, headers):
+        for module in self.modules:
+            module["items_count"] = len(self.module_items[module["id"]])
+        return 200, self.modules, {}
+
+    def _get_module(self, match, query, body, headers):
+        for module in self.modules:
+            if module["id"] == int(match["module"]):
+                return 200, {**module, "items_count": len(self.module_items[module["id"]])}, {}
+        return 404, {"errors": [{"message": "The specified resource does not exist."}]}, {}
+
+    def _create_module(self, match, query, body, headers):
+        return 200, self.add_module(self._json(body)["module"]["name"]), {}
+
+    def _list_module_items(self, match, query, body, headers):
+        return 200, self.module_items.get(int(match["module"]), []), {}
+
+    def _create_module_item(self, match, query, body, headers):
+        data = self._json(body)["module_item"]
+        return 200, self.add_module_item(int(match["module"]), data["title"], data["type"], data.get("page_url")), {}
+
+    def _list_pages(self, match, query, body, headers):
+        include_body = "body" in query.get("include[]", [])
+        pages = [
+            page if include_body else {k: v for k, v in page.items() if k != "body"} for page in self.pages.values()
+        ]
+        return 200, pages, {}
+
+    def _find_page(self, url_or_id: str) -> Optional[Dict[str, Any]]:
+        if url_or_id in self.pages:
+            return self.pages[url_or_id]
+        return next((page for page in self.pages.values() if str(page["page_id"]) == url_or_id), None)
+
+    def _get_page(self, match, query, body, headers):
+        page = self._find_page(match["page"])
+        if page is None:
+            return 404, {"errors": [{"message": "page not found"}]}, {}
+        return 200, page, {}
+
+    def _create_page(self, match, query, body, headers):
+        data = self._json(body)["wiki_page"]
+        page = self.add_page(
+            data["title"],
+            data.get("body", ""),
+            editing_roles=data.get("editing_roles", "teachers"),
+            published=str(data.get("published", "True")) == "True",
+        )
+        return 200, page, {}
+
+    def _update_page(self, match, query, body, headers):
+        page = self._find_page(match["page"])
+        if page is None:
+            return 404, {"errors": [{"message": "page not found"}]}, {}
+        data = self._json(body)["wiki_page"]
+        page.update({key: value for key, value in data.items() if key in ("title", "body")})
+        page["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return 200, page, {}
+
+    def _list_quizzes(self, match, query, body, headers):
+        return 200, self.quizzes, {}
+
+    def _add_quiz(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        quiz_id = self.next_id()
+        quiz = {
+            **settings,
+            "id": quiz_id,
+            "html_url": f"https://canvas.test/courses/{self.course_id}/quizzes/{quiz_id}",
+            "published": False,
+        }
+        with self._lock:
+            self.quizzes.append(quiz)
+            self.questions[quiz_id] = []
+        return quiz
+
+    def _create_quiz(self, match, query, body, headers):
+        return 200, self._add_quiz(self._json(body)["quiz"]), {}
+
+    def _add_question(self, match, query, body, headers):
+        quiz_id = int(match["quiz"])
+        if quiz_id not in self.questions:
+            return 404, {"errors": [{"message": "quiz not found"}]}, {}
+        question = {**self._json(body)["question"], "id": self.next_id(), "quiz_id": quiz_id}
+        with self._lock:
+            self.questions[quiz_id].append(question)
+        return 200, question, {}
+
+    def _delete_quiz(self, match, query, body, headers):
+        quiz_id = int(match["quiz"])
+        with self._lock:
+            quiz = next((quiz for quiz in self.quizzes if quiz["id"] == quiz_id), None)
+            if quiz is None:
+                return 404, {"errors": [{"message": "quiz not found"}]}, {}
+            self.quizzes.remove(quiz)
+            self.questions.pop(quiz_id, None)
+        return 200, quiz, {}
+
+    def _create_migration(self, match, query, body, headers):
+        data = self._json(body)
+        progress = self._new_progress("content_migration", workflow_state="queued")
+        token = self._pending_upload(
+            data["pre_attachment"], on_upload=lambda content: self._import_qti(content, progress)
+        )
+        return (
+            200,
+            {
+                "id": self.next_id(),
+                "migration_type": data["migration_type"],
+                "workflow_state": "pre_processing",
+                "progress_url": f"{self.base_url}/api/v1/progress/{progress['id']}",
+                "pre_attachment": self._upload_info(token),
+            },
+            {},
+        )
+
+    def _import_qti(self, package: bytes, progress: Dict[str, Any]):
+        with zipfile.ZipFile(io.BytesIO(package)) as archive:
+            for name in archive.namelist():
+                if name.endswith("assessment_meta.xml"):
+                    meta = archive.read(name).decode()
+                    fields = re.findall(r"<(title|description|quiz_type)>(.*?)</\1>", meta, re.S)
+                    settings = {field: html.unescape(value) for field, value in fields}
+                    self._add_quiz(settings)
+        progress.update(workflow_state="completed", completion=100.0)
+
+    def _create_announcement(self, match, query, body, headers):
+        return 200, {**self._json(body), "id": self.next_id()}, {}
+
+    def _list_files(self, match, query, body, headers):
+        return 200, list(self.files.values()), {}
+
+    def _initiate_upload(self, match, query, body, headers):
+        data = self._json(body)
+        token = self._pending_upload(data, on_upload=None)
+        return 200, self._upload_info(token), {}
+
+    def _pending_upload(self, data: Dict[str, Any], on_upload: Optional[Callable[[bytes], None]]) -> str:
+        token = hashlib.sha1(str(self.next_id()).encode()).hexdigest()
+        with self._lock:
+            self._pending_uploads[token] = {"name": data["name"], "size": int(data["size"]), "on_upload": on_upload}
+        return token
+
+    def _upload_info(self, token: str) -> Dict[str, Any]:
+        return {
+            "upload_url": f"{self.base_url}/upload/{token}",
+            "upload_params": {"key": token},
+            "file_param": "file",
+        }
+
+    def _receive_upload(self, match, query, body, headers):
+        with self._lock:
+            upload = self._pending_uploads.pop(match["token"], None)
+        if upload is None:
+            return 404, {"message": "unknown upload"}, {}
+        content = _multipart_file(body, headers.get("Content-Type", ""))
+        if upload["on_upload"] is not None:
+            upload["on_upload"](content)
+            return 201, {"id": self.next_id()}, {}
+        file_id = self.next_id()
+        self.blobs[file_id] = content
+        self.files[file_id] = {
+            "id": file_id,
+            "display_name": upload["name"],
+            "filename": upload["name"],
+            "content-type": "application/octet-stream",
+            "url": f"{self.base_url}/download/{file_id}",
+            "size": len(content),
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+        }
+        return 302, {}, {"Location": f"{self.base_url}/api/v1/files/{file_id}/create_success"}
+
+    def _confirm_upload(self, match, query, body, headers):
+        file = self.files.get(int(match["file"]))
+        if file is None:
+            return 404, {"errors": [{"message": "file not found"}]}, {}
+        return 200, file, {}
+
+    def _public_url(self, match, query, body, headers):
+        return 200, {"public_url": f"{self.base_url}/download/{match['file']}"}, {}
+
+    def _download(self, match, query, body, headers):
+        content = self.blobs.get(int(match["blob"]))
+        if content is None:
+            return 404, {"message": "not found"}, {}
+        match = re.fullmatch(r"bytes=(\d+)-", headers.get("Range", ""))
+        if match:
+            start = int(match[1])
+            if start >= len(content):
+                return 416, {"message": "range not satisfiable"}, {"Content-Range": f"bytes */{len(content)}"}
+            content_range = f"bytes {start}-{len(content) - 1}/{len(content)}"
+            return 206, content[start:], {"Content-Type": "application/octet-stream", "Content-Range": content_range}
+        return 200, content, {"Content-Type": "application/octet-stream"}
+
+    def _new_progress(self, tag: str, workflow_state: str = "completed") -> Dict[str, Any]:
+        progress_id = self.next_id()
+        progress = {
+            "id": progress_id,
+            "context_id": self.course_id,
+            "context_type": "Course",
+            "tag": tag,
+            "completion": 100.0 if workflow_state == "completed" else 0.0,
+            "workflow_state": workflow_state,
+            "url": f"{self.base_url}/api/v1/progress/{progress_id}",
+        }
+        self.progress[progress_id] = progress
+        return progress
+
+    def _graphql(self, match, query, body, headers):
+        request = self._json(body)
+        variables = request.get("variables") or {}
+        if "RosterAndSubmissions" not in request.get("query", ""):
+            return 200, {"errors": [{"message": "The fake Canvas only answers the RosterAndSubmissions query"}]}, {}
+        data: Dict[str, Any] = {}
+        if variables.get("withUsers"):
+            users = sorted(self.users, key=lambda user: user["id"])
+            nodes, page_info = _connection(users, variables["first"], variables.get("usersAfter"))
+            data["course"] = {
+                "enrollmentsConnection": {
+                    "nodes": [
+                        {
+                            "user": {
+                                "_id": str(user["id"]),
+                                "name": user["name"],
+                                "sortableName": user["sortable_name"],
+                                "shortName": user["short_name"],
+                                "email": user["email"],
+                                "createdAt": user["created_at"],
+                            }
+                        }
+                        for user in nodes
+                    ],
+                    "pageInfo": page_info,
+                }
+            }
+        if variables.get("withSubmissions"):
+            submissions = list(self.submissions.get(int(variables["assignmentId"]), {}).values())
+            nodes, page_info = _connection(submissions, variables["first"], variables.get("submissionsAfter"))
+            data["assignment"] = {
+                "submissionsConnection": {
+                    "nodes": [_submission_node(self._with_urls(submission)) for submission in nodes],
+                    "pageInfo": page_info,
+                }
+            }
+        return 200, {"data": data}, {}
+
+    def _with_urls(self, submission: Dict[str, Any]) -> Dict[str, Any]:
+        attachments = [
+            {**attachment, "url": attachment["url"].replace("{base_url}", self.base_url)}
+            for attachment in submission.get("attachments") or []
+        ]
+        return {**submission, "attachments": attachments}
+
+    _routes: List[Tuple[str, str, Callable]] = [
+        ("GET", r"{course}/users", _list_users),
+        ("GET", r"{course}/assignments", _list_assignments),
+        ("GET", r"{course}/assignments/(?P<assignment>\d+)", _get_assignment),
+        ("GET", r"{course}/assignments/(?P<assignment>\d+)/submissions", _list_submissions),
+        ("GET", r"{course}/assignments/(?P<assignment>\d+)/submissions/(?P<user>\d+)", _get_submission),
+        ("GET", r"{course}/students/submissions", _list_student_submissions),
+        ("PUT", r"{course}/assignments/(?P<assignment>\d+)/submissions/(?P<user>\d+)", _grade_submission),
+        ("POST", r"{course}/assignments/(?P<assignment>\d+)/submissions/update_grades", _update_grades),
+        ("GET", r"/api/v1/progress/(?P<id>\d+)", _get_progress),
+        ("GET", r"{course}/modules", _list_modules),
+        ("GET", r"{course}/modules/(?P<module>\d+)", _get_module),
+        ("POST", r"{course}/modules", _create_module),
+        ("GET", r"{course}/modules/(?P<module>\d+)/items", _list_module_items),
+        ("POST", r"{course}/modules/(?P<module>\d+)/items", _create_module_item),
+        ("GET", r"{course}/pages", _list_pages),
+        ("POST", r"{course}/pages", _create_page),
+        ("GET", r"{course}/pages/(?P<page>[^/]+)", _get_page),
+        ("PUT", r"{course}/pages/(?P<page>[^/]+)", _update_page),
+        ("GET", r"{course}/quizzes", _list_quizzes),
+        ("POST", r"{course}/quizzes", _create_quiz),
+        ("POST", r"{course}/quizzes/(?P<quiz>\d+)/questions", _add_question),
+        ("DELETE", r"{course}/quizzes/(?P<quiz>\d+)", _delete_quiz),
+        ("POST", r"{course}/content_migrations", _create_migration),
+        ("POST", r"{course}/discussion_topics", _create_announcement),
+        ("GET", r"{course}/files", _list_files),
+        ("POST", r"{course}/files", _initiate_upload),
+        ("POST", r"/upload/(?P<token>[0-9a-f]+)", _receive_upload),
+        ("GET", r"/api/v1/files/(?P<file>\d+)/create_success", _confirm_upload),
+        ("GET", r"/api/v1/files/(?P<file>\d+)/public_url", _public_url),
+        ("GET", r"/download/(?P<blob>\d+)", _download),
+        ("POST", r"/api/graphql", _graphql),
+    ]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _connection(items: List[Any], first: int, after: Optional[str]) -> Tuple[List[Any], Dict[str, Any]]:
+    """One page of a GraphQL connection, the cursors are offsets."""
+    start = int(after) if after else 0
+    end = start + first
+    return items[start:end], {"hasNextPage": end < len(items), "endCursor": str(min(end, len(items)))}
+
+
+def _display_size(size: int) -> str:
+    """The size of a file as the GraphQL API returns it, formatted for display."""
+    if size < 1024:
+        return f"{size} bytes"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def _submission_node(submission: Dict[str, Any]) -> Dict[str, Any]:
+    """A REST submission as returned by the GraphQL API."""
+    return {
+        "_id": f"{submission['assignment_id']}-{submission['user_id']}",
+        "attempt": 1,
+        "body": None,
+        "grade": submission["grade"],
+        "score": submission["score"],
+        "state": submission["workflow_state"],
+        "submissionType": submission["submission_type"],
+        "submittedAt": submission["submitted_at"],
+        "gradedAt": submission["graded_at"],
+        "late": False,
+        "missing": False,
+        "excused": False,
+        "redoRequest": submission["redo_request"],
+        "user": {"_id": str(submission["user_id"])},
+        "attachments": [
+            {
+                "_id": str(attachment["id"]),
+                "displayName": attachment["display_name"],
+                "url": attachment["url"],
+                "size": _display_size(attachment["size"]),
+                "contentType": "application/pdf",
+                "updatedAt": attachment["updated_at"],
+            }
+            for attachment in submission["attachments"]
+        ],
+    }
+
+
+# Boolean fields of an assignment, all False in the fake course
+_ASSIGNMENT_FLAGS = (
+    "peer_reviews",
+    "automatic_peer_reviews",
+    "grade_group_students_individually",
+    "anonymous_peer_reviews",
+    "post_to_sis",
+    "moderated_grading",
+    "omit_from_final_grade",
+    "intra_group_peer_reviews",
+    "anonymous_instructor_annotations",
+    "anonymous_grading",
+    "graders_anonymous_to_graders",
+    "grader_comments_visible_to_graders",
+    "grader_names_visible_to_final_grader",
+    "hide_in_gradebook",
+    "has_submitted_submissions",
+    "due_date_required",
+    "in_closed_grading_period",
+    "graded_submissions_exist",
+    "is_quiz_assignment",
+    "can_duplicate",
+    "important_dates",
+    "muted",
+    "has_overrides",
+    "unpublishable",
+    "only_visible_to_overrides",
+    "locked_for_user",
+    "post_manually",
+    "anonymize_students",
+    "require_lockdown_browser",
+    "restrict_quantitative_data",
+)
+
+
+def _multipart_file(body: bytes, content_type: str) -> bytes:
+    """Extract the content of the file part, the last part of a multipart/form-data body."""
+    boundary = re.search(r"boundary=([^;]+)", content_type)
+    if not boundary:
+        return body
+    delimiter = b"--" + boundary.group(1).strip('"').encode()
+    for part in body.split(delimiter):
+        head, _, content = part.partition(b"\r\n\r\n")
+        if b"filename=" in head:
+            return content[: -len(b"\r\n")] if content.endswith(b"\r\n") else content
+    return b""
+
+
+def _handler(fake: FakeCanvas) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # The headers and the body are written separately, without this every response waits for a delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def handle_request(self, method: str):
+            url = urlparse(self.path)
+            # Array parameters ("student_ids[]") keep every value, the others only the first one
+            query = {key: values if key.endswith("[]") else values[0] for key, values in parse_qs(url.query).items()}
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            fake._count(method, url.path)
+            if fake.slow_rate and fake._random.random() < fake.slow_rate:
+                time.sleep(fake.slow_latency)
+            elif fake.latency:
+                time.sleep(fake.latency)
+
+            quota = fake._take_quota()
+            if quota is not None and quota < 0:
+                return self.send(403, b"403 Forbidden (Rate Limit Exceeded)", {"Content-Type": "text/plain"})
+
+            status, payload, headers = fake.route(method, url.path, query, body, dict(self.headers))
+            headers = dict(headers)
+            if quota is not None:
+                headers["X-Rate-Limit-Remaining"] = f"{quota:.1f}"
+                headers["X-Request-Cost"] = f"{fake.rate_limit.cost:.1f}"  # type: ignore[union-attr]
+            if method == "GET" and isinstance(payload, list):
+                payload = self.paginate(url.path, query, payload, headers)
+            content = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            headers.setdefault("Content-Type", "application/json")
+            if method == "GET" and status == 200:
+                etag = f'"{hashlib.md5(content).hexdigest()}"'
+                headers["ETag"] = etag
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send(304, b"", headers)
+            self.send(status, content, headers)
+
+        def paginate(self, path: str, query: Dict[str, str], items: List[Any], headers: Dict[str, str]) -> List[Any]:
+            per_page = int(query.get("per_page", 10))
+            page = int(query.get("page", 1))
+            if page * per_page < len(items):
+                next_query = urlencode({**query, "page": page + 1}, doseq=True)
+                headers["Link"] = f'<{fake.base_url}{path}?{next_query}>; rel="next"'
+            return items[(page - 1) * per_page : page * per_page]
+
+        def send(self, status: int, content: bytes, headers: Dict[str, str]):
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def do_PUT(self):
+            self.handle_request("PUT")
+
+        def do_DELETE(self):
+            self.handle_request("DELETE")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=10, help="Teams in the course")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds every request takes")
+    parser.add_argument("--rate-limit", action="store_true", help="Throttle the requests like Canvas")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    fake = FakeCanvas.with_teams(args.teams, latency=args.latency, rate_limit=RateLimit() if args.rate_limit else None)
+    print(f"Fake Canvas course {fake.course_id} at {fake.start(args.port)}, Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+End-to-end throughput benchmark of the Grader workflows against the local fake Canvas.
+
+For synthetic courses of each size, the Canvas side of a presentation day is run: create the team pages (with
+their file uploads), import the quizzes, load the module pages back, look every student up in the roster, post
+the grades and download the submissions. Every workflow reports the requests sent, the wall time and the peak
+memory allocated by the client. The fake Canvas runs in its own process so that it is not part of the memory
+measurements. Tracing the allocations slows the client down about three times, use --no-memory to compare wall
+times.
+
+Usage:
+    python -m benchmarks.grader_throughput --teams 10 100 1000 --latency 0.005 --json results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+
+from benchmarks.fake_canvas import ASSIGNMENT_TITLE, MODULE_TITLE, FakeCanvas, RateLimit
+from GradingAutomation import Grader
+from Logging import LogLevel, set_log_level
+from schemas import StudentRecord
+
+MEMBERS_PER_TEAM = 3
+
+
+class WorkflowResult(TypedDict):
+    teams: int
+    workflow: str
+    requests: int  # Requests sent by the client, retries included
+    seconds: float  # Wall time
+    peak_mib: Optional[float]  # Peak memory allocated by the client during the workflow, None if not traced
+
+
+def serve(teams: int, latency: float, rate_limit: bool, connection, stop) -> None:
+    """Run a fake Canvas until ``stop`` is set, its base URL is sent through ``connection``."""
+    set_log_level(LogLevel.ERROR)
+    fake = FakeCanvas.with_teams(
+        teams, members_per_team=MEMBERS_PER_TEAM, latency=latency, rate_limit=RateLimit() if rate_limit else None
+    )
+    connection.send((fake.start(), fake.course_id))
+    stop.wait()
+    fake.stop()
+
+
+def make_team_folders(root: str, teams: int, file_size: int) -> List[str]:
+    """Create the project folder of every team, with distinct files so that no upload is deduplicated."""
+    quiz = {
+        "title": "",
+        "description": "Quiz on the presentation",
+        "quiz_type": "assignment",
+        "time_limit": 10,
+        "allowed_attempts": 1,
+        "questions": [
+            {
+                "question_name": f"Question {index}",
+                "question_text": f"<p>Question {index} of the presentation?</p>",
+                "question_type": "multiple_choice_question",
+                "points_possible": 1,
+                "answers": [{"answer_text": "Yes", "answer_weight": 100}, {"answer_text": "No", "answer_weight": 0}],
+            }
+            for index in range(1, 4)
+        ],
+    }
+    folders = []
+    for team in range(1, teams + 1):
+        folder = os.path.join(root, f"Team{team}")
+        os.makedirs(folder)
+        for file_name in ("presentation.pdf", "paper.pdf"):
+            with open(os.path.join(folder, file_name), "wb") as f:
+                f.write(f"{team} {file_name}\n".encode() + os.urandom(file_size))
+        with open(os.path.join(folder, "github.txt"), "w") as f:
+            f.write(f"https://github.com/example/team{team}\n")
+        with open(os.path.join(folder, "quiz.json"), "w") as f:
+            json.dump({**quiz, "title": f"Team{team} quiz"}, f)
+        folders.append(folder)
+    return folders
+
+
+def student_records(teams: int) -> List[StudentRecord]:
+    return [
+        StudentRecord(
+            Canvas_ID="",
+            Canvas_Team_Page_State="",
+            Email=f"student{team}.{member}@example.edu",
+            Google_Form_ID="",
+            Names=f"Student {team}-{member}",
+            Team_Name=f"Team{team}",
+            Topic=f"Topic {team}",
+        )
+        for team in range(1, teams + 1)
+        for member in range(1, MEMBERS_PER_TEAM + 1)
+    ]
+
+
+def measure(grader: Grader, teams: int, workflow: str, run: Callable[[], Any], trace_memory: bool) -> WorkflowResult:
+    grader.canvas.metrics.reset()
+    if trace_memory:
+        tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Some CanvasAPI methods print what they create
+        run()
+    seconds = time.perf_counter() - start
+    peak_mib = (tracemalloc.get_traced_memory()[1] - baseline) / 2**20 if trace_memory else None
+    tracemalloc.stop()
+    requests_sent = sum(endpoint["requests"] for endpoint in grader.canvas.metrics.snapshot())
+    memory = f"{peak_mib:>9.1f} MiB" if peak_mib is not None else f"{'-':>13}"
+    print(f"{teams:>6} {workflow:<22} {requests_sent:>8} {seconds:>9.2f}s {memory}")
+    return WorkflowResult(teams=teams, workflow=workflow, requests=requests_sent, seconds=seconds, peak_mib=peak_mib)
+
+
+def run_course(
+    teams: int, latency: float, rate_limit: bool, file_size: int, trace_memory: bool = True
+) -> List[WorkflowResult]:
+    """Run every workflow against a fresh fake course of ``teams`` teams."""
+    parent, child = multiprocessing.Pipe()
+    stop = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(teams, latency, rate_limit, child, stop), daemon=True)
+    server.start()
+    base_url, course_id = parent.recv()
+    results: List[WorkflowResult] = []
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            folders = make_team_folders(os.path.join(root, "projects"), teams, file_size)
+            downloads = os.path.join(root, "downloads")
+            os.makedirs(downloads)
+
+            grader = Grader(course_id, MODULE_TITLE, api_token="benchmark", base_url=base_url)
+            grader.student_records = student_records(teams)
+            emails = [record["Email"] for record in grader.student_records]
+            module_id = grader.module_id_with_presentations.id
+            assignment_id = grader.get_assignment_id_by_title(ASSIGNMENT_TITLE)
+            grades: Dict[int, float] = {}
+
+            def roster_lookups():
+                for email in emails:
+                    grades[grader.canvas.roster.by_email(email)["id"]] = 90.0  # type: ignore[index]
+
+            workflows: List[tuple] = [
+                ("create pages", lambda: grader.create_multiple_canvas_pages_based_on_folder(folders)),
+                ("create quizzes", lambda: grader.create_quizzes(folders)),
+                ("load module pages", lambda: grader.canvas.get_module_pages(module_id)),
+                ("roster lookups", roster_lookups),
+                ("post grades", lambda: grader.post_grades(ASSIGNMENT_TITLE, grades)),
+                (
+                    "download submissions",
+                    lambda: grader.canvas.download_all_submission_attachments(assignment_id, downloads),
+                ),
+            ]
+            for workflow, run in workflows:
+                results.append(measure(grader, teams, workflow, run, trace_memory))
+            grader.canvas.close()
+    finally:
+        stop.set()
+        server.join(timeout=10)
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, nargs="+", default=[10, 100, 1000], help="Course sizes, in teams")
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds the fake Canvas takes per request")
+    parser.add_argument("--rate-limit", action="store_true", help="Throttle the requests like Canvas")
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="Size of the uploaded team files")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace the allocations, for exact wall times")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    set_log_level(LogLevel.ERROR)
+    print(f"{'teams':>6} {'workflow':<22} {'requests':>8} {'wall':>10} {'peak':>13}")
+    results: List[WorkflowResult] = []
+    for teams in args.teams:
+        results.extend(run_course(teams, args.latency, args.rate_limit, args.file_size, not args.no_memory))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of hedged GET requests against a local fake Canvas with a long latency tail.
+
+The fake Canvas answers most requests after --latency seconds and a --slow-rate share of them after
+--slow-latency seconds. The pages of a course are read one by one, like a serial grading run, without hedging and
+with a RequestHedger. Reports the wall time, the p50/p99 of the reads seen by the caller, the requests sent and
+how often the duplicate request won.
+
+Usage:
+    python -m benchmarks.hedged_reads --pages 300 --latency 0.01 --slow-rate 0.03 --slow-latency 1.0
+"""
+
+import argparse
+import math
+import time
+from typing import List, Optional
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Canvas.RequestHedger import RequestHedger
+from Logging import LogLevel, set_log_level
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    return sorted_values[min(max(math.ceil(percent / 100 * len(sorted_values)), 1), len(sorted_values)) - 1]
+
+
+def run(name: str, fake: FakeCanvas, urls: List[str], warmup: int, hedger: Optional[RequestHedger]) -> None:
+    with CanvasAPI(fake.course_id, api_token="benchmark", base_url=fake.base_url, hedger=hedger) as canvas:
+        for url in urls[:warmup]:  # Latencies for the hedging delay
+            canvas.get_page_by_id(url)
+        before = canvas.connection_stats()["requests"]
+        latencies = []
+        start = time.perf_counter()
+        for url in urls[warmup:]:
+            request_start = time.perf_counter()
+            canvas.get_page_by_id(url)
+            latencies.append(time.perf_counter() - request_start)
+        elapsed = time.perf_counter() - start
+        requests_sent = canvas.connection_stats()["requests"] - before
+        stats = hedger.stats() if hedger else None
+    latencies.sort()
+    hedges = f"{stats['hedged']:>4} hedged {stats['hedge_won']:>4} won" if stats else ""
+    print(
+        f"{name:<10} {len(latencies):>5} reads {requests_sent:>5} requests {elapsed:>7.2f}s "
+        f"p50 {percentile(latencies, 50) * 1000:>7.1f} ms p99 {percentile(latencies, 99) * 1000:>7.1f} ms  {hedges}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300, help="Pages read one by one")
+    parser.add_argument("--warmup", type=int, default=30, help="Reads before the measurements")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds most requests take")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Share of the requests that are slow")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Seconds the slow requests take")
+    parser.add_argument("--percentile", type=float, default=95.0, help="Latency percentile after which to hedge")
+    parser.add_argument("--budget", type=float, default=0.1, help="Hedges allowed per request")
+    args = parser.parse_args()
+
+    set_log_level(LogLevel.WARN)
+    for name, hedger in (
+        ("plain", None),
+        ("hedged", RequestHedger(percentile=args.percentile, budget=args.budget)),
+    ):
+        # A fresh server per run, so that both runs see the same slow requests
+        fake = FakeCanvas(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+        urls = [
+            fake.add_page(f"Team {index}", f"<p>Presentation of team {index}</p>")["url"] for index in range(args.pages)
+        ]
+        fake.start()
+        run(name, fake, urls, args.warmup, hedger)
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark of CanvasAPI.get_module_pages against a local fake Canvas.
+
+Compares the number of requests and the time needed to load the pages of a module one by one (1 + N requests)
+with the bulk listing used by get_module_pages.
+
+Usage:
+    python -m benchmarks.module_pages --pages 50 --course-pages 150 --latency 0.02
+"""
+
+import argparse
+import time
+
+from benchmarks.fake_canvas import MODULE_TITLE, FakeCanvas
+from Canvas.CanvasService import CanvasAPI
+from Logging import LogLevel, set_log_level
+
+
+def start_server(course_pages: int, module_pages: int, latency: float) -> FakeCanvas:
+    """Start a fake Canvas serving a course with ``course_pages`` pages, the first ``module_pages`` in a module."""
+    fake = FakeCanvas(latency=latency)
+    module = fake.add_module(MODULE_TITLE)
+    for index in range(course_pages):
+        page = fake.add_page(f"Team {index}", f"<p>Presentation of team {index}</p>")
+        if index < module_pages:
+            fake.add_module_item(module["id"], page["title"], "Page", page_url=page["url"])
+    fake.start()
+    return fake
+
+
+def one_by_one(canvas: CanvasAPI, module_id: int):
+    """How get_module_pages used to load the pages: list the items, then one request per page."""
+    return [canvas.get_page_by_id(item.page_url) for item in canvas.list_module_items(module_id) if item.page_url]
+
+
+def run(name: str, canvas: CanvasAPI, load, module_id: int) -> None:
+    before = canvas.connection_stats()["requests"]
+    start = time.perf_counter()
+    pages = load(canvas, module_id)
+    elapsed = time.perf_counter() - start
+    requests_sent = canvas.connection_stats()["requests"] - before
+    print(f"{name:<12} {len(pages):>6} pages {requests_sent:>6} requests {elapsed:>8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50, help="Pages in the module")
+    parser.add_argument("--course-pages", type=int, default=150, help="Pages in the course")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds the fake Canvas takes per request")
+    args = parser.parse_args()
+
+    set_log_level(LogLevel.WARN)
+    fake = start_server(args.course_pages, args.pages, args.latency)
+    module_id = fake.modules[0]["id"]
+    with CanvasAPI(fake.course_id, api_token="benchmark", base_url=fake.base_url) as canvas:
+        run("one by one", canvas, one_by_one, module_id)
+    with CanvasAPI(fake.course_id, api_token="benchmark", base_url=fake.base_url) as canvas:
+        run("bulk", canvas, CanvasAPI.get_module_pages, module_id)
+    fake.stop()
+
+
+if __name__ == "__main__":
+    main()
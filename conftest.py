@@ -0,0 +1,28 @@
+"""
+Fixtures shared by the offline tests, which run against the local fake Canvas of the benchmarks.
+
+A test module picks the fake it runs against with a module level ``fake_canvas``, a callable returning the fake
+before it is started, e.g. ``fake_canvas = functools.partial(FakeCanvas.with_teams, 2)``. An empty FakeCanvas is
+used by default.
+"""
+
+import pytest
+
+from benchmarks.fake_canvas import FakeCanvas
+from Canvas.CanvasService import CanvasAPI, RetryPolicy
+
+
+@pytest.fixture
+def fake(request):
+    fake = getattr(request.module, "fake_canvas", FakeCanvas)()
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def canvas(fake: FakeCanvas):
+    with CanvasAPI(
+        fake.course_id, api_token="test", base_url=fake.base_url, retry_policy=RetryPolicy(backoff=0.01)
+    ) as canvas:
+        yield canvas
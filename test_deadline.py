@@ -0,0 +1,54 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from Deadline import (
+    DEFAULT_REQUEST_TIMEOUT,
+    DeadlineExceeded,
+    check_deadline,
+    deadline,
+    remaining,
+    request_timeout,
+    sleep_within_deadline,
+)
+
+
+def test_no_deadline():
+    assert remaining() is None
+    assert request_timeout() == DEFAULT_REQUEST_TIMEOUT
+    with deadline(None):
+        check_deadline()
+
+
+def test_nested_deadline_cannot_extend_the_enclosing_one():
+    with deadline(1, "Posting the grades"):
+        with deadline(60):
+            assert remaining() <= 1  # type: ignore[operator]
+        with deadline(0.5):
+            assert remaining() <= 0.5  # type: ignore[operator]
+    assert remaining() is None
+
+
+def test_spent_deadline():
+    with deadline(0.05, "Posting the grades"):
+        assert request_timeout() <= 0.05
+        time.sleep(0.06)
+        with pytest.raises(DeadlineExceeded, match="Posting the grades ran out of its 0.05 second budget"):
+            request_timeout(action="sending the grades")
+
+
+def test_sleep_longer_than_the_deadline_fails_right_away():
+    with deadline(1):
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            sleep_within_deadline(5, "retrying")
+        assert time.monotonic() - start < 0.5
+
+
+def test_worker_threads_keep_the_deadline_with_a_copied_context():
+    with deadline(1):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(remaining).result() is None
+            assert executor.submit(contextvars.copy_context().run, remaining).result() <= 1
@@ -0,0 +1,75 @@
+"""
+Offline tests of the Grader workflows, run against the local fake Canvas of the benchmarks.
+
+Usage:
+    python -m pytest test_grading_automation.py
+"""
+
+import functools
+import os
+
+import pytest
+
+from benchmarks.fake_canvas import MODULE_TITLE, FakeCanvas
+from benchmarks.grader_throughput import make_team_folders, student_records
+from GradingAutomation import Grader
+from Logging import LogLevel, set_log_level
+
+set_log_level(LogLevel.ERROR)
+
+TEAMS = 3
+
+
+fake_canvas = functools.partial(FakeCanvas.with_teams, TEAMS)
+
+
+@pytest.fixture
+def grader(fake: FakeCanvas):
+    grader = Grader(fake.course_id, MODULE_TITLE, api_token="test", base_url=fake.base_url)
+    grader.student_records = student_records(TEAMS)
+    return grader
+
+
+@pytest.fixture
+def folders(tmp_path):
+    return make_team_folders(str(tmp_path), TEAMS, file_size=1024)
+
+
+def test_invalid_folder_stops_the_batch_before_any_upload(grader: Grader, fake: FakeCanvas, folders):
+    os.remove(os.path.join(folders[-1], "paper.pdf"))
+    with pytest.raises(ValueError, match="Paper file is missing"):
+        grader.create_multiple_canvas_pages_based_on_folder(folders)
+    assert fake.files == {}
+    assert fake.pages == {}
+
+
+def test_failed_team_does_not_stop_the_others(grader: Grader, fake: FakeCanvas, folders, monkeypatch):
+    create_page = grader.canvas.create_page
+
+    def failing_create_page(title, body, **kwargs):
+        if title == "Team2":
+            raise RuntimeError("injected failure")
+        return create_page(title=title, body=body, **kwargs)
+
+    monkeypatch.setattr(grader.canvas, "create_page", failing_create_page)
+    with pytest.raises(ValueError, match="Created 2 of 3 pages") as error:
+        grader.create_multiple_canvas_pages_based_on_folder(folders)
+    assert folders[1] in str(error.value)
+    assert sorted(page["title"] for page in fake.pages.values()) == ["Team1", "Team3"]
+    assert len(fake.module_items[grader.module_id_with_presentations.id]) == 2
+
+
+def test_quizzes_left_by_a_timed_out_import_are_reused(grader: Grader, fake: FakeCanvas, folders, monkeypatch):
+    wait_for_progress = grader.canvas.wait_for_progress
+
+    def timing_out(*args, **kwargs):
+        wait_for_progress(*args, **kwargs)  # Canvas finishes the import after the client gave up waiting
+        raise TimeoutError("injected timeout")
+
+    monkeypatch.setattr(grader.canvas, "wait_for_progress", timing_out)
+    with pytest.raises(TimeoutError):
+        grader.create_quizzes(folders)
+    monkeypatch.undo()
+    quizzes = grader.create_quizzes(folders)
+    assert len(fake.quizzes) == TEAMS
+    assert sorted(quiz["id"] for quiz in quizzes.values()) == sorted(quiz["id"] for quiz in fake.quizzes)